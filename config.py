@@ -64,6 +64,23 @@ if not GDRIVE_TARGET_FOLDER_ID or GDRIVE_TARGET_FOLDER_ID == "...":
     # GDRIVE_TARGET_FOLDER_ID = None # Optionally set to None to make checks more explicit later
 GOOGLE_DRIVE_APP_DATA_FOLDER_NAME = os.getenv("GOOGLE_DRIVE_APP_DATA_FOLDER_NAME", "YTCookhouseAppData")
 DB_JSON_FILENAME_ON_DRIVE = "app_database.json" 
+# Folder/file IDs resolved by name are cached process-wide for this long (entries are dropped early on a 404).
+DRIVE_ID_CACHE_TTL_SECONDS = int(os.getenv("DRIVE_ID_CACHE_TTL_SECONDS", "3600"))
+# Downloads are streamed to disk in chunks of this size, so memory use does not grow with file size.
+GDRIVE_DOWNLOAD_CHUNK_SIZE_BYTES = int(os.getenv("GDRIVE_DOWNLOAD_CHUNK_SIZE_BYTES", str(8 * 1024 * 1024)))
+# Number of clips of a recipe folder downloaded at once. Each worker borrows its own client from the Drive client pool.
+GDRIVE_DOWNLOAD_WORKERS = max(1, int(os.getenv("GDRIVE_DOWNLOAD_WORKERS", "4")))
+# Pre-built Drive clients shared by background jobs (one HTTP transport each, since httplib2 is not thread-safe).
+GDRIVE_CLIENT_POOL_SIZE = max(1, int(os.getenv("GDRIVE_CLIENT_POOL_SIZE", "6")))
+# A pooled client idle for longer than this is health-checked before it is handed out again.
+GDRIVE_CLIENT_HEALTHCHECK_IDLE_SECONDS = int(os.getenv("GDRIVE_CLIENT_HEALTHCHECK_IDLE_SECONDS", "300"))
+# How long a job waits for a pooled Drive client when all are borrowed before failing with GDriveServiceError.
+GDRIVE_CLIENT_ACQUIRE_TIMEOUT_SECONDS = float(os.getenv("GDRIVE_CLIENT_ACQUIRE_TIMEOUT_SECONDS", "300"))
+GDRIVE_HTTP_TIMEOUT_SECONDS = int(os.getenv("GDRIVE_HTTP_TIMEOUT_SECONDS", "120"))
+# File uploads are sent as resumable sessions in chunks of this size (Drive requires a multiple of 256 KiB).
+GDRIVE_UPLOAD_CHUNK_SIZE_BYTES = max(256 * 1024, int(os.getenv("GDRIVE_UPLOAD_CHUNK_SIZE_BYTES", str(16 * 1024 * 1024))) // (256 * 1024) * (256 * 1024))
+# Consecutive retries (exponential backoff) for one chunk that fails with 429/5xx or a network error.
+GDRIVE_UPLOAD_MAX_RETRIES = int(os.getenv("GDRIVE_UPLOAD_MAX_RETRIES", "6"))
 
 # --- Gemini API Key ---
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
@@ -97,6 +114,37 @@ else:
 RAW_DIR = os.path.join(TEMP_PROCESSING_BASE_DIR, "raw_clips_temp")
 MERGED_DIR = os.path.join(TEMP_PROCESSING_BASE_DIR, "merged_videos_temp")
 METADATA_TEMP_DIR = os.path.join(TEMP_PROCESSING_BASE_DIR, "metadata_temp")
+# Content-addressed cache of downloaded source clips (keyed by GDrive file ID + md5Checksum), bounded by LRU eviction.
+CLIP_CACHE_DIR = os.path.join(TEMP_PROCESSING_BASE_DIR, "clip_cache")
+CLIP_CACHE_MAX_BYTES = int(os.getenv("CLIP_CACHE_MAX_BYTES", str(5 * 1024 * 1024 * 1024)))
+# Per-recipe ffprobe results (codec, resolution, fps, ...) keyed by clip fingerprint, so re-merges never re-probe.
+CLIP_INDEX_DIR = os.path.join(TEMP_PROCESSING_BASE_DIR, "clip_index")
+FFPROBE_WORKERS = max(1, int(os.getenv("FFPROBE_WORKERS", "4")))
+# Concatenate with -c:v copy when most clips share codec parameters; only the outliers are re-encoded to match.
+MERGE_STREAM_COPY_ENABLED = os.getenv("MERGE_STREAM_COPY_ENABLED", "true").strip().lower() in ("1", "true", "yes")
+# When a re-encode is needed: "parallel" encodes each clip to a normalized segment (MERGE_SEGMENT_WORKERS at a time,
+# shared by all merges in the process) and stream-copies the segments together; "single" is one ffmpeg over the whole timeline.
+MERGE_ENCODE_MODE = os.getenv("MERGE_ENCODE_MODE", "parallel").strip().lower()
+MERGE_SEGMENT_WORKERS = max(1, int(os.getenv("MERGE_SEGMENT_WORKERS", str(os.cpu_count() or 1))))
+MERGE_SEGMENT_PRESET = os.getenv("MERGE_SEGMENT_PRESET", "medium")
+MERGE_SEGMENT_CRF = os.getenv("MERGE_SEGMENT_CRF", "23")
+MERGE_SEGMENT_FPS = os.getenv("MERGE_SEGMENT_FPS", "30")
+# Normalized clip encodes (segments, outlier normalization, short-clip preprocessing) keyed by source fingerprint and
+# encode settings, so a re-merge only encodes new or changed clips. Bounded by LRU eviction like the clip cache.
+SEGMENT_CACHE_ENABLED = os.getenv("SEGMENT_CACHE_ENABLED", "true").strip().lower() in ("1", "true", "yes")
+SEGMENT_CACHE_DIR = os.path.join(TEMP_PROCESSING_BASE_DIR, "segment_cache")
+SEGMENT_CACHE_MAX_BYTES = int(os.getenv("SEGMENT_CACHE_MAX_BYTES", str(5 * 1024 * 1024 * 1024)))
+# Bitexact flags and stripped metadata on segments, so the same clips and settings always produce identical bytes.
+MERGE_DETERMINISTIC = os.getenv("MERGE_DETERMINISTIC", "true").strip().lower() in ("1", "true", "yes")
+# Encoding profile (see services/encoding_profiles.py) for recipes that have not picked one: draft, standard, publish or archive.
+DEFAULT_ENCODING_PROFILE = os.getenv("DEFAULT_ENCODING_PROFILE", "standard").strip().lower()
+# Small proxy rendition (short side PREVIEW_PROXY_MAX_LINES) uploaded next to the final video; the preview page plays it.
+PREVIEW_PROXY_ENABLED = os.getenv("PREVIEW_PROXY_ENABLED", "true").strip().lower() in ("1", "true", "yes")
+PREVIEW_PROXY_MAX_LINES = int(os.getenv("PREVIEW_PROXY_MAX_LINES", "480"))
+# Local index of the recipe folders under GDRIVE_TARGET_FOLDER_ID, kept current via the Drive Changes API.
+DRIVE_FOLDER_INDEX_PATH = os.path.join(TEMP_PROCESSING_BASE_DIR, "drive_folder_index.json")
+# /select_folder is served from an in-memory folder catalog refreshed in the background this often.
+FOLDER_CATALOG_REFRESH_SECONDS = float(os.getenv("FOLDER_CATALOG_REFRESH_SECONDS", "30"))
 
 # --- Static and Persistent Video Storage Directories (within the app structure) ---
 # These are assumed to be part of your project repo or managed by where the app is run.
@@ -104,6 +152,11 @@ STATIC_DIR_CONFIG = os.path.join(APP_ROOT_DIR, "static")
 STATIC_AUDIO_DIR = os.path.join(STATIC_DIR_CONFIG, "audio")
 # Preview cache within static, for videos downloaded from GDrive for preview
 STATIC_PREVIEW_CACHE_DIR = os.path.join(STATIC_DIR_CONFIG, "preview_cache")
+# Indexed background-music library built from STATIC_AUDIO_DIR (duration, EBU R128 loudness, loudness-normalized
+# AAC renditions the merge can stream-copy). Rescanned for added/changed/removed tracks every AUDIO_LIBRARY_SCAN_SECONDS.
+AUDIO_LIBRARY_DIR = os.path.join(TEMP_PROCESSING_BASE_DIR, "audio_library")
+AUDIO_LIBRARY_SCAN_SECONDS = float(os.getenv("AUDIO_LIBRARY_SCAN_SECONDS", "60"))
+AUDIO_LIBRARY_TARGET_LUFS = float(os.getenv("AUDIO_LIBRARY_TARGET_LUFS", "-16"))
 
 
 # APP_VIDEOS_DIR and its subdirectories are removed as they are redundant.
@@ -111,8 +164,8 @@ STATIC_PREVIEW_CACHE_DIR = os.path.join(STATIC_DIR_CONFIG, "preview_cache")
 # Previews are handled via STATIC_PREVIEW_CACHE_DIR.
 
 DIRECTORIES_TO_CREATE = [
-    TEMP_PROCESSING_BASE_DIR, RAW_DIR, MERGED_DIR, METADATA_TEMP_DIR,
-    STATIC_DIR_CONFIG, STATIC_AUDIO_DIR, STATIC_PREVIEW_CACHE_DIR
+    TEMP_PROCESSING_BASE_DIR, RAW_DIR, MERGED_DIR, METADATA_TEMP_DIR, CLIP_CACHE_DIR, CLIP_INDEX_DIR, SEGMENT_CACHE_DIR,
+    STATIC_DIR_CONFIG, STATIC_AUDIO_DIR, STATIC_PREVIEW_CACHE_DIR, AUDIO_LIBRARY_DIR
 ]
 
 for dir_path in DIRECTORIES_TO_CREATE:
@@ -149,6 +202,27 @@ CACHED_DB_CONTENT = None
 DB_CACHE_TIMESTAMP = None 
 DB_CACHE_DURATION_SECONDS = 1800 # Cache DB content for 30 minutes by default
 
+# --- DB Storage Backend ---
+# "snapshot": every write re-uploads the whole DB_JSON_FILENAME_ON_DRIVE (original behaviour, default).
+# "journal":  opt-in; every write appends a small per-recipe delta file to DB_JOURNAL_FOLDER_NAME on GDrive;
+#             deltas are folded back into the snapshot once DB_JOURNAL_COMPACT_THRESHOLD accumulate.
+#             Switching an existing snapshot deployment to "journal" needs no migration. Before switching
+#             back to "snapshot", let the journal compact (or call utils.compact_db_journal()) so no
+#             un-folded deltas are left behind in DB_JOURNAL_FOLDER_NAME.
+# "sqlite":   recipe state lives in a local SQLite file (DB_SQLITE_PATH) and all reads are local;
+#             a background replicator pushes a JSON snapshot to DB_JSON_FILENAME_ON_DRIVE every
+#             DB_SQLITE_REPLICATION_INTERVAL_SECONDS when something changed.
+DB_STORAGE_MODE = os.getenv("DB_STORAGE_MODE", "snapshot").strip().lower()
+DB_JOURNAL_FOLDER_NAME = "app_database_journal"
+DB_JOURNAL_COMPACT_THRESHOLD = int(os.getenv("DB_JOURNAL_COMPACT_THRESHOLD", "50"))
+DB_SQLITE_PATH = os.getenv("DB_SQLITE_PATH", os.path.join(TEMP_PROCESSING_BASE_DIR, "app_database.sqlite3"))
+DB_SQLITE_REPLICATION_INTERVAL_SECONDS = float(os.getenv("DB_SQLITE_REPLICATION_INTERVAL_SECONDS", "30"))
+# Status updates made within this window are merged into one GDrive write ("snapshot"/"journal" modes). 0 disables.
+DB_WRITE_COALESCE_WINDOW_MS = int(os.getenv("DB_WRITE_COALESCE_WINDOW_MS", "500"))
+# Failed batched writes are retried with exponential backoff starting at the coalesce window, capped at this.
+DB_WRITE_RETRY_MAX_BACKOFF_SECONDS = float(os.getenv("DB_WRITE_RETRY_MAX_BACKOFF_SECONDS", "60"))
+print(f"CONFIG - DB Storage Mode: {DB_STORAGE_MODE}")
+
 # --- YouTube OAuth User Consent Configuration ---
 # CLIENT_SECRET_YOUTUBE_PATH is no longer used directly for YouTube client secret.
 # Configuration is expected via GOOGLE_CLIENT_SECRET_JSON_YOUTUBE environment variable.
@@ -46,6 +46,22 @@ async def startup_event():
             APP_STARTUP_STATUS["gdrive_error_details"] = str(e)
             print(f"MAIN: ERROR - Exception during Google Drive Service initialization: {e}")
 
+    # Local SQLite DB (DB_STORAGE_MODE == "sqlite"): seed from the GDrive replica on a fresh disk,
+    # then keep pushing snapshots to GDrive in the background.
+    if config.DB_STORAGE_MODE == "sqlite":
+        from services import db_sqlite
+        db_sqlite.seed_from_drive_if_empty()
+        db_sqlite.start_replicator()
+
+    # Index the background-music library (loudness, normalized AAC renditions) off the startup path and keep it current.
+    from services import audio_library
+    audio_library.start_watcher()
+
+    # Keep the /select_folder catalog warm in the background so page loads never wait on GDrive.
+    if APP_STARTUP_STATUS["gdrive_ready"]:
+        from services import folder_catalog
+        folder_catalog.start_refresher()
+
     # Initialize YouTube Service
     print("MAIN: Initializing YouTube Service...")
     try:
@@ -127,6 +143,20 @@ async def startup_event():
         print("MAIN: WARNING - One or more services are not ready. Check error details.")
         print(f"MAIN: Startup Status: {APP_STARTUP_STATUS}")
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    import config
+    from utils import flush_db_writes
+    from services import folder_catalog
+    from services import audio_library
+    folder_catalog.stop_refresher()
+    audio_library.stop_watcher()
+    flush_db_writes() # Don't lose status updates still inside the coalescing window
+    if config.DB_STORAGE_MODE == "sqlite":
+        from services import db_sqlite
+        print("MAIN: Flushing local SQLite DB to GDrive before shutdown...")
+        db_sqlite.stop_replicator()
+
 # --- OAuth2 Callback Route for YouTube ---
 # This needs to be added to a router, e.g., a new auth_router or existing upload.router
 # For now, let's define it here and assume it will be added to a router.
@@ -1,26 +1,32 @@
 from fastapi import APIRouter, Request, Form, BackgroundTasks, HTTPException
 from fastapi.responses import HTMLResponse, RedirectResponse
 from fastapi.templating import Jinja2Templates
+from fastapi.concurrency import run_in_threadpool
 import os
 import json
 import sys
 import asyncio # Added for Semaphore
+import threading
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 # Concurrency control for video processing tasks
-MAX_CONCURRENT_VIDEO_TASKS = 1  # Start with 1 for safety on free tier
+MAX_CONCURRENT_VIDEO_TASKS = int(os.getenv("MAX_CONCURRENT_VIDEO_TASKS", "1"))  # Start with 1 for safety on free tier
 VIDEO_TASK_SEMAPHORE = asyncio.Semaphore(MAX_CONCURRENT_VIDEO_TASKS)
 # Optional: To track active tasks for debugging or more advanced logic
 CURRENT_ACTIVE_VIDEO_TASK_COUNT = 0
 # ACTIVE_PROCESSING_RECIPE_ID = None # Can be added if needed for UI feedback
+# Recipe IDs whose download task is queued or running in this process. The persisted DOWNLOADING status can't
+# tell that: after a crash or restart it stays behind with nothing working on it.
+ACTIVE_DOWNLOADS = set()
+ACTIVE_DOWNLOADS_LOCK = threading.Lock()
 
-from services import gdrive, video_editor, gemini, youtube_uploader
+from services import gdrive, video_editor, gemini, youtube_uploader, encoding_profiles, job_control
 from services.gemini import GeminiServiceError
 from services.youtube_uploader import YouTubeUploaderError
 # Import METADATA_TEMP_DIR instead of OUTPUT_DIR, and TEMP_PROCESSING_BASE_DIR for relative paths
 from config import TEMP_PROCESSING_BASE_DIR, RAW_DIR, METADATA_TEMP_DIR 
-from utils import update_recipe_status, get_recipe_status, get_all_recipes_from_db
+from utils import update_recipe_status, update_recipe_fields, get_recipe_status, get_all_recipes_from_db
 
 
 router = APIRouter()
@@ -40,41 +46,112 @@ async def run_video_editing_task(
     global CURRENT_ACTIVE_VIDEO_TASK_COUNT
     
     task_acquired = False
+    job = job_control.register(recipe_id_val) # Cancellable from here on, including while queued for the semaphore
+    if job is None:
+        # The previous merge of this recipe is still running or cleaning up; it writes the recipe's final status
+        print(f"Video editing for {recipe_id_val} not started: a previous merge job for it has not finished yet.")
+        return
+    merge_future = None
+    cancel_waiter = asyncio.ensure_future(job.wait_cancelled())
     try:
         print(f"Attempting to acquire semaphore for video editing: {recipe_id_val} ({recipe_name_orig_val}). Current active: {CURRENT_ACTIVE_VIDEO_TASK_COUNT}")
-        await VIDEO_TASK_SEMAPHORE.acquire()
-        task_acquired = True
-        CURRENT_ACTIVE_VIDEO_TASK_COUNT += 1
+        acquire = asyncio.ensure_future(VIDEO_TASK_SEMAPHORE.acquire())
+        await asyncio.wait({acquire, cancel_waiter}, return_when=asyncio.FIRST_COMPLETED)
+        if acquire.done():
+            task_acquired = True
+            CURRENT_ACTIVE_VIDEO_TASK_COUNT += 1
+        else:
+            acquire.cancel() # Cancelled while still queued
+        if job.cancelled():
+            print(f"Video editing for {recipe_id_val} cancelled before it started.")
+            await run_in_threadpool(update_recipe_status, recipe_id=recipe_id_val, name=recipe_name_orig_val, status="CANCELLED")
+            return
         print(f"Semaphore ACQUIRED for recipe {recipe_id_val}. Active video tasks: {CURRENT_ACTIVE_VIDEO_TASK_COUNT}")
         
-        # Note: video_editor.merge_videos_and_replace_audio is a synchronous function.
-        # FastAPI's background_tasks.add_task runs it in a threadpool.
+        # Note: video_editor.merge_videos_and_replace_audio is a synchronous function (ffmpeg + GDrive I/O).
+        # It runs in the threadpool so the event loop stays free while it works.
         # The semaphore here limits how many such blocking tasks are initiated.
-        video_editor.merge_videos_and_replace_audio(
+        merge_future = asyncio.ensure_future(run_in_threadpool(
+            video_editor.merge_videos_and_replace_audio,
             background_tasks_obj_from_editor_param, 
             relative_clips_path_from_db_val, 
             recipe_id_val, 
             recipe_name_orig_val
-        )
-        # The merge_videos_and_replace_audio function itself handles DB status updates for MERGED or MERGE_FAILED.
+        ))
+        await asyncio.wait({merge_future, cancel_waiter}, return_when=asyncio.FIRST_COMPLETED)
+        if merge_future.done():
+            merge_future.result()
+        else:
+            # The worker thread is stopping its ffmpeg and cleaning up (it sets CANCELLED itself); the slot
+            # is given back now rather than when the thread gets there.
+            print(f"Video editing for {recipe_id_val} cancelled. Releasing its slot while the worker winds down.")
+        # The merge_videos_and_replace_audio function itself handles DB status updates for MERGED, MERGE_FAILED or CANCELLED.
         # It also chains the metadata generation task.
         
     except Exception as e:
         print(f"ERROR during semaphore-wrapped video processing for {recipe_id_val}: {e}")
         # Ensure status is updated to reflect failure if the task itself doesn't catch and update
         # This is a fallback error state.
-        update_recipe_status(
+        # Terminal statuses are written through to GDrive immediately; keep that off the event loop
+        await run_in_threadpool(
+            update_recipe_status,
             recipe_id=recipe_id_val, 
             name=recipe_name_orig_val, 
             status="MERGE_FAILED", 
             error_message=f"Video processing supervisor error: {str(e)}"
         )
     finally:
+        cancel_waiter.cancel()
+        if merge_future is None or merge_future.done():
+            job_control.unregister(job)
+        else:
+            merge_future.add_done_callback(lambda future: _finish_cancelled_merge(job, future))
         if task_acquired:
             CURRENT_ACTIVE_VIDEO_TASK_COUNT -= 1
             VIDEO_TASK_SEMAPHORE.release()
             print(f"Semaphore RELEASED for recipe {recipe_id_val}. Active video tasks: {CURRENT_ACTIVE_VIDEO_TASK_COUNT}")
 
+def _finish_cancelled_merge(job: job_control.Job, future):
+    # Keeps the (cancelled) job registered until its worker thread has actually returned
+    job_control.unregister(job)
+    if not future.cancelled() and future.exception():
+        print(f"ERROR in cancelled video processing for {job.recipe_id} while winding down: {future.exception()}")
+
+def run_download_task(background_tasks: BackgroundTasks, folder_id: str, folder_name: str, absolute_download_path: str):
+    """
+    Download stage of the pipeline (DOWNLOADING -> DOWNLOADED). This is a sync function, so BackgroundTasks
+    runs it in the threadpool; on success it queues the merge stage on the same BackgroundTasks object.
+    """
+    print(f"BACKGROUND TASK: Download: Starting for {folder_id} ({folder_name}).")
+    try:
+        gdrive.download_folder_contents(folder_id, folder_name, absolute_download_path) # Sets DOWNLOADED or DOWNLOAD_FAILED
+    finally:
+        with ACTIVE_DOWNLOADS_LOCK:
+            ACTIVE_DOWNLOADS.discard(folder_id)
+
+    current_recipe_info = get_recipe_status(folder_id)
+    current_status_from_db = current_recipe_info.get("status") if current_recipe_info else None
+    if current_status_from_db != "DOWNLOADED":
+        print(f"BACKGROUND TASK: Download: {folder_id} ({folder_name}) ended with status '{current_status_from_db}'. Merge not started.")
+        return
+
+    relative_clips_path_from_db = current_recipe_info.get("raw_clips_path")
+    if not relative_clips_path_from_db:
+        error_msg = f"Failed to get relative_clips_path_from_db for {folder_name} after download. Cannot start merge."
+        print(f"BACKGROUND TASK: Download: ERROR - {error_msg}")
+        update_recipe_status(recipe_id=folder_id, name=folder_name, status="MERGE_FAILED", error_message=error_msg)
+        return
+
+    update_recipe_status(recipe_id=folder_id, name=folder_name, status="MERGING")
+    background_tasks.add_task(
+        run_video_editing_task,
+        background_tasks, # Passed to the wrapper, then to video_editor for its own chaining
+        relative_clips_path_from_db,
+        folder_id,
+        folder_name
+    )
+    print(f"BACKGROUND TASK: Download: Video editing task for {folder_name} ({folder_id}) ADDED to background_tasks via wrapper.")
+
 # --- Helper function to trigger next step in the background ---
 def trigger_next_background_task(background_tasks: BackgroundTasks, recipe_id: str):
     recipe_data = get_recipe_status(recipe_id)
@@ -89,9 +166,17 @@ def trigger_next_background_task(background_tasks: BackgroundTasks, recipe_id: s
     
     normalized_status = str(current_status).strip().upper()
 
-    if normalized_status == "DOWNLOADED" or normalized_status == "MERGE_FAILED": # Retry merge if it previously failed
-        if normalized_status == "MERGE_FAILED":
-            print(f"BACKGROUND_TRIGGER: Retrying MERGE for '{recipe_id}' which previously failed.")
+    # MERGING counts as retryable only when no merge job exists in this process: the status was left behind by a
+    # merge that died with a restart, and re-running it resumes from its saved upload session (merged_upload).
+    merge_retryable_statuses = ("DOWNLOADED", "MERGE_FAILED", "CANCELLED", "MERGING")
+    if normalized_status in merge_retryable_statuses and job_control.get_job(recipe_id):
+        # A cancelled merge writes CANCELLED just before its worker returns; it still owns the output files until then
+        print(f"BACKGROUND_TRIGGER: Merge job for '{recipe_id}' is still running or winding down. Not starting another one.")
+    elif normalized_status in merge_retryable_statuses: # Retry merge if it previously failed, was cancelled or was interrupted
+        if normalized_status == "MERGING":
+            print(f"BACKGROUND_TRIGGER: '{recipe_id}' was left in MERGING with no merge job running (e.g. after a restart). Resuming MERGE.")
+        elif normalized_status != "DOWNLOADED":
+            print(f"BACKGROUND_TRIGGER: Retrying MERGE for '{recipe_id}' (previous status {normalized_status}).")
         else:
             print(f"BACKGROUND_TRIGGER: Condition normalized_status == 'DOWNLOADED' met for '{recipe_id}'.")
         
@@ -276,20 +361,34 @@ async def oauth2callback_youtube(request: Request, code: str = None, state: str
 @router.get("/select_folder", response_class=HTMLResponse, name="select_folder_route")
 async def select_folder_page(request: Request, message: str = None, error: str = None):
     from config import APP_STARTUP_STATUS # Import the status dict
-    folders_with_status = gdrive.list_folders_from_gdrive_and_db_status()
+    from services import folder_catalog
+    # Served from the in-memory catalog; the background refresher keeps it current.
+    catalog = folder_catalog.get_snapshot()
     return templates.TemplateResponse("select_folder.html", {
         "request": request, 
-        "folders": folders_with_status,
+        "folders": catalog["folders"],
+        "catalog": catalog,
+        "encoding_profiles": {"names": sorted(encoding_profiles.PROFILES), "default": encoding_profiles.resolve_name(None)},
         "message": message,
         "error": error,
         "config": {"APP_STARTUP_STATUS": APP_STARTUP_STATUS}  # Pass it to the template
     })
 
+@router.post("/refresh_folders", name="refresh_folders_route")
+async def refresh_folders_route():
+    from services import folder_catalog
+    if await run_in_threadpool(folder_catalog.refresh_now):
+        return RedirectResponse(url="/select_folder?message=Folder_list_refreshed.", status_code=303)
+    error_msg = folder_catalog.get_snapshot().get("error") or "Unknown error"
+    return RedirectResponse(url=f"/select_folder?error=Folder_list_refresh_failed:_{error_msg}", status_code=303)
+
 from config import TEMP_PROCESSING_BASE_DIR, RAW_DIR # Import new config vars
 
 @router.post("/fetch_clips", name="fetch_clips_route")
-async def fetch_clips_route(background_tasks: BackgroundTasks, folder_id: str = Form(...), folder_name: str = Form(...)):
-    print(f"ROUTE /fetch_clips: Request for folder ID: {folder_id}, Name: {folder_name}")
+async def fetch_clips_route(background_tasks: BackgroundTasks, folder_id: str = Form(...), folder_name: str = Form(...), encoding_profile: str = Form(None)):
+    print(f"ROUTE /fetch_clips: Request for folder ID: {folder_id}, Name: {folder_name}, Encoding profile: {encoding_profile}")
+    if encoding_profile and not encoding_profiles.is_valid(encoding_profile):
+        return RedirectResponse(url=f"/select_folder?error=Unknown_encoding_profile:_{encoding_profile}", status_code=303)
     safe_folder_name = "".join(c if c.isalnum() else "_" for c in folder_name)
     
     # RAW_DIR from config is already the absolute, environment-specific path to .../raw_clips_temp/
@@ -302,46 +401,57 @@ async def fetch_clips_route(background_tasks: BackgroundTasks, folder_id: str =
     # Path to be stored in DB should be relative to TEMP_PROCESSING_BASE_DIR
     relative_download_path_for_db = os.path.relpath(absolute_download_path, TEMP_PROCESSING_BASE_DIR)
 
-    update_recipe_status(recipe_id=folder_id, name=folder_name, status="DOWNLOADING", raw_clips_path=relative_download_path_for_db) # Store relative path
-    
-    gdrive.download_folder_contents(folder_id, folder_name, absolute_download_path) # Pass absolute path for actual download
-    
-    # After download attempt, get the true status from the DB
-    current_recipe_info = get_recipe_status(folder_id)
-    current_status_from_db = current_recipe_info.get("status") if current_recipe_info else None
-
-    if current_status_from_db == "DOWNLOADED":
-        relative_clips_path_from_db = current_recipe_info.get("raw_clips_path") 
-        if not relative_clips_path_from_db:
-            error_msg = f"Failed to get relative_clips_path_from_db for {folder_name} after download. Cannot start merge."
-            print(f"ERROR in fetch_clips_route: {error_msg}")
-            return RedirectResponse(url=f"/select_folder?error={error_msg}", status_code=303)
-
-        update_recipe_status(recipe_id=folder_id, name=folder_name, status="MERGING") 
-        # Use the new wrapper for concurrency control
-        # The `background_tasks` object from this route's signature is the one that the editor needs for its *own* potential chaining.
-        current_route_background_tasks_obj = background_tasks
-        background_tasks.add_task(
-            run_video_editing_task,
-            current_route_background_tasks_obj, # Passed to the wrapper, then to video_editor
-            relative_clips_path_from_db,
-            folder_id,
-            folder_name
-        )
-        msg = f"Clips for '{folder_name}' downloaded. Full processing (merge & metadata) started."
-        print(f"ROUTE /fetch_clips: Video editing task for {folder_name} ({folder_id}) ADDED to background_tasks via wrapper.")
-        return RedirectResponse(url=f"/select_folder?message={msg}", status_code=303)
-    else:
-        # If status is not DOWNLOADED, it implies a failure during download (e.g., DOWNLOAD_FAILED)
-        error_msg = "Unknown error after download attempt."
-        if current_recipe_info and current_recipe_info.get("error_message"):
-            error_msg = current_recipe_info.get("error_message")
-        elif current_status_from_db:
-            error_msg = f"Download process resulted in status: {current_status_from_db}. Merge not started."
-        else:
-            error_msg = f"Could not retrieve status for {folder_name} after download attempt. Merge not started."
-        return RedirectResponse(url=f"/select_folder?error={error_msg}", status_code=303)
+    with ACTIVE_DOWNLOADS_LOCK:
+        already_downloading = folder_id in ACTIVE_DOWNLOADS
+        ACTIVE_DOWNLOADS.add(folder_id)
+    if already_downloading:
+        msg = f"Clips for '{folder_name}' are already being downloaded. Track progress at /api/recipe_status/{folder_id}."
+        return RedirectResponse(url=f"/select_folder?message={msg}&job_id={folder_id}", status_code=303)
 
+    try:
+        # DB and GDrive calls are blocking, so everything below runs in the threadpool rather than on the event loop.
+        current_recipe_info = await run_in_threadpool(get_recipe_status, folder_id)
+        if current_recipe_info and current_recipe_info.get("status") == "DOWNLOADING":
+            print(f"ROUTE /fetch_clips: {folder_id} was left in DOWNLOADING with no download running (e.g. after a restart). Fetching again.")
+
+        # The chosen encoding profile is persisted in the recipe so later re-merges use it too
+        profile_field = {"encoding_profile": encoding_profile} if encoding_profile else {}
+        # Fresh clips make a rendered video (and proxy) left by an interrupted merge worthless, so drop its upload record
+        await run_in_threadpool(update_recipe_status, recipe_id=folder_id, name=folder_name, status="DOWNLOADING", raw_clips_path=relative_download_path_for_db, merged_upload=None, **profile_field) # Store relative path
+    except BaseException:
+        with ACTIVE_DOWNLOADS_LOCK:
+            ACTIVE_DOWNLOADS.discard(folder_id)
+        raise
+    background_tasks.add_task(run_download_task, background_tasks, folder_id, folder_name, absolute_download_path) # Pass absolute path for actual download
+
+    # The recipe ID is the job handle: /api/recipe_status/{folder_id} reports DOWNLOADING -> DOWNLOADED -> MERGING -> ...
+    msg = f"Download of clips for '{folder_name}' started. Merge & metadata will follow automatically. Track progress at /api/recipe_status/{folder_id}."
+    print(f"ROUTE /fetch_clips: Download task for {folder_name} ({folder_id}) ADDED to background_tasks.")
+    return RedirectResponse(url=f"/select_folder?message={msg}&job_id={folder_id}", status_code=303)
+
+
+def _fetch_preview_video(preview_video_gdrive_id: str, local_recipe_preview_dir: str, recipe_name_safe: str, recipe_db_id: str, gdrive_service) -> str:
+    """Makes sure the preview directory holds the current revision of the preview video. Returns its file name."""
+    # A re-merge updates the same Drive file in place, so the cached copy is keyed on the file's content revision
+    revision_info = gdrive.get_file_revision_info(preview_video_gdrive_id, service=gdrive_service)
+    if not revision_info:
+        raise FileNotFoundError("Preview video no longer exists on GDrive.")
+    revision = revision_info.get("md5Checksum") or revision_info.get("headRevisionId") or revision_info.get("modifiedTime", "").replace(":", "")
+    local_temp_video_filename = f"{recipe_name_safe}_preview_{preview_video_gdrive_id}_{revision}.mp4"
+    local_temp_video_for_preview = os.path.join(local_recipe_preview_dir, local_temp_video_filename)
+    if os.path.exists(local_temp_video_for_preview):
+        print(f"ROUTE /preview: Reusing cached preview video {local_temp_video_filename} for {recipe_db_id}")
+        return local_temp_video_filename
+    for stale_name in os.listdir(local_recipe_preview_dir): # Copies of earlier merges
+        if "_preview_" in stale_name and stale_name.endswith(".mp4"):
+            os.remove(os.path.join(local_recipe_preview_dir, stale_name))
+    try:
+        if not gdrive.download_file_from_drive(preview_video_gdrive_id, local_temp_video_for_preview, service=gdrive_service):
+            raise FileNotFoundError("Failed to download video from GDrive for preview.")
+    except Exception:
+        if os.path.exists(local_temp_video_for_preview): os.remove(local_temp_video_for_preview) # Never serve a partial copy
+        raise
+    return local_temp_video_filename
 
 @router.get("/preview/{recipe_db_id}", response_class=HTMLResponse, name="preview_recipe_route")
 async def preview_video_page(request: Request, recipe_db_id: str):
@@ -397,11 +507,14 @@ async def preview_video_page(request: Request, recipe_db_id: str):
         with open(local_temp_metadata_for_preview, 'r') as f_meta:
             metadata_content = json.load(f_meta)
 
-        # Download video from GDrive to the servable preview directory
-        local_temp_video_filename = f"{recipe_name_safe}_preview.mp4"
+        # Download video from GDrive to the servable preview directory.
+        # The low-res proxy is enough for eyeballing the result; the full render is only fetched for the YouTube upload.
+        preview_video_gdrive_id = recipe_data.get("proxy_video_gdrive_id") or merged_video_gdrive_id
+        # Revision lookup, stale-copy cleanup and the download are blocking Drive/disk I/O, kept off the event loop
+        local_temp_video_filename = await run_in_threadpool(
+            _fetch_preview_video, preview_video_gdrive_id, local_recipe_preview_dir, recipe_name_safe, recipe_db_id, gdrive_service
+        )
         local_temp_video_for_preview = os.path.join(local_recipe_preview_dir, local_temp_video_filename)
-        if not gdrive.download_file_from_drive(merged_video_gdrive_id, local_temp_video_for_preview, service=gdrive_service):
-            raise FileNotFoundError("Failed to download video from GDrive for preview.")
 
         video_url = f"/static/preview_cache/{preview_temp_dir_name}/{local_temp_video_filename}"
 
@@ -498,11 +611,21 @@ async def upload_to_youtube_endpoint(background_tasks: BackgroundTasks,
     return RedirectResponse(url=f"/select_folder?message={msg}", status_code=303)
 
 # --- API for status updates (for UI polling) ---
+def _overlay_live_progress(recipe_id: str, status_data: dict):
+    """Live download/merge progress is kept in memory by the running task; the DB only has the last persisted copy."""
+    download_progress = gdrive.get_download_progress(recipe_id)
+    if download_progress:
+        status_data["download_progress"] = download_progress
+    merge_progress = video_editor.get_merge_progress(recipe_id)
+    if merge_progress:
+        status_data["merge_progress"] = merge_progress
+
 @router.get("/api/recipe_status/{recipe_id}")
 async def api_get_recipe_status(recipe_id: str):
     status_data = get_recipe_status(recipe_id)
     if not status_data:
         raise HTTPException(status_code=404, detail="Recipe not found")
+    _overlay_live_progress(recipe_id, status_data)
     return status_data
 
 @router.get("/api/all_recipes_status")
@@ -510,17 +633,55 @@ async def api_get_all_recipes_status():
     all_statuses = get_all_recipes_from_db()
     if not all_statuses:
         return {}
+    for recipe_id, status_data in all_statuses.items():
+        _overlay_live_progress(recipe_id, status_data)
     return all_statuses
 
+# Operational counters for the DB write path, GDrive clients, local caches and running jobs.
+@router.get("/api/metrics")
+async def api_get_metrics():
+    from config import DB_STORAGE_MODE
+    from services import db_batcher, clip_cache, folder_index, segment_cache, audio_library
+    return {
+        "db": {
+            "storage_mode": DB_STORAGE_MODE,
+            "write_batcher": db_batcher.get_metrics(),
+        },
+        "drive_id_cache": gdrive.get_drive_id_cache_stats(),
+        "drive_client_pool": gdrive.DRIVE_CLIENT_POOL.get_stats(),
+        "clip_cache": clip_cache.get_stats(),
+        "segment_cache": segment_cache.get_stats(),
+        "audio_library": audio_library.get_stats(),
+        "folder_index": folder_index.get_stats(),
+        "encoding_profiles": encoding_profiles.get_stats(),
+        "running_jobs": job_control.get_stats(),
+    }
+
 # New endpoint to manually trigger next step if a background task completed
 # but the next one needs to be initiated (e.g., after merge, trigger metadata gen)
 @router.post("/trigger_next_step/{recipe_id}")
-async def trigger_next_step_route(background_tasks: BackgroundTasks, recipe_id: str):
+async def trigger_next_step_route(background_tasks: BackgroundTasks, recipe_id: str, encoding_profile: str = Form(None)):
+    if encoding_profile:
+        if not encoding_profiles.is_valid(encoding_profile):
+            return RedirectResponse(url=f"/select_folder?error=Unknown_encoding_profile:_{encoding_profile}", status_code=303)
+        recipe_data = get_recipe_status(recipe_id) or {}
+        profile_fields = {"encoding_profile": encoding_profile} # Applies to the (re-)merge triggered below
+        if encoding_profiles.resolve_name(recipe_data.get("encoding_profile")) != encoding_profiles.resolve_name(encoding_profile):
+            profile_fields["merged_upload"] = None # A render from an interrupted merge used the old profile
+        update_recipe_fields(recipe_id, **profile_fields)
     trigger_next_background_task(background_tasks, recipe_id)
     recipe_data = get_recipe_status(recipe_id)
     status_now = recipe_data.get("status", "Unknown") if recipe_data else "Unknown"
     return RedirectResponse(url=f"/select_folder?message=Attempted_to_trigger_next_step_for_{recipe_id}._Current_status:_{status_now}", status_code=303)
 
+@router.post("/jobs/{recipe_id}/cancel", name="cancel_job_route")
+async def cancel_job_route(recipe_id: str):
+    # Stops a queued or running merge: its ffmpeg is terminated, temp files are removed and the recipe ends as CANCELLED
+    print(f"ROUTE /jobs/cancel: Request to cancel the job for recipe ID: {recipe_id}")
+    if not job_control.request_cancel(recipe_id):
+        return RedirectResponse(url=f"/select_folder?error=No_running_job_to_cancel_for_{recipe_id}._Use_Resume_Merge_if_it_was_interrupted.", status_code=303)
+    return RedirectResponse(url=f"/select_folder?message=Cancelling_job_for_{recipe_id}.", status_code=303)
+
 
 @router.post("/reset_recipe/{recipe_db_id}", name="reset_recipe_route")
 async def reset_recipe_endpoint(request: Request, recipe_db_id: str):
@@ -0,0 +1,269 @@
+import os
+import sys
+import json
+import time
+import random
+import hashlib
+import threading
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from config import STATIC_AUDIO_DIR, AUDIO_LIBRARY_DIR, AUDIO_LIBRARY_SCAN_SECONDS, AUDIO_LIBRARY_TARGET_LUFS
+from services import media_probe, ffmpeg_runner, encoding_profiles
+
+# Indexed background-music library.
+# Every track in STATIC_AUDIO_DIR is analyzed once: duration (ffprobe) and EBU R128 loudness (ffmpeg loudnorm,
+# first pass). From the measurement an AAC rendition normalized to AUDIO_LIBRARY_TARGET_LUFS is built (second,
+# linear loudnorm pass), so every mix has the same loudness and the merge can stream-copy the audio instead of
+# re-encoding MP3 -> AAC per video. Renditions exist per AAC bitrate: the default profile's is built up front, others
+# once a merge asks for them. The index (AUDIO_LIBRARY_DIR/index.json) is loaded at startup and a daemon thread rescans
+# the folder every AUDIO_LIBRARY_SCAN_SECONDS, analyzing added or changed tracks (size/mtime) and dropping removed ones.
+# All analysis and rendition encodes happen on that thread, each holding an ffmpeg_runner.ENCODE_SLOTS slot; a merge
+# only uses renditions that already exist and falls back to encoding the music itself otherwise.
+
+AUDIO_EXTENSIONS = ('.mp3', '.m4a', '.aac', '.wav', '.flac', '.ogg')
+FFMPEG_CMD = "ffmpeg"
+FFPROBE_CMD = "ffprobe"
+TRUE_PEAK_DBTP = -1.5
+LOUDNESS_RANGE_LU = 11
+ANALYSIS_TIMEOUT_SECONDS = 300
+# Among tracks at least as long as the video, pick from those at most this many times the closest fit
+FIT_SLACK = 1.5
+
+_INDEX = {} # File name in STATIC_AUDIO_DIR -> entry
+_INDEX_LOCK = threading.Lock()
+_SCAN_LOCK = threading.Lock()
+_FAILED = {} # File name -> (size, mtime) of a version that could not be analyzed; not retried until it changes
+_WANTED_BITRATES = set() # Bitrates merges asked for besides the default profile's; built on the next scan
+_WATCHER_THREAD = None
+_WATCHER_STOP = threading.Event()
+_WATCHER_WAKE = threading.Event()
+_STATS = {"scans": 0, "last_scan_at": None, "last_scan_seconds": None, "tracks_analyzed": 0, "renditions_built": 0,
+          "renditions_missing": 0, "errors": 0}
+_STATS_LOCK = threading.Lock()
+
+def _count(stat: str):
+    with _STATS_LOCK:
+        _STATS[stat] += 1
+
+class AudioLibraryError(Exception):
+    pass
+
+def _index_path() -> str:
+    return os.path.join(AUDIO_LIBRARY_DIR, "index.json")
+
+def _load_index() -> dict:
+    if not os.path.exists(_index_path()):
+        return {}
+    try:
+        with open(_index_path(), 'r') as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        print(f"Audio Library: WARNING - Ignoring unreadable index {_index_path()}: {e}")
+        return {}
+
+def _save_index(index: dict):
+    os.makedirs(AUDIO_LIBRARY_DIR, exist_ok=True)
+    temp_path = _index_path() + ".tmp"
+    with open(temp_path, 'w') as f:
+        json.dump(index, f, indent=1)
+    os.replace(temp_path, _index_path())
+
+def _measure_loudness(path: str) -> dict:
+    """First loudnorm pass: integrated loudness, true peak and loudness range of the whole track."""
+    analysis_filter = f"loudnorm=I={AUDIO_LIBRARY_TARGET_LUFS}:TP={TRUE_PEAK_DBTP}:LRA={LOUDNESS_RANGE_LU}:print_format=json"
+    try:
+        with ffmpeg_runner.ENCODE_SLOTS:
+            stderr_tail = ffmpeg_runner.run_ffmpeg(
+                [FFMPEG_CMD, '-hide_banner', '-i', path, '-vn', '-af', analysis_filter, '-f', 'null', '-'], timeout=ANALYSIS_TIMEOUT_SECONDS
+            )
+        data = json.loads(stderr_tail[stderr_tail.rfind('{'):stderr_tail.rfind('}') + 1]) # Printed last, flat JSON
+        return {
+            "integrated_lufs": float(data["input_i"]), "true_peak_dbtp": float(data["input_tp"]),
+            "lra_lu": float(data["input_lra"]), "threshold_lufs": float(data["input_thresh"]), "target_offset_lu": float(data["target_offset"]),
+        }
+    except (ffmpeg_runner.FFmpegError, ValueError, KeyError) as e:
+        raise AudioLibraryError(f"Loudness analysis failed for {os.path.basename(path)}: {e}")
+
+def _analyze(name: str, stat: os.stat_result) -> dict:
+    path = os.path.join(STATIC_AUDIO_DIR, name)
+    try:
+        info = media_probe.probe_clip(path, FFPROBE_CMD)
+    except media_probe.MediaProbeError as e:
+        raise AudioLibraryError(str(e))
+    if not info["has_audio"] or not info["duration"]:
+        raise AudioLibraryError(f"{name} has no audio stream or no duration.")
+    version = hashlib.sha1(f"{name}|{stat.st_size}|{stat.st_mtime}".encode()).hexdigest()[:12]
+    return {
+        "file": name, "size": stat.st_size, "mtime": stat.st_mtime, "version": version,
+        "duration": info["duration"], "source_codec": info["audio_codec"], "loudness": _measure_loudness(path), "renditions": {},
+    }
+
+def _rendition_file(entry: dict, bitrate: str) -> str:
+    stem = "".join(c if c.isalnum() else "_" for c in os.path.splitext(entry["file"])[0])
+    return f"{stem}_{entry['version']}_{bitrate}.m4a"
+
+def _build_rendition(entry: dict, bitrate: str) -> str:
+    """Second loudnorm pass (linear, from the stored measurement) straight into AAC at bitrate."""
+    loudness = entry["loudness"]
+    normalize_filter = (
+        f"loudnorm=I={AUDIO_LIBRARY_TARGET_LUFS}:TP={TRUE_PEAK_DBTP}:LRA={LOUDNESS_RANGE_LU}"
+        f":measured_I={loudness['integrated_lufs']}:measured_TP={loudness['true_peak_dbtp']}:measured_LRA={loudness['lra_lu']}"
+        f":measured_thresh={loudness['threshold_lufs']}:offset={loudness['target_offset_lu']}:linear=true"
+    )
+    output_path = os.path.join(AUDIO_LIBRARY_DIR, _rendition_file(entry, bitrate))
+    temp_path = output_path + ".part.m4a"
+    try:
+        with ffmpeg_runner.ENCODE_SLOTS:
+            ffmpeg_runner.run_ffmpeg([
+                FFMPEG_CMD, '-y', '-hide_banner', '-i', os.path.join(STATIC_AUDIO_DIR, entry["file"]), '-vn', '-map_metadata', '-1',
+                '-af', normalize_filter, '-ar', '48000', '-c:a', 'aac', '-b:a', bitrate, '-movflags', '+faststart', temp_path,
+            ], timeout=ANALYSIS_TIMEOUT_SECONDS)
+        os.replace(temp_path, output_path)
+    except (ffmpeg_runner.FFmpegError, OSError) as e:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise AudioLibraryError(f"AAC rendition ({bitrate}) failed for {entry['file']}: {e}")
+    _count("renditions_built")
+    print(f"Audio Library: Built {bitrate} rendition of {entry['file']} ({loudness['integrated_lufs']} LUFS -> {AUDIO_LIBRARY_TARGET_LUFS} LUFS).")
+    return output_path
+
+def _rendition_path(entry: dict, bitrate: str) -> str:
+    return os.path.join(AUDIO_LIBRARY_DIR, _rendition_file(entry, bitrate))
+
+def _ensure_rendition(entry: dict, bitrate: str):
+    """Builds the track's normalized AAC rendition at bitrate unless it exists (watcher thread only)."""
+    path = _rendition_path(entry, bitrate)
+    if os.path.exists(path):
+        return
+    try:
+        _build_rendition(entry, bitrate)
+    except AudioLibraryError as e:
+        _count("errors")
+        print(f"Audio Library: WARNING - {e}")
+        return
+    with _INDEX_LOCK:
+        entry["renditions"][bitrate] = os.path.basename(path)
+        _save_index(_INDEX)
+
+def _delete_renditions(entry: dict):
+    for file_name in entry.get("renditions", {}).values():
+        try:
+            os.remove(os.path.join(AUDIO_LIBRARY_DIR, file_name))
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            print(f"Audio Library: WARNING - Could not delete rendition {file_name}: {e}")
+
+def scan_now() -> bool:
+    """Brings the index in line with STATIC_AUDIO_DIR. Returns True if anything changed."""
+    with _SCAN_LOCK:
+        started = time.time()
+        names = sorted(n for n in os.listdir(STATIC_AUDIO_DIR) if n.lower().endswith(AUDIO_EXTENSIONS)) if os.path.isdir(STATIC_AUDIO_DIR) else []
+        with _INDEX_LOCK:
+            current = dict(_INDEX)
+        updated, changed = {}, False
+        default_bitrate = encoding_profiles.get_profile(None)["audio_bitrate"]
+        for name in names:
+            stat = os.stat(os.path.join(STATIC_AUDIO_DIR, name))
+            entry = current.get(name)
+            if entry and entry["size"] == stat.st_size and entry["mtime"] == stat.st_mtime:
+                updated[name] = entry
+                continue
+            if _FAILED.get(name) == (stat.st_size, stat.st_mtime):
+                continue
+            try:
+                new_entry = _analyze(name, stat)
+            except AudioLibraryError as e:
+                _FAILED[name] = (stat.st_size, stat.st_mtime)
+                _count("errors")
+                print(f"Audio Library: WARNING - Skipping {name}: {e}")
+                continue
+            _count("tracks_analyzed")
+            print(f"Audio Library: Indexed {name}: {new_entry['duration']:.1f}s, {new_entry['loudness']['integrated_lufs']} LUFS.")
+            if entry:
+                _delete_renditions(entry) # Source changed; old renditions are stale
+            updated[name] = new_entry
+            changed = True
+        for name in set(current) - set(updated): # Removed (or no longer readable)
+            _delete_renditions(current[name])
+            changed = True
+        if changed:
+            with _INDEX_LOCK:
+                _INDEX.clear()
+                _INDEX.update(updated)
+                _save_index(_INDEX)
+        with _INDEX_LOCK:
+            bitrates = {default_bitrate} | _WANTED_BITRATES
+        for entry in updated.values(): # Renditions merges will ask for; a no-op once they exist
+            for bitrate in sorted(bitrates):
+                _ensure_rendition(entry, bitrate)
+        with _STATS_LOCK:
+            _STATS["scans"] += 1
+            _STATS["last_scan_at"] = time.time()
+            _STATS["last_scan_seconds"] = round(time.time() - started, 3)
+        return changed
+
+def select_track(video_seconds: float, bitrate: str) -> dict | None:
+    """
+    Picks a track for a video of video_seconds: at random among tracks that cover the whole video without much left
+    over (FIT_SLACK), else the longest track, to be looped. Returns {"file", "path", "duration", "loop",
+    "integrated_lufs"} with path pointing at the normalized AAC rendition, or None if the library has nothing usable.
+    Only tracks whose rendition at bitrate is already built are considered; missing renditions are queued for the
+    watcher instead of being built here, so a merge never waits on them.
+    """
+    with _INDEX_LOCK:
+        indexed = list(_INDEX.values())
+    tracks = [t for t in indexed if os.path.exists(_rendition_path(t, bitrate))]
+    if len(tracks) < len(indexed):
+        _count("renditions_missing")
+        with _INDEX_LOCK:
+            _WANTED_BITRATES.add(bitrate)
+        _WATCHER_WAKE.set()
+    if not tracks:
+        return None
+    fitting = [t for t in tracks if t["duration"] >= video_seconds]
+    if fitting:
+        closest = min(t["duration"] for t in fitting)
+        track = random.choice([t for t in fitting if t["duration"] <= closest * FIT_SLACK])
+    else:
+        track = max(tracks, key=lambda t: t["duration"])
+    return {
+        "file": track["file"], "path": _rendition_path(track, bitrate), "duration": track["duration"], "loop": not fitting,
+        "integrated_lufs": track["loudness"]["integrated_lufs"],
+    }
+
+def _watcher_loop():
+    while not _WATCHER_STOP.is_set():
+        try:
+            scan_now()
+        except Exception as e:
+            print(f"Audio Library: ERROR - Unexpected error while scanning: {e}")
+        _WATCHER_WAKE.wait(AUDIO_LIBRARY_SCAN_SECONDS)
+        _WATCHER_WAKE.clear()
+
+def start_watcher():
+    """Loads the saved index (usable right away) and starts the background rescans."""
+    global _WATCHER_THREAD
+    if _WATCHER_THREAD and _WATCHER_THREAD.is_alive():
+        return
+    with _INDEX_LOCK:
+        _INDEX.clear()
+        _INDEX.update(_load_index())
+    _WATCHER_STOP.clear()
+    _WATCHER_WAKE.clear()
+    _WATCHER_THREAD = threading.Thread(target=_watcher_loop, name="audio-library-watcher", daemon=True)
+    _WATCHER_THREAD.start()
+    print(f"Audio Library: Watcher started with {len(_INDEX)} indexed track(s) (rescan every {AUDIO_LIBRARY_SCAN_SECONDS}s).")
+
+def stop_watcher():
+    _WATCHER_STOP.set()
+    _WATCHER_WAKE.set()
+    if _WATCHER_THREAD:
+        _WATCHER_THREAD.join(timeout=5)
+
+def get_stats() -> dict:
+    with _INDEX_LOCK:
+        tracks = list(_INDEX.values())
+    with _STATS_LOCK:
+        stats = dict(_STATS)
+    return dict(stats, tracks=len(tracks), total_seconds=round(sum(t["duration"] for t in tracks), 1), target_lufs=AUDIO_LIBRARY_TARGET_LUFS)
@@ -0,0 +1,141 @@
+import os
+import sys
+import time
+import shutil
+import hashlib
+import threading
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from config import CLIP_CACHE_DIR, CLIP_CACHE_MAX_BYTES
+
+# Local content-addressed cache for source clips downloaded from GDrive.
+# An entry is named "<file id>_<version>", where version is the Drive md5Checksum (or modifiedTime for files
+# Drive has no checksum for), so a clip edited on Drive gets a new entry and the stale one ages out.
+# Recipes get hard links into RAW_DIR/<recipe>, so evicting a cache entry never breaks a recipe in progress.
+# While such a link exists, deleting the entry frees no disk space: linked entries count against the budget
+# but are never evicted, and the budget is met by evicting unlinked entries only.
+# Partial downloads live next to their entry as "<entry>.part" and are resumed rather than restarted.
+
+_LOCK = threading.Lock()
+_STATS = {"hits": 0, "misses": 0, "evicted_files": 0, "evicted_bytes": 0}
+
+class ClipCacheError(Exception):
+    """Raised when a downloaded clip does not match its Drive checksum."""
+    pass
+
+def entry_path(item: dict) -> str:
+    version = item.get('md5Checksum') or "".join(c for c in item.get('modifiedTime', '') if c.isalnum()) or "unversioned"
+    extension = os.path.splitext(item['name'])[1].lower()
+    return os.path.join(CLIP_CACHE_DIR, f"{item['id']}_{version}{extension}")
+
+def lookup(item: dict) -> str | None:
+    """Returns the cached path for this Drive item if an intact copy exists, and marks it recently used."""
+    path = entry_path(item)
+    expected_size = int(item.get('size') or 0)
+    if os.path.exists(path) and (not expected_size or os.path.getsize(path) == expected_size):
+        os.utime(path, None) # mtime doubles as the LRU timestamp
+        with _LOCK:
+            _STATS["hits"] += 1
+        return path
+    with _LOCK:
+        _STATS["misses"] += 1
+    return None
+
+def file_md5(path: str) -> str:
+    """MD5 of the whole file, the same value Drive reports as md5Checksum."""
+    digest = hashlib.md5()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def verify(path: str, item: dict):
+    """Checks a freshly downloaded entry against Drive's md5Checksum; a mismatching file is deleted."""
+    expected_md5 = item.get('md5Checksum')
+    if not expected_md5:
+        return
+    actual_md5 = file_md5(path)
+    if actual_md5 != expected_md5:
+        os.remove(path)
+        raise ClipCacheError(f"Checksum mismatch for {item['name']} ({item['id']}): expected {expected_md5}, got {actual_md5}.")
+
+def materialize(cache_path: str, destination_path: str):
+    """Places a cached clip at destination_path, as a hard link when the filesystem allows it."""
+    os.makedirs(os.path.dirname(destination_path), exist_ok=True)
+    if os.path.exists(destination_path):
+        if os.path.samefile(cache_path, destination_path):
+            return
+        os.remove(destination_path)
+    try:
+        os.link(cache_path, destination_path)
+    except OSError:
+        shutil.copy2(cache_path, destination_path)
+
+def enforce_size_budget(directory: str, max_bytes: int, keep: set | None = None, stats: dict | None = None) -> int:
+    """
+    Deletes least-recently-used files (oldest mtime first) in directory until it fits in max_bytes.
+    Paths in keep, files written in the last minute (likely still being downloaded) and files that still have
+    another hard link (a recipe folder using the clip; deleting them would free nothing) are never deleted.
+    Evictions are counted in stats (this cache's own stats by default). Returns the number of bytes freed.
+    """
+    stats = _STATS if stats is None else stats
+    keep = {os.path.abspath(p) for p in (keep or ())}
+    in_flight_cutoff = time.time() - 60
+    entries = []
+    for name in os.listdir(directory):
+        path = os.path.join(directory, name)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue # Renamed or evicted by another thread since listdir (e.g. a .tmp entry that was just stored)
+        if os.path.isfile(path):
+            entries.append((stat.st_mtime, stat.st_size, stat.st_nlink, path))
+    total = sum(size for _, size, _, _ in entries)
+    freed = 0
+    for mtime, size, nlink, path in sorted(entries):
+        if total - freed <= max_bytes:
+            break
+        if os.path.abspath(path) in keep or mtime > in_flight_cutoff or nlink > 1:
+            continue
+        try:
+            os.remove(path)
+        except OSError as e:
+            print(f"Cache: WARNING - Could not evict {path}: {e}")
+            continue
+        freed += size
+        with _LOCK:
+            stats["evicted_files"] += 1
+            stats["evicted_bytes"] += size
+    if freed:
+        print(f"Cache: Evicted {freed / (1024 * 1024):.1f} MiB from {directory} (budget {max_bytes / (1024 * 1024):.0f} MiB).")
+    if total - freed > max_bytes:
+        linked = sum(size for _, size, nlink, _ in entries if nlink > 1)
+        print(f"Cache: WARNING - {directory} is still {(total - freed) / (1024 * 1024):.1f} MiB (budget {max_bytes / (1024 * 1024):.0f} MiB); "
+              f"{linked / (1024 * 1024):.1f} MiB is hard-linked into recipe folders and is freed when those are cleaned up.")
+    return freed
+
+def evict(keep: set | None = None) -> int:
+    return enforce_size_budget(CLIP_CACHE_DIR, CLIP_CACHE_MAX_BYTES, keep)
+
+def directory_bytes(directory: str, linked_only: bool = False) -> int:
+    """
+    Total size of the files in directory (only those with another hard link if linked_only);
+    files that disappear while it is being summed are skipped.
+    """
+    total = 0
+    for name in os.listdir(directory) if os.path.isdir(directory) else ():
+        try:
+            stat = os.stat(os.path.join(directory, name))
+        except OSError:
+            continue
+        if not linked_only or stat.st_nlink > 1:
+            total += stat.st_size
+    return total
+
+def get_stats() -> dict:
+    with _LOCK:
+        stats = dict(_STATS)
+    stats["max_bytes"] = CLIP_CACHE_MAX_BYTES
+    stats["bytes"] = directory_bytes(CLIP_CACHE_DIR)
+    stats["linked_bytes"] = directory_bytes(CLIP_CACHE_DIR, linked_only=True)
+    return stats
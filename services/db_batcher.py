@@ -0,0 +1,130 @@
+import os
+import sys
+import time
+import threading
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from config import DB_WRITE_COALESCE_WINDOW_MS, DB_WRITE_RETRY_MAX_BACKOFF_SECONDS
+
+# Write-behind batcher for GDrive-backed DB writes ("snapshot" and "journal" storage modes).
+# utils applies every delta to the cached DB immediately (so reads see it), then enqueues it here.
+# The first delta of a batch arms a timer; when it fires (DB_WRITE_COALESCE_WINDOW_MS later) every delta
+# queued in the meantime is persisted with a single write. flush() writes the batch right away and is used
+# for terminal statuses so that a finished task is durable before its thread returns.
+# A failed batch goes back to the front of the queue and is retried with exponential backoff (doubling from
+# the coalesce window up to DB_WRITE_RETRY_MAX_BACKOFF_SECONDS); while GDrive keeps failing only the first
+# failure and then every time the delay doubles are logged.
+
+_PENDING = []
+_PENDING_LOCK = threading.Lock()
+_FLUSH_LOCK = threading.Lock() # Serializes flushes so batches reach GDrive in order
+_TIMER = None
+_CONSECUTIVE_FAILURES = 0
+
+_METRICS = {
+    "updates_enqueued": 0,
+    "updates_flushed": 0,
+    "flush_count": 0,
+    "flush_failures": 0,
+    "explicit_flush_count": 0,
+    "last_flush_duration_seconds": None,
+    "retry_delay_seconds": None,
+}
+
+def enabled() -> bool:
+    return DB_WRITE_COALESCE_WINDOW_MS > 0
+
+def enqueue(delta: dict):
+    global _TIMER
+    with _PENDING_LOCK:
+        _PENDING.append(delta)
+        _METRICS["updates_enqueued"] += 1
+        if _TIMER is None:
+            _TIMER = threading.Timer(DB_WRITE_COALESCE_WINDOW_MS / 1000.0, _on_timer)
+            _TIMER.daemon = True
+            _TIMER.start()
+
+def pending_deltas() -> list:
+    with _PENDING_LOCK:
+        return list(_PENDING)
+
+def discard_pending() -> int:
+    """Drops queued deltas without writing them (used by the hard DB reset)."""
+    global _TIMER
+    with _PENDING_LOCK:
+        dropped = len(_PENDING)
+        _PENDING.clear()
+        if _TIMER is not None:
+            _TIMER.cancel()
+            _TIMER = None
+    return dropped
+
+def _retry_delay_seconds(failures: int) -> float:
+    base = DB_WRITE_COALESCE_WINDOW_MS / 1000.0
+    return min(base * (2 ** max(failures - 1, 0)), DB_WRITE_RETRY_MAX_BACKOFF_SECONDS)
+
+def _on_timer():
+    _flush(explicit=False)
+
+def flush() -> bool:
+    """Writes every queued delta now. Returns False if the write failed (the deltas stay queued)."""
+    return _flush(explicit=True)
+
+def _flush(explicit: bool) -> bool:
+    global _TIMER, _CONSECUTIVE_FAILURES
+    with _FLUSH_LOCK:
+        with _PENDING_LOCK:
+            batch = list(_PENDING)
+            _PENDING.clear()
+            if _TIMER is not None:
+                _TIMER.cancel()
+                _TIMER = None
+        if not batch:
+            return True
+
+        from utils import _write_pending_deltas
+        started = time.time()
+        try:
+            ok = _write_pending_deltas(batch)
+        except Exception as e:
+            print(f"DB Batcher: ERROR - Unexpected error flushing {len(batch)} update(s): {e}")
+            ok = False
+        duration = time.time() - started
+
+        if not ok:
+            _METRICS["flush_failures"] += 1
+            _CONSECUTIVE_FAILURES += 1
+            delay = _retry_delay_seconds(_CONSECUTIVE_FAILURES)
+            previous_delay = _METRICS["retry_delay_seconds"]
+            _METRICS["retry_delay_seconds"] = round(delay, 3)
+            with _PENDING_LOCK:
+                _PENDING[:0] = batch # Keep order: failed batch goes back in front of anything queued since
+                if _TIMER is not None:
+                    _TIMER.cancel() # A timer armed by enqueue() in the meantime would retry before the backoff
+                _TIMER = threading.Timer(delay, _on_timer)
+                _TIMER.daemon = True
+                _TIMER.start()
+            if _CONSECUTIVE_FAILURES == 1 or delay != previous_delay:
+                print(f"DB Batcher: WARNING - Flush of {len(batch)} update(s) failed ({_CONSECUTIVE_FAILURES} in a row). Re-queued, retrying in {delay:.1f}s.")
+            return False
+
+        if _CONSECUTIVE_FAILURES:
+            print(f"DB Batcher: Write recovered after {_CONSECUTIVE_FAILURES} failed attempt(s).")
+            _CONSECUTIVE_FAILURES = 0
+            _METRICS["retry_delay_seconds"] = None
+        _METRICS["flush_count"] += 1
+        _METRICS["updates_flushed"] += len(batch)
+        _METRICS["last_flush_duration_seconds"] = round(duration, 3)
+        if explicit:
+            _METRICS["explicit_flush_count"] += 1
+        print(f"DB Batcher: Flushed {len(batch)} update(s) in one write ({duration:.2f}s, explicit={explicit}).")
+        return True
+
+def get_metrics() -> dict:
+    metrics = dict(_METRICS)
+    metrics["window_ms"] = DB_WRITE_COALESCE_WINDOW_MS
+    metrics["pending"] = len(_PENDING)
+    metrics["consecutive_failures"] = _CONSECUTIVE_FAILURES
+    # Updates per write: 1.0 means no coalescing happened, higher is better.
+    metrics["coalescing_ratio"] = round(metrics["updates_flushed"] / metrics["flush_count"], 2) if metrics["flush_count"] else None
+    return metrics
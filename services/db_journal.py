@@ -0,0 +1,142 @@
+import os
+import sys
+import json
+import time
+import threading
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from config import DB_JOURNAL_FOLDER_NAME, DB_JOURNAL_COMPACT_THRESHOLD
+from services import gdrive
+
+# Append-only journal for the recipe DB.
+# Each write becomes one small JSON file in <app data folder>/DB_JOURNAL_FOLDER_NAME, named
+# "<time_ns>_<seq>.json" so that sorting by name gives the order in which deltas were written.
+# The snapshot (DB_JSON_FILENAME_ON_DRIVE) lists the deltas folded into it in "journal_folded_deltas", so replay
+# skips exactly those (even if a compaction only partially deleted them) and compaction deletes exactly those.
+# Names alone can't decide this: another process may append a delta with an older timestamp after we listed the
+# journal. "journal_applied_through" (the newest delta seen) is kept for snapshots written before the list existed.
+#
+# Delta ops:
+#   {"op": "patch_recipe",   "recipe_id": ..., "fields": {...}}  -> merge fields into the recipe record
+#   {"op": "replace_recipe", "recipe_id": ..., "record": {...}}  -> overwrite the recipe record
+#   {"op": "set_key",        "key": ...,       "value": ...}     -> set a top-level DB key
+#   {"op": "batch",          "deltas": [...]}                    -> apply each delta in order (coalesced writes)
+
+JOURNAL_MARKER_KEY = "journal_applied_through"
+JOURNAL_FOLDED_KEY = "journal_folded_deltas"
+
+_PENDING_DELTA_COUNT = 0 # Deltas on GDrive that are not yet folded into the snapshot
+_APPLIED = set() # Names of journal deltas contained in the cached DB (replayed or appended) and not yet deleted
+_SEQ = 0
+_LOCK = threading.Lock()
+
+def _get_journal_folder_id(service) -> str:
+    app_data_folder_id = gdrive.get_or_create_app_data_folder_id(service=service)
+    return gdrive.get_or_create_folder_id(app_data_folder_id, DB_JOURNAL_FOLDER_NAME, service=service)
+
+def _next_delta_name() -> str:
+    global _SEQ
+    with _LOCK:
+        _SEQ = (_SEQ + 1) % 1000000
+        return f"{time.time_ns():020d}_{_SEQ:06d}.json"
+
+def apply_delta(db: dict, delta: dict):
+    """Applies one journal delta to an in-memory DB dict."""
+    op = delta.get("op")
+    recipes = db.setdefault("recipes", {})
+    if op == "patch_recipe":
+        recipe_id = delta["recipe_id"]
+        record = recipes.setdefault(recipe_id, {"id": recipe_id})
+        record.update(delta.get("fields", {}))
+    elif op == "replace_recipe":
+        recipes[delta["recipe_id"]] = dict(delta.get("record", {}))
+    elif op == "set_key":
+        db[delta["key"]] = delta.get("value")
+    elif op == "batch":
+        for sub_delta in delta.get("deltas", []):
+            apply_delta(db, sub_delta)
+    else:
+        print(f"DB Journal: WARNING - Ignoring delta with unknown op '{op}'.")
+
+def append_delta(db: dict, delta: dict, service) -> bool:
+    """
+    Persists one delta to the GDrive journal. The caller has already applied it to db (the cached copy);
+    db's journal marker is advanced so that a later compaction snapshot covers this delta.
+    Returns True if the delta was written.
+    """
+    global _PENDING_DELTA_COUNT
+    delta_name = _next_delta_name()
+    payload = json.dumps(delta, separators=(',', ':')).encode('utf-8')
+    try:
+        folder_id = _get_journal_folder_id(service)
+        gdrive.upload_bytes_to_drive(payload, folder_id, delta_name, mimetype='application/json', service=service)
+    except Exception as e:
+        print(f"DB Journal: ERROR - Failed to append delta {delta_name}: {e}")
+        return False
+    with _LOCK:
+        db[JOURNAL_MARKER_KEY] = max(delta_name, db.get(JOURNAL_MARKER_KEY) or "")
+        _APPLIED.add(delta_name)
+        _PENDING_DELTA_COUNT += 1
+    print(f"DB Journal: Appended {delta.get('op')} delta {delta_name} ({len(payload)} bytes). Pending deltas: {_PENDING_DELTA_COUNT}")
+    return True
+
+def replay_journal(db: dict, service) -> int:
+    """Applies every delta the snapshot db does not contain yet, in order. Returns the number applied."""
+    global _PENDING_DELTA_COUNT, _APPLIED
+    folder_id = _get_journal_folder_id(service)
+    entries = sorted(gdrive.list_files_in_folder(folder_id, service=service), key=lambda f: f['name'])
+    pending = pending_entries(db, entries)
+    for entry in pending:
+        content = gdrive.get_file_content_from_drive(entry['id'], service=service)
+        if not content:
+            continue
+        try:
+            apply_delta(db, json.loads(content))
+        except (json.JSONDecodeError, KeyError) as e:
+            print(f"DB Journal: WARNING - Skipping unreadable delta {entry['name']}: {e}")
+        db[JOURNAL_MARKER_KEY] = max(entry['name'], db.get(JOURNAL_MARKER_KEY) or "")
+    with _LOCK:
+        _APPLIED = {f['name'] for f in entries} # The cache now contains every delta in the journal
+        _PENDING_DELTA_COUNT = len(entries) # Folded-in-but-not-deleted deltas still count towards compaction
+    if pending:
+        print(f"DB Journal: Replayed {len(pending)} delta(s) on top of snapshot.")
+    return len(pending)
+
+def pending_entries(db: dict, entries: list) -> list:
+    """The journal entries (sorted by name) that the snapshot db does not contain."""
+    folded = db.get(JOURNAL_FOLDED_KEY)
+    if folded is None: # Snapshot from before the folded list: it contains everything up to its marker
+        marker = db.get(JOURNAL_MARKER_KEY) or ""
+        return [f for f in entries if f['name'] > marker]
+    folded = set(folded)
+    return [f for f in entries if f['name'] not in folded]
+
+def folded_deltas() -> set:
+    """Names of the deltas a snapshot of the cached DB taken now would contain (see compact_db_journal)."""
+    with _LOCK:
+        return set(_APPLIED)
+
+def needs_compaction() -> bool:
+    return _PENDING_DELTA_COUNT >= DB_JOURNAL_COMPACT_THRESHOLD
+
+def delete_compacted_deltas(names: set | None, service) -> int:
+    """Deletes the deltas named in names (the ones folded into the saved snapshot), or every delta if names is None."""
+    global _PENDING_DELTA_COUNT
+    try:
+        folder_id = _get_journal_folder_id(service)
+        entries = gdrive.list_files_in_folder(folder_id, service=service)
+    except Exception as e:
+        print(f"DB Journal: ERROR - Could not list journal for compaction: {e}")
+        return 0
+    deleted = set()
+    for entry in entries:
+        if (names is None or entry['name'] in names) and gdrive.delete_file_from_drive(entry['id'], service=service):
+            deleted.add(entry['name'])
+    remaining = len(entries) - len(deleted)
+    with _LOCK:
+        _APPLIED.difference_update(deleted)
+        if names is None:
+            _APPLIED.clear()
+        _PENDING_DELTA_COUNT = remaining
+    print(f"DB Journal: Compaction removed {len(deleted)} delta(s); {remaining} remain.")
+    return len(deleted)
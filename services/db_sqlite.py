@@ -0,0 +1,187 @@
+import os
+import sys
+import json
+import time
+import sqlite3
+import threading
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from config import DB_SQLITE_PATH, DB_SQLITE_REPLICATION_INTERVAL_SECONDS
+
+# Local SQLite store for DB_STORAGE_MODE == "sqlite".
+# Recipes are stored one row per recipe (full record as JSON, status duplicated into its own indexed column);
+# top-level DB keys such as last_gdrive_scan live in the meta table.
+# GDrive is only a replica: every write bumps _GENERATION and the replicator thread uploads a snapshot
+# whenever the generation it last replicated is behind.
+
+_THREAD_LOCAL = threading.local()
+_GENERATION = 0
+_REPLICATED_GENERATION = 0
+_GENERATION_LOCK = threading.Lock()
+_REPLICATOR_THREAD = None
+_REPLICATOR_STOP = threading.Event()
+
+def _connect() -> sqlite3.Connection:
+    conn = getattr(_THREAD_LOCAL, "conn", None)
+    if conn is None:
+        os.makedirs(os.path.dirname(DB_SQLITE_PATH), exist_ok=True)
+        # isolation_level=None: transactions are explicit (BEGIN IMMEDIATE for read-modify-write).
+        conn = sqlite3.connect(DB_SQLITE_PATH, timeout=30, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("""CREATE TABLE IF NOT EXISTS recipes (
+            id TEXT PRIMARY KEY,
+            status TEXT,
+            last_updated TEXT,
+            record TEXT NOT NULL
+        )""")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_recipes_status ON recipes(status)")
+        conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        _THREAD_LOCAL.conn = conn
+    return conn
+
+def _mark_dirty():
+    global _GENERATION
+    with _GENERATION_LOCK:
+        _GENERATION += 1
+
+def _upsert_recipe(conn: sqlite3.Connection, recipe_id: str, record: dict):
+    conn.execute(
+        "INSERT INTO recipes (id, status, last_updated, record) VALUES (?, ?, ?, ?) "
+        "ON CONFLICT(id) DO UPDATE SET status=excluded.status, last_updated=excluded.last_updated, record=excluded.record",
+        (recipe_id, record.get("status"), record.get("last_updated"), json.dumps(record))
+    )
+
+def is_empty() -> bool:
+    conn = _connect()
+    return conn.execute("SELECT 1 FROM recipes LIMIT 1").fetchone() is None and \
+        conn.execute("SELECT 1 FROM meta LIMIT 1").fetchone() is None
+
+def get_recipe(recipe_id: str) -> dict | None:
+    row = _connect().execute("SELECT record FROM recipes WHERE id = ?", (recipe_id,)).fetchone()
+    return json.loads(row[0]) if row else None
+
+def get_all_recipes() -> dict:
+    rows = _connect().execute("SELECT id, record FROM recipes").fetchall()
+    return {recipe_id: json.loads(record) for recipe_id, record in rows}
+
+def load_all() -> dict:
+    """Returns the whole DB in the same shape as the GDrive JSON snapshot."""
+    db = {"recipes": get_all_recipes(), "last_gdrive_scan": None}
+    for key, value in _connect().execute("SELECT key, value FROM meta").fetchall():
+        db[key] = json.loads(value)
+    return db
+
+def apply_delta(delta: dict) -> bool:
+    """Applies one delta (same format as services.db_journal) inside a single local transaction."""
+    op = delta.get("op")
+    conn = _connect()
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        if op == "patch_recipe":
+            recipe_id = delta["recipe_id"]
+            row = conn.execute("SELECT record FROM recipes WHERE id = ?", (recipe_id,)).fetchone()
+            record = json.loads(row[0]) if row else {"id": recipe_id}
+            record.update(delta.get("fields", {}))
+            _upsert_recipe(conn, recipe_id, record)
+        elif op == "replace_recipe":
+            _upsert_recipe(conn, delta["recipe_id"], dict(delta.get("record", {})))
+        elif op == "set_key":
+            conn.execute(
+                "INSERT INTO meta (key, value) VALUES (?, ?) ON CONFLICT(key) DO UPDATE SET value=excluded.value",
+                (delta["key"], json.dumps(delta.get("value")))
+            )
+        else:
+            conn.execute("ROLLBACK")
+            print(f"DB SQLite: WARNING - Ignoring delta with unknown op '{op}'.")
+            return False
+        conn.execute("COMMIT")
+    except Exception as e:
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")
+        print(f"DB SQLite: ERROR - Failed to apply {op} delta: {e}")
+        return False
+    _mark_dirty()
+    return True
+
+def replace_all(db_content: dict) -> bool:
+    """Replaces the entire local DB with db_content (used by save_db, hard reset and seeding)."""
+    conn = _connect()
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        conn.execute("DELETE FROM recipes")
+        conn.execute("DELETE FROM meta")
+        for recipe_id, record in db_content.get("recipes", {}).items():
+            _upsert_recipe(conn, recipe_id, record)
+        for key, value in db_content.items():
+            if key != "recipes":
+                conn.execute("INSERT INTO meta (key, value) VALUES (?, ?)", (key, json.dumps(value)))
+        conn.execute("COMMIT")
+    except Exception as e:
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")
+        print(f"DB SQLite: ERROR - Failed to replace local DB: {e}")
+        return False
+    _mark_dirty()
+    return True
+
+def seed_from_drive_if_empty():
+    """On a fresh disk (e.g. ephemeral Render storage) pull the last replicated snapshot from GDrive.
+    The snapshot is loaded with the DB journal replayed on top, so deltas written in journal mode are not lost."""
+    if not is_empty():
+        print(f"DB SQLite: Using existing local DB at {DB_SQLITE_PATH}.")
+        return
+    from utils import _load_db_from_drive
+    from services import db_journal
+    print(f"DB SQLite: Local DB at {DB_SQLITE_PATH} is empty. Seeding from GDrive snapshot and journal...")
+    db_content = _load_db_from_drive()
+    if db_content.get("gdrive_error") or db_content.get("unexpected_error"):
+        print("DB SQLite: WARNING - GDrive snapshot unavailable. Starting with an empty local DB.")
+        return
+    global _REPLICATED_GENERATION
+    folded = db_journal.folded_deltas()
+    db_content = dict(db_content, **{db_journal.JOURNAL_FOLDED_KEY: sorted(folded)}) # Replicas contain the replayed deltas
+    replace_all(db_content)
+    if not folded: # Drive already has exactly this content; replayed journal deltas still need replicating
+        with _GENERATION_LOCK:
+            _REPLICATED_GENERATION = _GENERATION
+    print(f"DB SQLite: Seeded {len(db_content.get('recipes', {}))} recipe(s) from GDrive.")
+
+def replicate_now() -> bool:
+    """Pushes a snapshot to GDrive if the local DB changed since the last successful replication."""
+    global _REPLICATED_GENERATION
+    with _GENERATION_LOCK:
+        generation = _GENERATION
+    if generation == _REPLICATED_GENERATION:
+        return True
+    from utils import _save_db_to_drive
+    started = time.time()
+    if not _save_db_to_drive(load_all()):
+        print("DB SQLite: WARNING - Replication to GDrive failed. Will retry on the next cycle.")
+        return False
+    _REPLICATED_GENERATION = generation
+    print(f"DB SQLite: Replicated generation {generation} to GDrive in {time.time() - started:.2f}s.")
+    return True
+
+def _replicator_loop():
+    while not _REPLICATOR_STOP.wait(DB_SQLITE_REPLICATION_INTERVAL_SECONDS):
+        try:
+            replicate_now()
+        except Exception as e:
+            print(f"DB SQLite: ERROR - Unexpected error in replicator: {e}")
+
+def start_replicator():
+    global _REPLICATOR_THREAD
+    if _REPLICATOR_THREAD and _REPLICATOR_THREAD.is_alive():
+        return
+    _REPLICATOR_STOP.clear()
+    _REPLICATOR_THREAD = threading.Thread(target=_replicator_loop, name="db-sqlite-replicator", daemon=True)
+    _REPLICATOR_THREAD.start()
+    print(f"DB SQLite: Replicator started (interval {DB_SQLITE_REPLICATION_INTERVAL_SECONDS}s).")
+
+def stop_replicator():
+    """Stops the replicator thread and performs a final replication."""
+    _REPLICATOR_STOP.set()
+    if _REPLICATOR_THREAD:
+        _REPLICATOR_THREAD.join(timeout=5)
+    replicate_now()
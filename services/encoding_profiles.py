@@ -0,0 +1,108 @@
+import os
+import sys
+import threading
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from config import DEFAULT_ENCODING_PROFILE, MERGE_SEGMENT_PRESET, MERGE_SEGMENT_CRF, MERGE_SEGMENT_FPS, PREVIEW_PROXY_MAX_LINES
+
+# Named encoder settings for the merge. A recipe's profile is stored in its record ("encoding_profile") and can be
+# chosen per request (/fetch_clips, /trigger_next_step); recipes without one use DEFAULT_ENCODING_PROFILE.
+#
+#   preset / crf      libx264 speed/quality trade-off for every encode the merge runs
+#   fps               output frame rate of normalized segments and the re-encoded timeline
+#   max_lines         downscale so the short side is at most this, e.g. 720 = 720p in landscape or portrait (None keeps the size)
+#   maxrate_ladder    [(min lines, kbit/s), ...] caps the CRF encode at a bitrate picked by the output's short side
+#   gop_seconds       keyframe interval (None leaves it to libx264)
+#   audio_bitrate     AAC bitrate of the background music
+#   faststart         move the moov atom to the front of the final file
+#
+# The stream-copy fast path does not re-encode matching clips, so there the profile only affects outliers and audio.
+
+# YouTube's recommended upload bitrates for SDR at 24-30 fps.
+YOUTUBE_MAXRATE_LADDER = [(2160, 45000), (1440, 16000), (1080, 8000), (720, 5000), (480, 2500), (0, 1000)]
+
+PROFILES = {
+    "draft": {
+        "description": "Fastest encode for previews: ultrafast, 720p at most.",
+        "preset": "ultrafast", "crf": 30, "fps": MERGE_SEGMENT_FPS, "max_lines": 720,
+        "maxrate_ladder": None, "gop_seconds": None, "audio_bitrate": "96k", "faststart": True,
+    },
+    "standard": {
+        "description": "Previous fixed merge settings (MERGE_SEGMENT_PRESET / MERGE_SEGMENT_CRF).",
+        "preset": MERGE_SEGMENT_PRESET, "crf": int(MERGE_SEGMENT_CRF), "fps": MERGE_SEGMENT_FPS, "max_lines": None,
+        "maxrate_ladder": None, "gop_seconds": None, "audio_bitrate": "192k", "faststart": False,
+    },
+    "publish": {
+        "description": "Tuned for YouTube ingest: slow preset, capped CRF, half-second GOP, faststart.",
+        "preset": "slow", "crf": 20, "fps": MERGE_SEGMENT_FPS, "max_lines": None,
+        "maxrate_ladder": YOUTUBE_MAXRATE_LADDER, "gop_seconds": 0.5, "audio_bitrate": "384k", "faststart": True,
+    },
+    "archive": {
+        "description": "Near-transparent master: veryslow, low CRF, no bitrate cap.",
+        "preset": "veryslow", "crf": 16, "fps": MERGE_SEGMENT_FPS, "max_lines": None,
+        "maxrate_ladder": None, "gop_seconds": None, "audio_bitrate": "320k", "faststart": True,
+    },
+}
+
+# Not selectable: used for the preview proxy rendered from every final video.
+PROXY_PROFILE = {
+    "name": "proxy", "description": "Low-bitrate preview rendition.",
+    "preset": "veryfast", "crf": 30, "fps": None, "max_lines": PREVIEW_PROXY_MAX_LINES,
+    "maxrate_ladder": [(0, 1000)], "gop_seconds": None, "audio_bitrate": "64k", "faststart": True,
+}
+
+_STATS = {}
+_STATS_LOCK = threading.Lock()
+
+def is_valid(name: str | None) -> bool:
+    return name in PROFILES
+
+def resolve_name(name: str | None) -> str:
+    """Returns name if it is a known profile, else DEFAULT_ENCODING_PROFILE (or "standard" if that is unknown too)."""
+    if name in PROFILES:
+        return name
+    if name:
+        print(f"Encoding Profiles: WARNING - Unknown profile '{name}'. Using '{DEFAULT_ENCODING_PROFILE}'.")
+    return DEFAULT_ENCODING_PROFILE if DEFAULT_ENCODING_PROFILE in PROFILES else "standard"
+
+def get_profile(name: str | None) -> dict:
+    resolved = resolve_name(name)
+    return dict(PROFILES[resolved], name=resolved)
+
+def fit_size(width: int, height: int, profile: dict) -> tuple:
+    """Scales (width, height) down to the profile's max_lines, keeping the aspect ratio and even dimensions."""
+    max_lines = profile.get("max_lines")
+    if max_lines and min(width, height) > max_lines:
+        scale = max_lines / min(width, height)
+        width, height = round(width * scale), round(height * scale)
+    return width - width % 2, height - height % 2
+
+def video_rate_args(profile: dict, output_size: tuple | None) -> list:
+    """libx264 preset/CRF arguments for the profile, plus -maxrate/-bufsize from its ladder and the GOP size."""
+    args = ['-preset', profile["preset"], '-crf', str(profile["crf"])]
+    ladder = profile.get("maxrate_ladder")
+    if ladder:
+        lines = min(output_size) if output_size else 0 # 1080x1920 portrait is "1080p"
+        kbps = next((rate for min_lines, rate in ladder if lines >= min_lines), ladder[-1][1])
+        args += ['-maxrate', f"{kbps}k", '-bufsize', f"{kbps * 2}k"]
+    if profile.get("gop_seconds") and profile.get("fps"):
+        args += ['-g', str(max(1, round(float(profile["fps"]) * profile["gop_seconds"])))]
+    return args
+
+def record_run(name: str, merge_path: str | None, media_seconds: float, wall_seconds: float):
+    """Accumulates throughput for a finished render (seconds of output video per second of wall time)."""
+    with _STATS_LOCK:
+        stats = _STATS.setdefault(name, {"runs": 0, "media_seconds": 0.0, "wall_seconds": 0.0, "by_merge_path": {}})
+        stats["runs"] += 1
+        stats["media_seconds"] += media_seconds
+        stats["wall_seconds"] += wall_seconds
+        stats["by_merge_path"][merge_path] = stats["by_merge_path"].get(merge_path, 0) + 1
+
+def get_stats() -> dict:
+    with _STATS_LOCK:
+        stats = {name: dict(entry, by_merge_path=dict(entry["by_merge_path"])) for name, entry in _STATS.items()}
+    for entry in stats.values():
+        entry["speed_x_realtime"] = round(entry["media_seconds"] / entry["wall_seconds"], 2) if entry["wall_seconds"] else None
+        entry["media_seconds"] = round(entry["media_seconds"], 1)
+        entry["wall_seconds"] = round(entry["wall_seconds"], 1)
+    return {"default": resolve_name(None), "profiles": sorted(PROFILES), "throughput": stats}
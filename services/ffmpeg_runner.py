@@ -0,0 +1,177 @@
+import os
+import sys
+import signal
+import asyncio
+import threading
+import subprocess
+from collections import deque
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from config import MERGE_SEGMENT_WORKERS
+
+# Runs ffmpeg (and ffprobe) without buffering its output: stdout carries "-progress pipe:1" key=value blocks that are parsed as
+# they arrive, and only the last STDERR_TAIL_LINES lines of stderr are kept (for error messages).
+# Built on asyncio subprocesses; run_ffmpeg() is the blocking entry point for worker threads (each call gets its
+# own event loop), run_ffmpeg_async() can be awaited directly.
+# On POSIX ffmpeg gets its own process group (session), and termination signals the whole group so nothing
+# ffmpeg spawned outlives a cancelled or timed-out run.
+
+STDERR_TAIL_LINES = 40
+CANCEL_POLL_SECONDS = 0.5
+TERMINATE_GRACE_SECONDS = 5
+
+# CPU budget shared by every background encode in the process (the merge's per-clip encodes and the audio library's
+# analysis and renditions): at most MERGE_SEGMENT_WORKERS run at once, each with a fixed thread count.
+ENCODE_SLOTS = threading.BoundedSemaphore(MERGE_SEGMENT_WORKERS)
+ENCODER_THREADS = max(1, (os.cpu_count() or 1) // MERGE_SEGMENT_WORKERS)
+
+class FFmpegError(Exception):
+    def __init__(self, message: str, returncode: int | None = None, stderr_tail: str = ""):
+        super().__init__(message)
+        self.returncode = returncode
+        self.stderr_tail = stderr_tail
+
+class FFmpegCancelled(FFmpegError):
+    pass
+
+def _parse_seconds(block: dict) -> float | None:
+    # out_time_us is microseconds; out_time_ms is also microseconds (long-standing ffmpeg quirk)
+    for key in ("out_time_us", "out_time_ms"):
+        value = block.get(key, "")
+        if value.lstrip("-").isdigit():
+            return max(0.0, int(value) / 1_000_000)
+    hours, _, rest = block.get("out_time", "").partition(":")
+    minutes, _, seconds = rest.partition(":")
+    try:
+        return max(0.0, int(hours) * 3600 + int(minutes) * 60 + float(seconds))
+    except ValueError:
+        return None
+
+def _parse_float(value: str | None) -> float | None:
+    try:
+        return float((value or "").rstrip("x"))
+    except ValueError:
+        return None # "N/A" until ffmpeg has output
+
+def _snapshot(block: dict, duration_seconds: float | None) -> dict:
+    out_time = _parse_seconds(block)
+    snapshot = {
+        "out_time_seconds": round(out_time, 2) if out_time is not None else None,
+        "fps": _parse_float(block.get("fps")),
+        "speed": _parse_float(block.get("speed")),
+        "done": block.get("progress") == "end",
+        "percent": None,
+    }
+    if duration_seconds and out_time is not None:
+        snapshot["percent"] = 100.0 if snapshot["done"] else round(min(99.9, out_time * 100 / duration_seconds), 1)
+    return snapshot
+
+def _signal_group(proc, sig):
+    try:
+        if os.name == 'nt':
+            proc.terminate() # TerminateProcess; Windows has no process-group signal to send
+        else:
+            os.killpg(proc.pid, sig) # pid == pgid: started with start_new_session
+    except ProcessLookupError:
+        pass # Already gone
+
+async def _terminate(proc):
+    if proc.returncode is not None:
+        return
+    _signal_group(proc, signal.SIGTERM)
+    try:
+        await asyncio.wait_for(proc.wait(), TERMINATE_GRACE_SECONDS)
+    except asyncio.TimeoutError:
+        _signal_group(proc, getattr(signal, "SIGKILL", signal.SIGTERM))
+        await proc.wait()
+
+async def _run_process_async(command: list, read_stdout, cancel_event=None, timeout: float | None = None) -> str:
+    """
+    Runs command in its own process group, with read_stdout(stream) consuming stdout as it arrives and the stderr tail
+    kept. Shared by run_ffmpeg_async() and run_ffprobe_async(). Returns the stderr tail; raises FFmpegCancelled when
+    cancel_event is set, FFmpegError on a non-zero exit or timeout.
+    """
+    tool_name = os.path.basename(command[0])
+    creationflags = subprocess.CREATE_NO_WINDOW if os.name == 'nt' else 0
+    try:
+        proc = await asyncio.create_subprocess_exec(
+            *command, stdin=asyncio.subprocess.DEVNULL, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE,
+            creationflags=creationflags, start_new_session=os.name != 'nt'
+        )
+    except OSError as e:
+        raise FFmpegError(f"Could not start {command[0]}: {e}")
+    stderr_tail = deque(maxlen=STDERR_TAIL_LINES)
+
+    async def _read_stderr():
+        async for line in proc.stderr:
+            stderr_tail.append(line.decode(errors='replace').rstrip())
+
+    async def _wait_for_cancel():
+        while not cancel_event.is_set():
+            await asyncio.sleep(CANCEL_POLL_SECONDS)
+
+    main = asyncio.ensure_future(asyncio.gather(_read_stderr(), read_stdout(proc.stdout), proc.wait()))
+    canceller = asyncio.ensure_future(_wait_for_cancel()) if cancel_event is not None else None
+    try:
+        done, _ = await asyncio.wait([t for t in (main, canceller) if t], timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        if canceller:
+            canceller.cancel()
+    if main not in done:
+        await _terminate(proc)
+        await asyncio.gather(main, return_exceptions=True) # Pipes hit EOF once the process is gone
+        tail = "\n".join(stderr_tail)
+        if canceller in done:
+            raise FFmpegCancelled(f"{tool_name} cancelled", proc.returncode, tail)
+        raise FFmpegError(f"{tool_name} timed out after {timeout}s", proc.returncode, tail)
+    main.result() # Re-raises reader errors
+
+    tail = "\n".join(stderr_tail)
+    if proc.returncode != 0:
+        raise FFmpegError(f"{tool_name} exited with RC {proc.returncode}: {tail[-500:]}", proc.returncode, tail)
+    return tail
+
+async def run_ffmpeg_async(args: list, duration_seconds: float | None = None, on_progress=None, cancel_event=None, timeout: float | None = None) -> str:
+    """
+    Runs the ffmpeg command args (args[0] is the binary). on_progress(snapshot) is called for every progress block with
+    out_time_seconds, fps, speed, percent (if duration_seconds is known) and done. cancel_event is any object with
+    is_set() (e.g. threading.Event); setting it terminates ffmpeg and raises FFmpegCancelled.
+    Returns the stderr tail; raises FFmpegError on a non-zero exit or timeout.
+    """
+    command = [args[0], '-progress', 'pipe:1', '-nostats', *args[1:]]
+
+    async def _read_progress(stream):
+        block = {}
+        async for line in stream:
+            key, _, value = line.decode(errors='replace').strip().partition("=")
+            block[key] = value
+            if key == "progress": # Last key of every block
+                if on_progress:
+                    try:
+                        on_progress(_snapshot(block, duration_seconds))
+                    except Exception as e:
+                        print(f"FFmpeg Runner: WARNING - Progress callback failed: {e}")
+                block = {}
+
+    return await _run_process_async(command, _read_progress, cancel_event, timeout)
+
+async def run_ffprobe_async(args: list, cancel_event=None, timeout: float | None = None) -> str:
+    """
+    Runs the ffprobe command args (args[0] is the binary) and returns its stdout. ffprobe has no progress output;
+    cancellation, timeout and process-group termination work as in run_ffmpeg_async().
+    """
+    output = []
+
+    async def _read_output(stream):
+        output.append(await stream.read())
+
+    await _run_process_async(list(args), _read_output, cancel_event, timeout)
+    return b"".join(output).decode(errors='replace')
+
+def run_ffmpeg(args: list, duration_seconds: float | None = None, on_progress=None, cancel_event=None, timeout: float | None = None) -> str:
+    """Blocking run_ffmpeg_async() for code running in a worker thread (no event loop of its own)."""
+    return asyncio.run(run_ffmpeg_async(args, duration_seconds, on_progress, cancel_event, timeout))
+
+def run_ffprobe(args: list, cancel_event=None, timeout: float | None = None) -> str:
+    """Blocking run_ffprobe_async() for code running in a worker thread (no event loop of its own)."""
+    return asyncio.run(run_ffprobe_async(args, cancel_event, timeout))
@@ -0,0 +1,84 @@
+import os
+import sys
+import time
+import threading
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from config import FOLDER_CATALOG_REFRESH_SECONDS
+from services import gdrive
+
+# In-memory snapshot of the enriched recipe folder list shown on /select_folder.
+# A daemon thread rebuilds it every FOLDER_CATALOG_REFRESH_SECONDS (a Changes API delta call plus a cached
+# DB read), so the page handler never waits on GDrive; it just reads the latest snapshot and its age.
+# The thread uses its own Drive client because httplib2 clients must not be shared across threads.
+
+_SNAPSHOT = {"folders": [], "refreshed_at": None, "error": None, "refresh_duration_seconds": None}
+_SNAPSHOT_LOCK = threading.Lock()
+_REFRESH_LOCK = threading.Lock() # One rebuild at a time; a manual refresh waits for an in-flight one
+_REFRESHER_THREAD = None
+_REFRESHER_STOP = threading.Event()
+_REFRESHER_WAKE = threading.Event()
+_SERVICE = None
+
+def _get_service():
+    global _SERVICE
+    if _SERVICE is None:
+        _SERVICE = gdrive.create_gdrive_service()
+    return _SERVICE
+
+def refresh_now() -> bool:
+    """Rebuilds the snapshot synchronously. On failure the previous folder list is kept and the error recorded."""
+    with _REFRESH_LOCK:
+        started = time.time()
+        try:
+            folders = gdrive.list_folders_from_gdrive_and_db_status(service=_get_service(), raise_errors=True)
+            error = None
+        except Exception as e:
+            folders, error = None, str(e)
+            print(f"Folder Catalog: ERROR - Refresh failed: {e}")
+        duration = round(time.time() - started, 3)
+        with _SNAPSHOT_LOCK:
+            if folders is not None:
+                _SNAPSHOT["folders"] = folders
+                _SNAPSHOT["refreshed_at"] = time.time()
+            _SNAPSHOT["error"] = error
+            _SNAPSHOT["refresh_duration_seconds"] = duration
+        return error is None
+
+def request_refresh():
+    """Asks the background thread to refresh as soon as possible without waiting for it."""
+    _REFRESHER_WAKE.set()
+
+def get_snapshot() -> dict:
+    """Returns the current folder list plus staleness info; never touches GDrive."""
+    with _SNAPSHOT_LOCK:
+        snapshot = dict(_SNAPSHOT)
+    refreshed_at = snapshot["refreshed_at"]
+    snapshot["age_seconds"] = round(time.time() - refreshed_at, 1) if refreshed_at else None
+    # Stale once two refresh cycles were missed, or if nothing has loaded yet.
+    snapshot["is_stale"] = refreshed_at is None or snapshot["age_seconds"] > 2 * FOLDER_CATALOG_REFRESH_SECONDS
+    return snapshot
+
+def _refresher_loop():
+    while not _REFRESHER_STOP.is_set():
+        try:
+            refresh_now()
+        except Exception as e:
+            print(f"Folder Catalog: ERROR - Unexpected error in refresher: {e}")
+        _REFRESHER_WAKE.wait(FOLDER_CATALOG_REFRESH_SECONDS)
+        _REFRESHER_WAKE.clear()
+
+def start_refresher():
+    global _REFRESHER_THREAD
+    if _REFRESHER_THREAD and _REFRESHER_THREAD.is_alive():
+        return
+    _REFRESHER_STOP.clear()
+    _REFRESHER_THREAD = threading.Thread(target=_refresher_loop, name="folder-catalog-refresher", daemon=True)
+    _REFRESHER_THREAD.start()
+    print(f"Folder Catalog: Refresher started (interval {FOLDER_CATALOG_REFRESH_SECONDS}s).")
+
+def stop_refresher():
+    _REFRESHER_STOP.set()
+    _REFRESHER_WAKE.set()
+    if _REFRESHER_THREAD:
+        _REFRESHER_THREAD.join(timeout=5)
@@ -0,0 +1,113 @@
+import os
+import sys
+import json
+import time
+import threading
+from googleapiclient.errors import HttpError
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from config import GDRIVE_TARGET_FOLDER_ID, DRIVE_FOLDER_INDEX_PATH
+from services import gdrive
+
+# Local index of the recipe folders directly under GDRIVE_TARGET_FOLDER_ID.
+# The first refresh does a full paginated listing and records a Changes API start page token; every later
+# refresh calls changes().list from that token and applies only what moved, so an unchanged Drive costs one
+# small request no matter how many folders exist. The index survives restarts in DRIVE_FOLDER_INDEX_PATH.
+
+_CHANGE_FIELDS = "nextPageToken, newStartPageToken, changes(fileId, removed, file(id, name, mimeType, parents, trashed))"
+
+_LOCK = threading.Lock()
+_INDEX = None # {"parent_id": ..., "start_page_token": ..., "folders": {id: name}, "synced_at": ...}
+_STATS = {"full_syncs": 0, "incremental_syncs": 0, "changes_applied": 0}
+
+def _load_index() -> dict | None:
+    if not os.path.exists(DRIVE_FOLDER_INDEX_PATH):
+        return None
+    try:
+        with open(DRIVE_FOLDER_INDEX_PATH, 'r') as f:
+            index = json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        print(f"Folder Index: WARNING - Ignoring unreadable index file {DRIVE_FOLDER_INDEX_PATH}: {e}")
+        return None
+    # An index built for a different target folder is useless.
+    return index if index.get("parent_id") == GDRIVE_TARGET_FOLDER_ID else None
+
+def _save_index(index: dict):
+    temp_path = DRIVE_FOLDER_INDEX_PATH + ".tmp"
+    with open(temp_path, 'w') as f:
+        json.dump(index, f)
+    os.replace(temp_path, DRIVE_FOLDER_INDEX_PATH)
+
+def _full_sync(service) -> dict:
+    # Take the token before listing, so changes made during the listing are replayed rather than lost.
+    start_page_token = service.changes().getStartPageToken().execute()["startPageToken"]
+    folders = gdrive.list_files_in_folder(GDRIVE_TARGET_FOLDER_ID, service=service, extra_query=f"mimeType = '{gdrive.FOLDER_MIME_TYPE}'")
+    _STATS["full_syncs"] += 1
+    print(f"Folder Index: Full sync listed {len(folders)} folder(s).")
+    return {
+        "parent_id": GDRIVE_TARGET_FOLDER_ID,
+        "start_page_token": start_page_token,
+        "folders": {folder["id"]: folder["name"] for folder in folders},
+        "synced_at": time.time(),
+    }
+
+def _apply_changes(index: dict, service) -> int:
+    page_token = index["start_page_token"]
+    applied = 0
+    while page_token:
+        response = service.changes().list(
+            pageToken=page_token, spaces='drive', pageSize=1000, includeRemoved=True, fields=_CHANGE_FIELDS
+        ).execute()
+        for change in response.get("changes", []):
+            file_id = change.get("fileId")
+            file = change.get("file") or {}
+            is_recipe_folder = (
+                not change.get("removed") and not file.get("trashed")
+                and file.get("mimeType") == gdrive.FOLDER_MIME_TYPE
+                and GDRIVE_TARGET_FOLDER_ID in file.get("parents", [])
+            )
+            if is_recipe_folder:
+                if index["folders"].get(file_id) != file.get("name"):
+                    index["folders"][file_id] = file.get("name")
+                    applied += 1
+            elif index["folders"].pop(file_id, None) is not None: # Deleted, trashed or moved out of the target folder
+                applied += 1
+        if "newStartPageToken" in response:
+            index["start_page_token"] = response["newStartPageToken"]
+        page_token = response.get("nextPageToken")
+    index["synced_at"] = time.time()
+    _STATS["incremental_syncs"] += 1
+    _STATS["changes_applied"] += applied
+    return applied
+
+def refresh(service) -> dict:
+    """Brings the index up to date (full sync the first time, Changes API deltas afterwards) and returns it."""
+    global _INDEX
+    with _LOCK:
+        if _INDEX is None:
+            _INDEX = _load_index()
+        try:
+            if _INDEX is None:
+                _INDEX = _full_sync(service)
+            else:
+                applied = _apply_changes(_INDEX, service)
+                if applied:
+                    print(f"Folder Index: Applied {applied} folder change(s); {len(_INDEX['folders'])} folder(s) indexed.")
+        except HttpError as error:
+            if error.resp.status not in (400, 404, 410):
+                raise
+            # The saved page token expired or is invalid; start over from a fresh listing.
+            print(f"Folder Index: Change token rejected ({error.resp.status}). Falling back to a full sync.")
+            _INDEX = _full_sync(service)
+        _save_index(_INDEX)
+        return _INDEX
+
+def get_folders() -> list:
+    """Returns the indexed folders as [{"id", "name"}], sorted by name."""
+    with _LOCK:
+        folders = dict(_INDEX["folders"]) if _INDEX else {}
+    return [{"id": folder_id, "name": name} for folder_id, name in sorted(folders.items(), key=lambda item: item[1].lower())]
+
+def get_stats() -> dict:
+    with _LOCK:
+        return dict(_STATS, folders=len(_INDEX["folders"]) if _INDEX else 0, synced_at=_INDEX["synced_at"] if _INDEX else None)
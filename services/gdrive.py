@@ -7,8 +7,16 @@ from google.auth.transport.requests import Request
 from google_auth_oauthlib.flow import InstalledAppFlow
 from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
-from googleapiclient.http import MediaIoBaseDownload, MediaFileUpload
+from googleapiclient.http import MediaIoBaseDownload, MediaFileUpload, MediaIoBaseUpload
+import google_auth_httplib2
+import httplib2
 import io
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+import queue
+import random
 import shutil # Added for __main__ test cleanup, though not used in main functions
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
@@ -21,6 +29,15 @@ from config import (
     # For testing block in __main__
     GOOGLE_DRIVE_APP_DATA_FOLDER_NAME,
     DB_JSON_FILENAME_ON_DRIVE,
+    DRIVE_ID_CACHE_TTL_SECONDS,
+    GDRIVE_DOWNLOAD_CHUNK_SIZE_BYTES,
+    GDRIVE_DOWNLOAD_WORKERS,
+    GDRIVE_CLIENT_POOL_SIZE,
+    GDRIVE_CLIENT_HEALTHCHECK_IDLE_SECONDS,
+    GDRIVE_CLIENT_ACQUIRE_TIMEOUT_SECONDS,
+    GDRIVE_HTTP_TIMEOUT_SECONDS,
+    GDRIVE_UPLOAD_CHUNK_SIZE_BYTES,
+    GDRIVE_UPLOAD_MAX_RETRIES,
     APP_ROOT_DIR as APP_ROOT_DIR_CONFIG, # Import APP_ROOT_DIR and alias it for the __main__ block
     RAW_DIR as CONFIG_RAW_DIR,
     # ---- Added for Refactoring ----
@@ -31,37 +48,94 @@ from config import (
 
 SCOPES = ['https://www.googleapis.com/auth/drive'] 
 
+FOLDER_MIME_TYPE = 'application/vnd.google-apps.folder'
+
 class GDriveServiceError(Exception):
     """Custom exception for GDrive service errors."""
     pass
 
-def create_gdrive_service(): # Renamed and simplified
-    """Creates and returns a new Google Drive API service client."""
-    print("GDrive Service Factory: Attempting to create new client...")
-    creds = None
-    if GOOGLE_AUTH_METHOD == "SERVICE_ACCOUNT_INDIVIDUAL_FIELDS" and GOOGLE_SERVICE_ACCOUNT_INFO:
-        print(f"GDrive Auth: Attempting with Service Account (Individual Fields).")
-        try:
-            creds = ServiceAccountCredentials.from_service_account_info(
-                GOOGLE_SERVICE_ACCOUNT_INFO, scopes=SCOPES
-            )
-            print(f"GDrive Auth: Successfully obtained credentials via Service Account (Individual Fields).")
-        except Exception as e:
-            print(f"ERROR: GDrive Auth: Failed to load Service Account from GOOGLE_SERVICE_ACCOUNT_INFO: {e}")
-            # APP_STARTUP_STATUS updates will be handled by the caller (e.g., main.py startup)
-            raise GDriveServiceError(f"Service Account (Individual Fields) credential error: {e}")
-    else:
-        msg = "GDrive Auth: SERVICE_ACCOUNT_INDIVIDUAL_FIELDS method not configured or GOOGLE_SERVICE_ACCOUNT_INFO missing in config.py."
-        print(f"ERROR: {msg}")
-        raise GDriveServiceError(msg)
+# --- Process-wide ID resolution cache ---
+# Maps (parent_id, name, mimeType) -> (file_id, cached_at). mimeType is None for plain file lookups.
+# Only positive results are cached; a 404 on any cached ID drops it so the next lookup goes back to the API.
+_ID_CACHE = {}
+_ID_CACHE_LOCK = threading.Lock()
+_ID_CACHE_STATS = {"hits": 0, "misses": 0, "invalidations": 0}
 
-    if not creds: 
-        msg = f"GDrive Auth: Failed to obtain credentials."
-        print(f"ERROR: {msg}")
-        raise GDriveServiceError(msg)
+def _id_cache_get(parent_id: str, name: str, mime_type: str | None) -> str | None:
+    with _ID_CACHE_LOCK:
+        entry = _ID_CACHE.get((parent_id, name, mime_type))
+        if entry and time.time() - entry[1] < DRIVE_ID_CACHE_TTL_SECONDS:
+            _ID_CACHE_STATS["hits"] += 1
+            return entry[0]
+        if entry:
+            del _ID_CACHE[(parent_id, name, mime_type)]
+        _ID_CACHE_STATS["misses"] += 1
+        return None
+
+def _id_cache_put(parent_id: str, name: str, mime_type: str | None, file_id: str):
+    if file_id:
+        with _ID_CACHE_LOCK:
+            _ID_CACHE[(parent_id, name, mime_type)] = (file_id, time.time())
 
+def invalidate_drive_id_cache(file_id: str = None):
+    """Drops every cache entry pointing at file_id (or the whole cache if file_id is None)."""
+    with _ID_CACHE_LOCK:
+        if file_id is None:
+            _ID_CACHE.clear()
+        else:
+            for key in [k for k, v in _ID_CACHE.items() if v[0] == file_id]:
+                del _ID_CACHE[key]
+        _ID_CACHE_STATS["invalidations"] += 1
+
+def get_drive_id_cache_stats() -> dict:
+    with _ID_CACHE_LOCK:
+        return dict(_ID_CACHE_STATS, entries=len(_ID_CACHE))
+
+# One credentials object is shared by every Drive client, so an access token is fetched once and reused
+# by all of them instead of each client authenticating on its own.
+_SHARED_CREDENTIALS = None
+_CREDENTIALS_LOCK = threading.Lock()
+
+def _get_shared_credentials():
+    global _SHARED_CREDENTIALS
+    with _CREDENTIALS_LOCK:
+        if _SHARED_CREDENTIALS is not None:
+            if not _SHARED_CREDENTIALS.valid:
+                # Refresh here, under the lock, rather than letting several clients race to do it mid-request.
+                _SHARED_CREDENTIALS.refresh(Request())
+            return _SHARED_CREDENTIALS
+
+        creds = None
+        if GOOGLE_AUTH_METHOD == "SERVICE_ACCOUNT_INDIVIDUAL_FIELDS" and GOOGLE_SERVICE_ACCOUNT_INFO:
+            print(f"GDrive Auth: Attempting with Service Account (Individual Fields).")
+            try:
+                creds = ServiceAccountCredentials.from_service_account_info(
+                    GOOGLE_SERVICE_ACCOUNT_INFO, scopes=SCOPES
+                )
+                print(f"GDrive Auth: Successfully obtained credentials via Service Account (Individual Fields).")
+            except Exception as e:
+                print(f"ERROR: GDrive Auth: Failed to load Service Account from GOOGLE_SERVICE_ACCOUNT_INFO: {e}")
+                # APP_STARTUP_STATUS updates will be handled by the caller (e.g., main.py startup)
+                raise GDriveServiceError(f"Service Account (Individual Fields) credential error: {e}")
+        else:
+            msg = "GDrive Auth: SERVICE_ACCOUNT_INDIVIDUAL_FIELDS method not configured or GOOGLE_SERVICE_ACCOUNT_INFO missing in config.py."
+            print(f"ERROR: {msg}")
+            raise GDriveServiceError(msg)
+
+        if not creds: 
+            msg = f"GDrive Auth: Failed to obtain credentials."
+            print(f"ERROR: {msg}")
+            raise GDriveServiceError(msg)
+        _SHARED_CREDENTIALS = creds
+        return creds
+
+def create_gdrive_service(): # Renamed and simplified
+    """Creates and returns a new Google Drive API service client with its own HTTP transport."""
+    print("GDrive Service Factory: Attempting to create new client...")
+    creds = _get_shared_credentials()
     try:
-        service = build('drive', 'v3', credentials=creds)
+        http = google_auth_httplib2.AuthorizedHttp(creds, http=httplib2.Http(timeout=GDRIVE_HTTP_TIMEOUT_SECONDS))
+        service = build('drive', 'v3', http=http, cache_discovery=False)
         print("GDrive Service Factory: Google Drive service client created successfully.")
         return service
     except Exception as e:
@@ -69,6 +143,107 @@ def create_gdrive_service(): # Renamed and simplified
         print(f"ERROR: {msg}")
         raise GDriveServiceError(msg)
 
+# --- Drive client pool ---
+# Background jobs borrow pre-built clients instead of calling create_gdrive_service() per task, so discovery
+# parsing and the TLS handshake happen once per pooled client. A client is only ever used by one thread at a
+# time. Clients idle for a while are health-checked before reuse; clients that hit a transport error are
+# dropped and replaced on demand.
+class DriveClientPool:
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._idle = queue.LifoQueue() # LIFO: reuse the warmest connection first
+        self._lock = threading.Lock()
+        self._created = 0
+        self._stats = {"created": 0, "borrowed": 0, "discarded": 0, "health_check_failures": 0, "wait_count": 0}
+
+    def acquire(self, timeout: float = GDRIVE_CLIENT_ACQUIRE_TIMEOUT_SECONDS):
+        """
+        Returns a healthy client, building one if the pool is below max_size, otherwise waiting for a return.
+        Raises GDriveServiceError if none came back within timeout seconds (a leaked client must not hang jobs).
+        """
+        while True:
+            service, last_used = self._take_idle_or_create(timeout)
+            if last_used is not None and time.time() - last_used > GDRIVE_CLIENT_HEALTHCHECK_IDLE_SECONDS and not self._is_healthy(service):
+                with self._lock:
+                    self._stats["health_check_failures"] += 1
+                self.release(service, discard=True)
+                continue
+            _get_shared_credentials() # Refreshes the shared token up front if it expired
+            with self._lock:
+                self._stats["borrowed"] += 1
+            return service
+
+    def _take_idle_or_create(self, timeout: float | None) -> tuple:
+        """Returns (service, last_used); last_used is None for a freshly built client."""
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            can_create = self._created < self.max_size
+            if can_create:
+                self._created += 1
+        if can_create:
+            try:
+                service = create_gdrive_service()
+            except Exception:
+                with self._lock:
+                    self._created -= 1
+                raise
+            with self._lock:
+                self._stats["created"] += 1
+            return service, None
+        with self._lock:
+            self._stats["wait_count"] += 1
+        try:
+            return self._idle.get(timeout=timeout)
+        except queue.Empty:
+            raise GDriveServiceError(f"Timed out after {timeout}s waiting for a pooled GDrive client.")
+
+    def release(self, service, discard: bool = False):
+        if service is None:
+            return
+        if discard:
+            with self._lock:
+                self._created -= 1
+                self._stats["discarded"] += 1
+            return
+        self._idle.put((service, time.time()))
+
+    def _is_healthy(self, service) -> bool:
+        try:
+            service.about().get(fields="user(emailAddress)").execute()
+            return True
+        except Exception as e:
+            print(f"GDrive Pool: Pooled client failed health check, replacing it: {e}")
+            return False
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            return dict(self._stats, max_size=self.max_size, open_clients=self._created, idle=self._idle.qsize())
+
+DRIVE_CLIENT_POOL = DriveClientPool(GDRIVE_CLIENT_POOL_SIZE)
+
+def acquire_drive_client(timeout: float = GDRIVE_CLIENT_ACQUIRE_TIMEOUT_SECONDS):
+    """Borrows a client from DRIVE_CLIENT_POOL. Pair with release_drive_client() in a finally block."""
+    return DRIVE_CLIENT_POOL.acquire(timeout=timeout)
+
+def release_drive_client(service, discard: bool = False):
+    DRIVE_CLIENT_POOL.release(service, discard=discard)
+
+@contextmanager
+def borrow_drive_client(timeout: float = GDRIVE_CLIENT_ACQUIRE_TIMEOUT_SECONDS):
+    """Context manager form of acquire/release. Transport-level errors discard the client instead of pooling it."""
+    service = acquire_drive_client(timeout=timeout)
+    discard = False
+    try:
+        yield service
+    except (httplib2.HttpLib2Error, OSError):
+        discard = True
+        raise
+    finally:
+        release_drive_client(service, discard=discard)
+
 def check_gdrive_service(service_client) -> bool:
     """
     Performs a basic check of the GDrive service client.
@@ -104,10 +279,14 @@ def find_file_id_by_name(parent_folder_id: str, filename: str, service=None):
             error_msg = "Shared GDrive client not initialized. Called from find_file_id_by_name."
             print(f"ERROR: {error_msg}")
             raise GDriveServiceError(error_msg)
+    cached_id = _id_cache_get(parent_folder_id, filename, None)
+    if cached_id:
+        return cached_id
     try:
         query = f"name = '{filename}' and '{parent_folder_id}' in parents and trashed = false"
-        response = service.files().list(q=query, spaces='drive', fields='files(id, name)').execute()
+        response = service_to_use.files().list(q=query, spaces='drive', fields='files(id, name)').execute()
         for file_item in response.get('files', []):
+            _id_cache_put(parent_folder_id, filename, None, file_item.get('id'))
             return file_item.get('id')
     except HttpError as error:
         print(f"An error occurred while trying to find file '{filename}': {error}")
@@ -126,23 +305,29 @@ def get_or_create_app_data_folder_id(service=None):
     if not GOOGLE_DRIVE_APP_DATA_FOLDER_NAME:
         raise GDriveServiceError("GOOGLE_DRIVE_APP_DATA_FOLDER_NAME is not set in config.")
 
-    query = f"name='{GOOGLE_DRIVE_APP_DATA_FOLDER_NAME}' and mimeType='application/vnd.google-apps.folder' and 'root' in parents and trashed=false"
+    cached_id = _id_cache_get('root', GOOGLE_DRIVE_APP_DATA_FOLDER_NAME, FOLDER_MIME_TYPE)
+    if cached_id:
+        return cached_id
+
+    query = f"name='{GOOGLE_DRIVE_APP_DATA_FOLDER_NAME}' and mimeType='{FOLDER_MIME_TYPE}' and 'root' in parents and trashed=false"
     try:
-        response = service.files().list(q=query, spaces='drive', fields='files(id)').execute()
+        response = service_to_use.files().list(q=query, spaces='drive', fields='files(id)').execute()
         folders = response.get('files', [])
         if folders:
             folder_id = folders[0].get('id')
             print(f"GDrive: Found existing App Data folder '{GOOGLE_DRIVE_APP_DATA_FOLDER_NAME}' with ID: {folder_id}")
+            _id_cache_put('root', GOOGLE_DRIVE_APP_DATA_FOLDER_NAME, FOLDER_MIME_TYPE, folder_id)
             return folder_id
         else:
             print(f"GDrive: App Data folder '{GOOGLE_DRIVE_APP_DATA_FOLDER_NAME}' not found. Creating...")
             file_metadata = {
                 'name': GOOGLE_DRIVE_APP_DATA_FOLDER_NAME,
-                'mimeType': 'application/vnd.google-apps.folder'
+                'mimeType': FOLDER_MIME_TYPE
             }
-            folder = service.files().create(body=file_metadata, fields='id').execute()
+            folder = service_to_use.files().create(body=file_metadata, fields='id').execute()
             folder_id = folder.get('id')
             print(f"GDrive: Created App Data folder '{GOOGLE_DRIVE_APP_DATA_FOLDER_NAME}' with ID: {folder_id}")
+            _id_cache_put('root', GOOGLE_DRIVE_APP_DATA_FOLDER_NAME, FOLDER_MIME_TYPE, folder_id)
             return folder_id
     except HttpError as error:
         print(f"GDrive: An error occurred during get/create app data folder: {error}")
@@ -151,7 +336,16 @@ def get_or_create_app_data_folder_id(service=None):
         print(f"GDrive: An unexpected error in get_or_create_app_data_folder_id: {e}")
         raise GDriveServiceError(f"Unexpected error in get_or_create_app_data_folder_id for '{GOOGLE_DRIVE_APP_DATA_FOLDER_NAME}': {e}")
 
-def upload_file_to_drive(local_file_path: str, drive_folder_id: str, drive_filename: str, mimetype: str = 'application/octet-stream', existing_file_id: str = None, service=None):
+RETRYABLE_HTTP_STATUSES = {429, 500, 502, 503, 504}
+
+def upload_file_to_drive(local_file_path: str, drive_folder_id: str, drive_filename: str, mimetype: str = 'application/octet-stream', existing_file_id: str = None, service=None,
+                         resume_uri: str = None, on_session_uri=None, progress_callback=None, chunk_size: int = GDRIVE_UPLOAD_CHUNK_SIZE_BYTES):
+    """
+    Uploads local_file_path as a resumable session, one chunk at a time, with exponential backoff on 429/5xx and
+    network errors. on_session_uri(uri) is called once the session exists (and with None if it had to be
+    restarted) so the caller can persist it; passing it back as resume_uri after a crash continues the upload
+    from the last byte Drive committed. progress_callback(bytes_sent, total_bytes, bytes_per_second) is called per chunk.
+    """
     service_to_use = service
     if not service_to_use:
         import config # Import the module itself
@@ -165,25 +359,190 @@ def upload_file_to_drive(local_file_path: str, drive_folder_id: str, drive_filen
         if not existing_file_id: 
              file_metadata['parents'] = [drive_folder_id]
 
-        media = MediaFileUpload(local_file_path, mimetype=mimetype, resumable=True)
+        media = MediaFileUpload(local_file_path, mimetype=mimetype, chunksize=chunk_size, resumable=True)
         
         if existing_file_id:
             print(f"GDrive: Updating existing file ID {existing_file_id} with {local_file_path} as {drive_filename}")
-            request = service.files().update(fileId=existing_file_id, body=file_metadata, media_body=media, fields='id')
+            request = service_to_use.files().update(fileId=existing_file_id, body=file_metadata, media_body=media, fields='id')
         else:
             print(f"GDrive: Uploading new file {local_file_path} to folder {drive_folder_id} as {drive_filename}")
-            request = service.files().create(body=file_metadata, media_body=media, fields='id')
-        
-        file_item = request.execute()
+            request = service_to_use.files().create(body=file_metadata, media_body=media, fields='id')
+
+        file_item = None
+        if resume_uri:
+            committed, file_item = _query_upload_session(request.http, resume_uri, request.resumable.size())
+            if file_item is None and committed is None:
+                print(f"GDrive: Upload session for '{drive_filename}' is gone. Starting a new upload.")
+                if on_session_uri:
+                    on_session_uri(None)
+            elif file_item is None:
+                request.resumable_uri = resume_uri
+                request.resumable_progress = committed
+                print(f"GDrive: Resuming upload session for '{drive_filename}' at byte {committed}.")
+
+        if file_item is None:
+            file_item = _run_resumable_upload(request, drive_filename, on_session_uri, progress_callback)
         uploaded_file_id = file_item.get('id')
         print(f"GDrive: File '{drive_filename}' uploaded successfully. File ID: {uploaded_file_id}")
+        _id_cache_put(drive_folder_id, drive_filename, None, uploaded_file_id)
         return uploaded_file_id
     except HttpError as error:
-        print(f"GDrive: An error occurred during file upload: {error}")
-        raise GDriveServiceError(f"Failed to upload file '{drive_filename}': {error}")
+        if not (existing_file_id and error.resp.status == 404):
+            print(f"GDrive: An error occurred during file upload: {error}")
+            raise GDriveServiceError(f"Failed to upload file '{drive_filename}': {error}")
+        invalidate_drive_id_cache(existing_file_id)
     except Exception as e:
         print(f"GDrive: An unexpected error occurred during file upload: {e}")
         raise GDriveServiceError(f"Unexpected error uploading file '{drive_filename}': {e}")
+    # The file to update was deleted since its ID was looked up (callers often probe long before uploading)
+    print(f"GDrive: File ID {existing_file_id} for '{drive_filename}' no longer exists. Uploading it as a new file.")
+    if on_session_uri:
+        on_session_uri(None)
+    return upload_file_to_drive(local_file_path, drive_folder_id, drive_filename, mimetype=mimetype, service=service_to_use,
+                                on_session_uri=on_session_uri, progress_callback=progress_callback, chunk_size=chunk_size)
+
+def _query_upload_session(http, session_uri: str, total_bytes: int) -> tuple:
+    """
+    Asks Drive how much of a resumable session it has committed (an empty PUT with 'Content-Range: bytes */size').
+    Returns (committed_bytes, None) for an open session, (None, file_item) if the upload had already completed
+    and (None, None) if the session expired.
+    """
+    resp, content = http.request(session_uri, "PUT", headers={"Content-Range": f"bytes */{total_bytes}", "Content-Length": "0"})
+    if resp.status in (200, 201):
+        return None, json.loads(content)
+    if resp.status == 308:
+        committed_range = resp.get("range") # "bytes=0-<last byte>"; absent if nothing was committed yet
+        return (int(committed_range.rsplit("-", 1)[1]) + 1 if committed_range else 0), None
+    if resp.status in (404, 410):
+        return None, None
+    raise HttpError(resp, content, uri=session_uri)
+
+def _run_resumable_upload(request, drive_filename: str, on_session_uri, progress_callback) -> dict:
+    total_bytes = request.resumable.size()
+    chunk_size = request.resumable.chunksize()
+    started = time.time()
+    transferred = 0 # Bytes sent by this call (excludes what Drive already had when resuming)
+    reported_uri = request.resumable_uri
+    retries = 0
+    response = None
+    while response is None:
+        before = request.resumable_progress
+        try:
+            status, response = request.next_chunk()
+        except HttpError as error:
+            if error.resp.status in (404, 410) and request.resumable_uri:
+                # The session expired or was never valid; start a fresh one from byte 0.
+                print(f"GDrive: Upload session for '{drive_filename}' is gone ({error.resp.status}). Restarting upload.")
+                request.resumable_uri = None
+                request.resumable_progress = 0
+                reported_uri = None
+                if on_session_uri:
+                    on_session_uri(None)
+                continue
+            if error.resp.status not in RETRYABLE_HTTP_STATUSES or retries >= GDRIVE_UPLOAD_MAX_RETRIES:
+                raise
+            retries += 1
+            _upload_backoff(drive_filename, retries, f"HTTP {error.resp.status}")
+            continue
+        except (httplib2.HttpLib2Error, OSError) as error:
+            if retries >= GDRIVE_UPLOAD_MAX_RETRIES:
+                raise
+            retries += 1
+            _upload_backoff(drive_filename, retries, str(error))
+            continue
+        retries = 0
+
+        if request.resumable_uri != reported_uri:
+            reported_uri = request.resumable_uri
+            if on_session_uri:
+                on_session_uri(reported_uri)
+        sent = total_bytes if response is not None else status.resumable_progress
+        # A single next_chunk() sends at most one chunk; the bound matters when a resume probe moved 'before'.
+        transferred += sent - max(before, sent - chunk_size)
+        bytes_per_second = transferred / max(time.time() - started, 1e-6)
+        print(f"GDrive Upload {drive_filename}: {100 * sent // max(total_bytes, 1)}% ({sent}/{total_bytes} bytes, {bytes_per_second / (1024 * 1024):.2f} MiB/s).")
+        if progress_callback:
+            progress_callback(sent, total_bytes, bytes_per_second)
+    return response
+
+def _upload_backoff(drive_filename: str, attempt: int, reason: str):
+    delay = min(2 ** attempt, 64) + random.random()
+    print(f"GDrive Upload {drive_filename}: Chunk failed ({reason}). Retry {attempt}/{GDRIVE_UPLOAD_MAX_RETRIES} in {delay:.1f}s.")
+    time.sleep(delay)
+
+def upload_bytes_to_drive(content: bytes, drive_folder_id: str, drive_filename: str, mimetype: str = 'application/json', service=None):
+    """Creates a new file from an in-memory payload (no temp file, single non-resumable request)."""
+    service_to_use = service
+    if not service_to_use:
+        import config # Import the module itself
+        service_to_use = config.GDRIVE_SERVICE_CLIENT # Access the variable via the module
+        if not service_to_use:
+            error_msg = "Shared GDrive client not initialized. Called from upload_bytes_to_drive."
+            print(f"ERROR: {error_msg}")
+            raise GDriveServiceError(error_msg)
+    try:
+        file_metadata = {'name': drive_filename, 'parents': [drive_folder_id]}
+        media = MediaIoBaseUpload(io.BytesIO(content), mimetype=mimetype, resumable=False)
+        file_item = service_to_use.files().create(body=file_metadata, media_body=media, fields='id').execute()
+        return file_item.get('id')
+    except HttpError as error:
+        if error.resp.status == 404:
+            invalidate_drive_id_cache(drive_folder_id)
+        print(f"GDrive: An error occurred uploading bytes as '{drive_filename}': {error}")
+        raise GDriveServiceError(f"Failed to upload '{drive_filename}': {error}")
+
+def list_files_in_folder(folder_id: str, service=None, fields: str = "id, name", extra_query: str = None) -> list:
+    """
+    Lists every non-trashed file directly inside folder_id, following nextPageToken.
+    extra_query (e.g. a mimeType filter) is ANDed onto the query; fields should name only what the caller uses.
+    """
+    service_to_use = service
+    if not service_to_use:
+        import config # Import the module itself
+        service_to_use = config.GDRIVE_SERVICE_CLIENT # Access the variable via the module
+        if not service_to_use:
+            error_msg = "Shared GDrive client not initialized. Called from list_files_in_folder."
+            print(f"ERROR: {error_msg}")
+            raise GDriveServiceError(error_msg)
+    query = f"'{folder_id}' in parents and trashed = false"
+    if extra_query:
+        query += f" and {extra_query}"
+    files, page_token = [], None
+    try:
+        while True:
+            response = service_to_use.files().list(
+                q=query, spaces='drive', pageSize=1000, pageToken=page_token,
+                fields=f"nextPageToken, files({fields})"
+            ).execute()
+            files.extend(response.get('files', []))
+            page_token = response.get('nextPageToken')
+            if not page_token:
+                return files
+    except HttpError as error:
+        if error.resp.status == 404:
+            invalidate_drive_id_cache(folder_id)
+        print(f"GDrive: An error occurred listing folder {folder_id}: {error}")
+        raise GDriveServiceError(f"Failed to list folder '{folder_id}': {error}")
+
+def delete_file_from_drive(file_id: str, service=None) -> bool:
+    service_to_use = service
+    if not service_to_use:
+        import config # Import the module itself
+        service_to_use = config.GDRIVE_SERVICE_CLIENT # Access the variable via the module
+        if not service_to_use:
+            error_msg = "Shared GDrive client not initialized. Called from delete_file_from_drive."
+            print(f"ERROR: {error_msg}")
+            raise GDriveServiceError(error_msg)
+    try:
+        service_to_use.files().delete(fileId=file_id).execute()
+        invalidate_drive_id_cache(file_id)
+        return True
+    except HttpError as error:
+        if error.resp.status == 404:
+            invalidate_drive_id_cache(file_id)
+            return True # Already gone
+        print(f"GDrive: An error occurred deleting file ID {file_id}: {error}")
+        return False
 
 def get_file_content_from_drive(file_id: str, service=None) -> str | None:
     service_to_use = service
@@ -206,6 +565,7 @@ def get_file_content_from_drive(file_id: str, service=None) -> str | None:
     except HttpError as error:
         if error.resp.status == 404:
             print(f"GDrive: File with ID {file_id} not found for download.")
+            invalidate_drive_id_cache(file_id)
             return None 
         print(f"GDrive: An HttpError occurred downloading file ID {file_id}: {error}")
         raise GDriveServiceError(f"Failed to download file content for ID '{file_id}': {error}")
@@ -213,33 +573,233 @@ def get_file_content_from_drive(file_id: str, service=None) -> str | None:
         print(f"GDrive: An unexpected error occurred downloading file ID {file_id}: {e}")
         raise GDriveServiceError(f"Unexpected error downloading file content for ID '{file_id}': {e}")
 
-def get_or_create_recipe_subfolder_id(app_data_folder_id: str, recipe_id: str, subfolder_name: str, service=None):
+def get_file_revision_info(file_id: str, service=None) -> dict | None:
+    """Returns {'id', 'headRevisionId', 'md5Checksum', 'modifiedTime'} for a file, or None if it does not exist."""
     service_to_use = service
     if not service_to_use:
         import config # Import the module itself
         service_to_use = config.GDRIVE_SERVICE_CLIENT # Access the variable via the module
         if not service_to_use:
-            error_msg = "Shared GDrive client not initialized. Called from get_or_create_recipe_subfolder_id."
+            error_msg = "Shared GDrive client not initialized. Called from get_file_revision_info."
             print(f"ERROR: {error_msg}")
             raise GDriveServiceError(error_msg)
-    gd_subfolder_name = f"{recipe_id}_{subfolder_name}"
-    query = f"name='{gd_subfolder_name}' and mimeType='application/vnd.google-apps.folder' and '{app_data_folder_id}' in parents and trashed=false"
     try:
-        response = service.files().list(q=query, spaces='drive', fields='files(id)').execute()
+        return service_to_use.files().get(fileId=file_id, fields='id, headRevisionId, md5Checksum, modifiedTime').execute()
+    except HttpError as error:
+        if error.resp.status == 404:
+            invalidate_drive_id_cache(file_id)
+            return None
+        print(f"GDrive: An error occurred fetching revision info for file ID {file_id}: {error}")
+        raise GDriveServiceError(f"Failed to get revision info for '{file_id}': {error}")
+
+def get_or_create_folder_id(parent_folder_id: str, folder_name: str, service=None) -> str:
+    """Returns the ID of folder_name directly under parent_folder_id, creating it if needed (cached)."""
+    service_to_use = service
+    if not service_to_use:
+        import config # Import the module itself
+        service_to_use = config.GDRIVE_SERVICE_CLIENT # Access the variable via the module
+        if not service_to_use:
+            error_msg = "Shared GDrive client not initialized. Called from get_or_create_folder_id."
+            print(f"ERROR: {error_msg}")
+            raise GDriveServiceError(error_msg)
+    cached_id = _id_cache_get(parent_folder_id, folder_name, FOLDER_MIME_TYPE)
+    if cached_id:
+        return cached_id
+    query = f"name='{folder_name}' and mimeType='{FOLDER_MIME_TYPE}' and '{parent_folder_id}' in parents and trashed=false"
+    try:
+        response = service_to_use.files().list(q=query, spaces='drive', fields='files(id)').execute()
         folders = response.get('files', [])
         if folders:
-            return folders[0].get('id')
+            folder_id = folders[0].get('id')
         else:
             file_metadata = {
-                'name': gd_subfolder_name,
-                'mimeType': 'application/vnd.google-apps.folder',
-                'parents': [app_data_folder_id]
+                'name': folder_name,
+                'mimeType': FOLDER_MIME_TYPE,
+                'parents': [parent_folder_id]
             }
-            folder = service.files().create(body=file_metadata, fields='id').execute()
-            return folder.get('id')
+            folder = service_to_use.files().create(body=file_metadata, fields='id').execute()
+            folder_id = folder.get('id')
+            print(f"GDrive: Created folder '{folder_name}' under {parent_folder_id} with ID: {folder_id}")
+        _id_cache_put(parent_folder_id, folder_name, FOLDER_MIME_TYPE, folder_id)
+        return folder_id
     except HttpError as error:
-        print(f"GDrive: An error occurred during get/create recipe subfolder '{gd_subfolder_name}': {error}")
-        raise GDriveServiceError(f"Failed to get/create recipe subfolder '{gd_subfolder_name}': {error}")
+        if error.resp.status == 404:
+            invalidate_drive_id_cache(parent_folder_id)
+        print(f"GDrive: An error occurred during get/create folder '{folder_name}': {error}")
+        raise GDriveServiceError(f"Failed to get/create folder '{folder_name}': {error}")
+
+def get_or_create_recipe_subfolder_id(app_data_folder_id: str, recipe_id: str, subfolder_name: str, service=None):
+    return get_or_create_folder_id(app_data_folder_id, f"{recipe_id}_{subfolder_name}", service=service)
+
+# --- Batched metadata calls ---
+# Drive accepts up to 100 independent calls in one multipart request to the batch endpoint.
+DRIVE_BATCH_LIMIT = 100
+RECIPE_WORKSPACE_SUBFOLDERS = ("merged_videos", "metadata_files")
+
+def execute_batch(requests: dict, service) -> dict:
+    """
+    Executes independent API requests ({key: HttpRequest}) via BatchHttpRequest, 100 per round-trip.
+    Returns {key: response}; a failed call maps to its HttpError instead of raising.
+    """
+    keys = list(requests)
+    results = {}
+    def _collect(request_id, response, exception):
+        results[keys[int(request_id)]] = exception if exception is not None else response
+    for start in range(0, len(keys), DRIVE_BATCH_LIMIT):
+        batch = service.new_batch_http_request(callback=_collect)
+        for index in range(start, min(start + DRIVE_BATCH_LIMIT, len(keys))):
+            batch.add(requests[keys[index]], request_id=str(index))
+        batch.execute()
+    return results
+
+def _batch_result(results: dict, key, what: str) -> dict:
+    result = results.get(key)
+    if isinstance(result, Exception) or result is None:
+        raise GDriveServiceError(f"Batched GDrive call failed for {what}: {result}")
+    return result
+
+def provision_recipe_workspace(recipe_id: str, probe_files: dict | None = None, service=None) -> dict:
+    """
+    Makes sure every RECIPE_WORKSPACE_SUBFOLDERS folder exists for recipe_id and looks up the files named in
+    probe_files ({subfolder: [filename, ...]}), batching the independent lookups/creates together.
+    IDs already in the process-wide cache cost nothing, so a warm recipe needs no request at all and a cold one
+    needs at most two batches (folder lookups + probes of known folders, then creates + remaining probes).
+    Returns {"app_data_folder_id", "folders": {subfolder: id}, "files": {subfolder: {filename: id or None}}}.
+    """
+    service_to_use = service
+    if not service_to_use:
+        import config # Import the module itself
+        service_to_use = config.GDRIVE_SERVICE_CLIENT # Access the variable via the module
+        if not service_to_use:
+            error_msg = "Shared GDrive client not initialized. Called from provision_recipe_workspace."
+            print(f"ERROR: {error_msg}")
+            raise GDriveServiceError(error_msg)
+    probe_files = probe_files or {}
+    app_data_folder_id = get_or_create_app_data_folder_id(service=service_to_use)
+    folder_names = {sub: f"{recipe_id}_{sub}" for sub in set(RECIPE_WORKSPACE_SUBFOLDERS) | set(probe_files)}
+    folders = {}
+    files = {sub: {} for sub in folder_names}
+    round_trips = 0
+
+    def _add_probes(requests: dict, subfolder: str):
+        for filename in probe_files.get(subfolder, []):
+            cached_id = _id_cache_get(folders[subfolder], filename, None)
+            if cached_id:
+                files[subfolder][filename] = cached_id
+            else:
+                query = f"name = '{filename}' and '{folders[subfolder]}' in parents and trashed = false"
+                requests[("file", subfolder, filename)] = service_to_use.files().list(q=query, spaces='drive', fields='files(id)')
+
+    def _collect_probes(results: dict):
+        for key, result in results.items():
+            if key[0] != "file":
+                continue
+            _, subfolder, filename = key
+            found = _batch_result(results, key, f"'{filename}'").get('files', [])
+            files[subfolder][filename] = found[0]['id'] if found else None
+            if found:
+                _id_cache_put(folders[subfolder], filename, None, found[0]['id'])
+
+    # Round 1: look up uncached folders; probe files in folders we already know.
+    requests = {}
+    for subfolder, folder_name in folder_names.items():
+        cached_id = _id_cache_get(app_data_folder_id, folder_name, FOLDER_MIME_TYPE)
+        if cached_id:
+            folders[subfolder] = cached_id
+            _add_probes(requests, subfolder)
+        else:
+            query = f"name='{folder_name}' and mimeType='{FOLDER_MIME_TYPE}' and '{app_data_folder_id}' in parents and trashed=false"
+            requests[("folder", subfolder)] = service_to_use.files().list(q=query, spaces='drive', fields='files(id)')
+    if requests:
+        results = execute_batch(requests, service_to_use)
+        round_trips += 1
+        _collect_probes(results)
+
+        # Round 2: create folders that do not exist yet; probe files in folders found in round 1.
+        requests = {}
+        for key in [k for k in results if k[0] == "folder"]:
+            subfolder = key[1]
+            found = _batch_result(results, key, f"folder '{folder_names[subfolder]}'").get('files', [])
+            if found:
+                folders[subfolder] = found[0]['id']
+                _id_cache_put(app_data_folder_id, folder_names[subfolder], FOLDER_MIME_TYPE, folders[subfolder])
+                _add_probes(requests, subfolder)
+            else:
+                body = {'name': folder_names[subfolder], 'mimeType': FOLDER_MIME_TYPE, 'parents': [app_data_folder_id]}
+                requests[("create", subfolder)] = service_to_use.files().create(body=body, fields='id')
+        if requests:
+            results = execute_batch(requests, service_to_use)
+            round_trips += 1
+            _collect_probes(results)
+            for key in [k for k in results if k[0] == "create"]:
+                subfolder = key[1]
+                folders[subfolder] = _batch_result(results, key, f"creating folder '{folder_names[subfolder]}'")['id']
+                _id_cache_put(app_data_folder_id, folder_names[subfolder], FOLDER_MIME_TYPE, folders[subfolder])
+                print(f"GDrive: Created folder '{folder_names[subfolder]}' under {app_data_folder_id} with ID: {folders[subfolder]}")
+                files[subfolder] = {filename: None for filename in probe_files.get(subfolder, [])} # New folder, nothing in it
+
+    print(f"GDrive: Workspace for recipe {recipe_id} ready in {round_trips} batch round-trip(s).")
+    return {"app_data_folder_id": app_data_folder_id, "folders": folders, "files": files}
+
+def stream_download_to_path(file_id: str, local_download_path: str, service, chunk_size: int = GDRIVE_DOWNLOAD_CHUNK_SIZE_BYTES, label: str = None, progress_callback=None, resume: bool = False, expected_size: int = None):
+    """
+    Streams a Drive file to local_download_path one chunk at a time.
+    Chunks go straight to '<path>.part', which is fsynced and atomically renamed into place once complete,
+    so readers never see a half-written file and memory stays bounded to one chunk.
+    progress_callback, if given, is called as progress_callback(bytes_done, total_bytes) after every chunk.
+    With resume=True an existing '<path>.part' is continued from its size and kept if the download fails.
+    Every chunk is an explicit 'Range: bytes=start-end' GET of the media URL.
+    """
+    label = label or file_id
+    local_dir = os.path.dirname(local_download_path)
+    if local_dir:
+        os.makedirs(local_dir, exist_ok=True)
+    part_path = local_download_path + ".part"
+    already_have = os.path.getsize(part_path) if resume and os.path.exists(part_path) else 0
+    try:
+        with open(part_path, 'ab' if already_have else 'wb') as fh:
+            if not expected_size or already_have < expected_size:
+                if already_have:
+                    print(f"GDrive Download {label}: Resuming at byte {already_have}.")
+                _download_ranges(service.files().get_media(fileId=file_id), fh, already_have, chunk_size, label, progress_callback)
+            fh.flush()
+            os.fsync(fh.fileno())
+        os.replace(part_path, local_download_path)
+    except BaseException:
+        if not resume and os.path.exists(part_path):
+            os.remove(part_path)
+        raise
+
+def _download_ranges(request, fh, start: int, chunk_size: int, label: str, progress_callback):
+    """Appends the media of request to fh from byte start onwards, one Range request per chunk."""
+    headers = {k: v for k, v in request.headers.items() if k.lower() not in ("accept", "accept-encoding", "user-agent")}
+    progress = start
+    total_size = None
+    while total_size is None or progress < total_size:
+        headers["range"] = f"bytes={progress}-{progress + chunk_size - 1}"
+        resp, content = request.http.request(request.uri, "GET", headers=headers)
+        if resp.status == 416 and progress == 0: # Range Not Satisfiable: an empty file
+            return
+        if resp.status not in (200, 206):
+            raise HttpError(resp, content, uri=request.uri)
+        if resp.status == 200 and progress:
+            # The server ignored the range and sent the whole file; keep that instead of appending it
+            fh.seek(0)
+            fh.truncate()
+            progress = 0
+        fh.write(content)
+        progress += len(content)
+        if "content-range" in resp:
+            total_size = int(resp["content-range"].rsplit("/", 1)[1])
+        elif "content-length" in resp:
+            total_size = progress # No range info: this response was the whole file
+        if total_size is None:
+            return # Size unknown: the single response is the whole file
+        if not content and progress < total_size:
+            raise GDriveServiceError(f"Download of {label} stalled at byte {progress} of {total_size}.")
+        print(f"GDrive Download {label}: {100 * progress // max(total_size, 1)}%.")
+        if progress_callback:
+            progress_callback(progress, total_size)
 
 def download_file_from_drive(file_id: str, local_download_path: str, service=None) -> bool:
     service_to_use = service
@@ -251,53 +811,50 @@ def download_file_from_drive(file_id: str, local_download_path: str, service=Non
             print(f"ERROR: {error_msg}")
             raise GDriveServiceError(error_msg)
     try:
-        request = service_to_use.files().get_media(fileId=file_id)
-        fh = io.BytesIO()
-        downloader = MediaIoBaseDownload(fh, request)
-        done = False
         print(f"GDrive: Starting download of file ID {file_id} to {local_download_path}...")
-        while not done:
-            status, done = downloader.next_chunk()
-            if status:
-                print(f"GDrive Download progress: {int(status.progress() * 100)}%.")
-        
-        local_dir = os.path.dirname(local_download_path)
-        if not os.path.exists(local_dir):
-            os.makedirs(local_dir)
-            
-        with open(local_download_path, 'wb') as f:
-            fh.seek(0)
-            f.write(fh.read())
+        stream_download_to_path(file_id, local_download_path, service_to_use)
         print(f"GDrive: Successfully downloaded file ID {file_id} to {local_download_path}")
         return True
     except HttpError as error:
+        if error.resp.status == 404:
+            invalidate_drive_id_cache(file_id)
         print(f"GDrive: An HttpError occurred downloading file ID {file_id} to {local_download_path}: {error}")
-        if os.path.exists(local_download_path):
-            pass # os.remove(local_download_path)
         raise GDriveServiceError(f"Failed to download file from drive (ID: {file_id}): {error}")
     except Exception as e:
         print(f"GDrive: An unexpected error occurred downloading file ID {file_id} to {local_download_path}: {e}")
         raise GDriveServiceError(f"Unexpected error downloading file from drive (ID: {file_id}): {e}")
 
-def list_folders_from_gdrive_and_db_status():
+def list_folders_from_gdrive_and_db_status(service=None, raise_errors: bool = False):
+    """
+    Lists the recipe folders under GDRIVE_TARGET_FOLDER_ID enriched with their DB status.
+    Errors are logged and give an empty list, unless raise_errors is True (then they raise GDriveServiceError),
+    so callers that keep a previous listing can tell "no folders" from "GDrive unavailable".
+    """
     print(f"Listing folders from Google Drive parent ID: {GDRIVE_TARGET_FOLDER_ID}")
     if not GDRIVE_TARGET_FOLDER_ID or GDRIVE_TARGET_FOLDER_ID == "...":
         print("ERROR: GDRIVE_TARGET_FOLDER_ID is not configured in .env. Cannot list GDrive folders.")
+        if raise_errors:
+            raise GDriveServiceError("GDRIVE_TARGET_FOLDER_ID is not configured.")
         return []
 
     try:
-        import config # Import the module itself
-        service_to_use = config.GDRIVE_SERVICE_CLIENT # Access the variable via the module
+        service_to_use = service
         if not service_to_use:
-            error_msg = "Shared GDrive client not initialized. Called from list_folders_from_gdrive_and_db_status."
-            print(f"ERROR: {error_msg}")
-            raise GDriveServiceError(error_msg)
+            import config # Import the module itself
+            service_to_use = config.GDRIVE_SERVICE_CLIENT # Access the variable via the module
+            if not service_to_use:
+                error_msg = "Shared GDrive client not initialized. Called from list_folders_from_gdrive_and_db_status."
+                print(f"ERROR: {error_msg}")
+                raise GDriveServiceError(error_msg)
         
-        query = f"'{GDRIVE_TARGET_FOLDER_ID}' in parents and mimeType = 'application/vnd.google-apps.folder' and trashed = false"
-        results = service_to_use.files().list(q=query, pageSize=100, fields="nextPageToken, files(id, name)").execute()
-        gdrive_folders = results.get('files', [])
+        # The folder index does a full paginated listing once, then only applies Drive change deltas.
+        from services import folder_index
+        folder_index.refresh(service_to_use)
+        gdrive_folders = folder_index.get_folders()
     except Exception as e:
         print(f"An error occurred while listing GDrive folders: {e}")
+        if raise_errors:
+            raise e if isinstance(e, GDriveServiceError) else GDriveServiceError(f"Failed to list GDrive folders: {e}")
         return []
 
     if not gdrive_folders:
@@ -305,13 +862,17 @@ def list_folders_from_gdrive_and_db_status():
         return []
     print(f"Found {len(gdrive_folders)} potential recipe folders in GDrive.")
 
-    db_recipes = load_db().get("recipes", {})
+    enriched_folders = enrich_folders_with_db_status(gdrive_folders, load_db().get("recipes", {}))
+    print(f"Enriched {len(enriched_folders)} folders with DB status.")
+    return enriched_folders
+
+def enrich_folders_with_db_status(gdrive_folders: list, db_recipes: dict) -> list:
+    """Combines [{"id", "name"}] GDrive folders with their DB records into the rows shown on /select_folder."""
     enriched_folders = []
     for folder in gdrive_folders:
         folder_id = folder["id"]
         folder_name_from_gdrive = folder["name"]
         if folder_name_from_gdrive == ".ipynb_checkpoints":
-            print(f"Skipping folder: {folder_name_from_gdrive}")
             continue 
         db_entry = db_recipes.get(folder_id)
         status_from_db_value = "New"
@@ -331,7 +892,7 @@ def list_folders_from_gdrive_and_db_status():
             youtube_url_from_db = db_entry.get("youtube_url") if db_entry else None
             display_name_with_status = f"{folder_name_from_gdrive} (✅ Uploaded)"
         elif "FAILED" in status_from_db_value.upper():
-            error_msg_snippet = db_entry.get('error_message','N/A')[:30] if db_entry else 'N/A'
+            error_msg_snippet = (db_entry.get('error_message') or 'N/A')[:30] if db_entry else 'N/A'
             display_name_with_status = f"{folder_name_from_gdrive} (❌ Failed: {error_msg_snippet}...)"
         else:
             display_name_with_status = f"{folder_name_from_gdrive} (Status: {status_display_text})"
@@ -340,16 +901,105 @@ def list_folders_from_gdrive_and_db_status():
             "id": folder_id, "name": folder_name_from_gdrive,
             "display_name": display_name_with_status, 
             "status_from_db": status_from_db_value, 
-            "youtube_url": youtube_url_from_db
+            "youtube_url": youtube_url_from_db,
+            "error_message": db_entry.get("error_message") if db_entry else None,
+            "encoding_profile": db_entry.get("encoding_profile") if db_entry else None
         })
-    print(f"Enriched folders with DB status: {json.dumps(enriched_folders, indent=2)}")
     return enriched_folders
 
+# --- Parallel folder downloads ---
+# httplib2 (used under every googleapiclient service) is not thread-safe, so each download worker
+# borrows its own client from DRIVE_CLIENT_POOL for the duration of one file.
+# Live progress of running downloads stays in memory (get_download_progress, overlaid by the status routes);
+# only the final snapshot is written to the recipe record, with DOWNLOADED or DOWNLOAD_FAILED.
+
+_ACTIVE_DOWNLOAD_PROGRESS = {}
+_ACTIVE_DOWNLOAD_PROGRESS_LOCK = threading.Lock()
+
+def get_download_progress(recipe_id: str) -> dict | None:
+    """The current progress of a folder download running in this process, or None."""
+    with _ACTIVE_DOWNLOAD_PROGRESS_LOCK:
+        progress = _ACTIVE_DOWNLOAD_PROGRESS.get(recipe_id)
+    return progress.snapshot() if progress else None
+
+class _FolderDownloadProgress:
+    """Tracks per-file and aggregate byte counts for one folder download."""
+
+    def __init__(self, recipe_id: str, recipe_name: str, items: list):
+        self.recipe_id = recipe_id
+        self.recipe_name = recipe_name
+        self.files = {item['name']: {"bytes_done": 0, "total_bytes": int(item.get('size') or 0), "state": "queued"} for item in items}
+        self.cached_files = 0
+        self.started_at = time.time()
+        self._lock = threading.Lock()
+
+    def update(self, file_name: str, bytes_done: int, total_bytes: int = None, state: str = None):
+        with self._lock:
+            entry = self.files[file_name]
+            entry["bytes_done"] = bytes_done
+            if total_bytes:
+                entry["total_bytes"] = total_bytes
+            if state:
+                entry["state"] = state
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            total = sum(f["total_bytes"] for f in self.files.values())
+            done = sum(f["bytes_done"] for f in self.files.values())
+            return {
+                "files_total": len(self.files),
+                "files_done": sum(1 for f in self.files.values() if f["state"] in ("done", "cached")),
+                "files_from_cache": sum(1 for f in self.files.values() if f["state"] == "cached"),
+                "bytes_done": done,
+                "bytes_total": total,
+                "percent": round(100.0 * done / total, 1) if total else None,
+                "elapsed_seconds": round(time.time() - self.started_at, 1),
+                "files": {name: {"percent": round(100.0 * f["bytes_done"] / f["total_bytes"], 1) if f["total_bytes"] else None, "state": f["state"]}
+                          for name, f in self.files.items()},
+            }
+
+def _download_folder_item(item: dict, download_base_path: str, progress: _FolderDownloadProgress) -> str:
+    """Fetches one clip through the local clip cache and links it into the recipe folder. Returns the cache entry path."""
+    from services import clip_cache
+    file_id, file_name = item['id'], item['name']
+    file_path = os.path.join(download_base_path, file_name)
+    cache_path = clip_cache.lookup(item)
+    if cache_path:
+        clip_cache.materialize(cache_path, file_path)
+        size = os.path.getsize(cache_path)
+        progress.update(file_name, size, size, state="cached")
+        print(f"Clip cache hit for {file_name}; skipped download.")
+        return cache_path
+
+    cache_path = clip_cache.entry_path(item)
+    print(f"Downloading GDrive file: {file_name} to {file_path} (via clip cache)...")
+    progress.update(file_name, 0, state="downloading")
+    try:
+        with borrow_drive_client() as worker_service:
+            stream_download_to_path(file_id, cache_path, worker_service, label=file_name,
+                                    progress_callback=lambda done, total: progress.update(file_name, done, total),
+                                    resume=True, expected_size=int(item.get('size') or 0) or None)
+        clip_cache.verify(cache_path, item)
+    except HttpError as error:
+        if error.resp.status == 404:
+            invalidate_drive_id_cache(file_id)
+        progress.update(file_name, 0, state="failed")
+        raise
+    except Exception:
+        progress.update(file_name, 0, state="failed")
+        raise
+    clip_cache.materialize(cache_path, file_path)
+    size = os.path.getsize(cache_path)
+    progress.update(file_name, size, size, state="done")
+    print(f"Successfully downloaded {file_name}")
+    return cache_path
+
 def download_folder_contents(folder_id: str, recipe_name: str, download_base_path: str) -> bool:
     # download_base_path is the ABSOLUTE path where files will be downloaded for the current environment.
     print(f"Attempting to download video clips for folder ID {folder_id} ({recipe_name}) to {download_base_path}")
     os.makedirs(download_base_path, exist_ok=True)
 
+    progress = None
     try:
         import config # Import the module itself
         service_to_use = config.GDRIVE_SERVICE_CLIENT # Access the variable via the module
@@ -359,78 +1009,52 @@ def download_folder_contents(folder_id: str, recipe_name: str, download_base_pat
             raise GDriveServiceError(error_msg)
 
         video_mime_types = "(" + " or ".join([f"mimeType='{m}'" for m in ['video/mp4', 'video/mpeg', 'video/quicktime', 'video/x-msvideo', 'video/x-matroska']]) + ")"
-        # Use service_to_use in the API call
-        results = service_to_use.files().list(q=f"'{folder_id}' in parents and {video_mime_types} and trashed = false", pageSize=50, fields="files(id, name)").execute()
-        items = results.get('files', [])
+        items = list_files_in_folder(folder_id, service=service_to_use, fields="id, name, size, md5Checksum, modifiedTime", extra_query=video_mime_types)
 
         if not items:
             msg = f"No video files found in GDrive folder ID {folder_id} ({recipe_name})."
             update_recipe_status(recipe_id=folder_id, name=recipe_name, status="DOWNLOAD_FAILED", error_message=msg)
             return False
         
-        print(f"Found {len(items)} video files in GDrive folder {folder_id}. Starting download...")
-        for item in items:
-            file_id, file_name = item['id'], item['name']
-            file_path = os.path.join(download_base_path, file_name) 
-            print(f"Downloading GDrive file: {file_name} to {file_path}...")
-            # Ensure this internal call also uses service_to_use if it were to call another helper,
-            # but get_media is a direct method.
-            request_dl = service_to_use.files().get_media(fileId=file_id)
-            fh = io.BytesIO()
-            downloader = MediaIoBaseDownload(fh, request_dl)
-            done = False
-            while not done:
-                status, done = downloader.next_chunk()
-                if status: print(f"Download {file_name}: {int(status.progress() * 100)}%.")
-            with open(file_path, 'wb') as f:
-                fh.seek(0)
-                f.write(fh.read())
-            print(f"Successfully downloaded {file_name}")
+        workers = min(GDRIVE_DOWNLOAD_WORKERS, len(items))
+        print(f"Found {len(items)} video files in GDrive folder {folder_id}. Starting download with {workers} worker(s)...")
+        progress = _FolderDownloadProgress(folder_id, recipe_name, items)
+        with _ACTIVE_DOWNLOAD_PROGRESS_LOCK:
+            _ACTIVE_DOWNLOAD_PROGRESS[folder_id] = progress
+        # Largest clips first, so the slowest download starts immediately instead of trailing at the end.
+        items = sorted(items, key=lambda item: int(item.get('size') or 0), reverse=True)
+        failures = []
+        cache_entries = set()
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="gdrive-download") as executor:
+            futures = {executor.submit(_download_folder_item, item, download_base_path, progress): item for item in items}
+            for future in as_completed(futures):
+                try:
+                    cache_entries.add(future.result())
+                except Exception as e:
+                    failures.append(f"{futures[future]['name']}: {e}")
+        from services import clip_cache
+        clip_cache.evict(keep=cache_entries)
+        if failures:
+            raise GDriveServiceError(f"{len(failures)} of {len(items)} clip(s) failed to download: " + "; ".join(failures))
+        print(f"GDrive: Downloaded {len(items)} clip(s) for {recipe_name} in {time.time() - progress.started_at:.1f}s.")
 
         relative_path_for_db = os.path.relpath(download_base_path, TEMP_PROCESSING_BASE_DIR)
         print(f"GDrive Service: Storing relative path for raw_clips_path in DB: '{relative_path_for_db}'")
-        update_recipe_status(recipe_id=folder_id, name=recipe_name, status="DOWNLOADED", raw_clips_path=relative_path_for_db)
+        # Drive's md5Checksum of every clip, so later stages can key caches on exact content without re-hashing
+        clip_checksums = {item['name']: {"md5": item['md5Checksum'], "size": int(item.get('size') or 0)} for item in items if item.get('md5Checksum')}
+        update_recipe_status(recipe_id=folder_id, name=recipe_name, status="DOWNLOADED", raw_clips_path=relative_path_for_db,
+                             download_progress=progress.snapshot(), clip_checksums=clip_checksums)
         return True
     except Exception as e:
         # Ensure service variable is not referenced here if it might be None
         msg = f"Error during GDrive download for {recipe_name}: {e}"
         print(f"ERROR: {msg}")
-        update_recipe_status(recipe_id=folder_id, name=recipe_name, status="DOWNLOAD_FAILED", error_message=msg)
-        return False
-        results = service.files().list(q=query, pageSize=50, fields="files(id, name)").execute()
-        items = results.get('files', [])
-
-        if not items:
-            msg = f"No video files found in GDrive folder ID {folder_id} ({recipe_name})."
-            update_recipe_status(recipe_id=folder_id, name=recipe_name, status="DOWNLOAD_FAILED", error_message=msg)
-            return False
-        
-        print(f"Found {len(items)} video files in GDrive folder {folder_id}. Starting download...")
-        for item in items:
-            file_id, file_name = item['id'], item['name']
-            file_path = os.path.join(download_base_path, file_name) 
-            print(f"Downloading GDrive file: {file_name} to {file_path}...")
-            request_dl = service.files().get_media(fileId=file_id)
-            fh = io.BytesIO()
-            downloader = MediaIoBaseDownload(fh, request_dl)
-            done = False
-            while not done:
-                status, done = downloader.next_chunk()
-                if status: print(f"Download {file_name}: {int(status.progress() * 100)}%.")
-            with open(file_path, 'wb') as f:
-                fh.seek(0)
-                f.write(fh.read())
-            print(f"Successfully downloaded {file_name}")
-
-        relative_path_for_db = os.path.relpath(download_base_path, TEMP_PROCESSING_BASE_DIR)
-        print(f"GDrive Service: Storing relative path for raw_clips_path in DB: '{relative_path_for_db}'")
-        update_recipe_status(recipe_id=folder_id, name=recipe_name, status="DOWNLOADED", raw_clips_path=relative_path_for_db)
-        return True
-    except Exception as e:
-        msg = f"Error during GDrive download for {recipe_name}: {e}"
-        print(f"ERROR: {msg}")
-        update_recipe_status(recipe_id=folder_id, name=recipe_name, status="DOWNLOAD_FAILED", error_message=msg)
+        failure_fields = {"download_progress": progress.snapshot()} if progress else {}
+        update_recipe_status(recipe_id=folder_id, name=recipe_name, status="DOWNLOAD_FAILED", error_message=msg, **failure_fields)
         return False
+    finally:
+        with _ACTIVE_DOWNLOAD_PROGRESS_LOCK:
+            _ACTIVE_DOWNLOAD_PROGRESS.pop(folder_id, None)
 
 if __name__ == '__main__':
     print("Testing GDrive Service Module (Service Account with Individual Fields method)...")
@@ -152,19 +152,20 @@ def generate_youtube_metadata_from_video_info(recipe_db_id: str, recipe_name_ori
     final_metadata_gdrive_id = None
     local_temp_video_path = None # For downloaded video if needed for context (not used by current prompt)
     local_temp_metadata_path = None
+    gdrive_service = None
 
     try:
-        # Background task should create its own gdrive client instance
-        print("BACKGROUND TASK: Gemini: Creating task-specific GDrive client.")
-        gdrive_service = gdrive.create_gdrive_service()
+        # Background task borrows a pooled gdrive client (returned in the finally block)
+        print("BACKGROUND TASK: Gemini: Borrowing a GDrive client from the pool.")
+        gdrive_service = gdrive.acquire_drive_client()
 
-        app_data_folder_id = gdrive.get_or_create_app_data_folder_id(service=gdrive_service)
-        if not app_data_folder_id:
-            raise GeminiServiceError("Could not get/create GDrive App Data Folder for metadata.")
-
-        recipe_metadata_gdrive_folder_id = gdrive.get_or_create_recipe_subfolder_id(
-            app_data_folder_id, recipe_db_id, "metadata_files", service=gdrive_service
+        # Provision the recipe's GDrive workspace and check for existing metadata in one batch
+        safe_recipe_name = "".join(c if c.isalnum() else "_" for c in recipe_name_orig)
+        gdrive_metadata_filename = f"{safe_recipe_name}_metadata.json"
+        workspace = gdrive.provision_recipe_workspace(
+            recipe_db_id, probe_files={"metadata_files": [gdrive_metadata_filename]}, service=gdrive_service
         )
+        recipe_metadata_gdrive_folder_id = workspace["folders"].get("metadata_files")
         if not recipe_metadata_gdrive_folder_id:
             raise GeminiServiceError(f"Could not get/create GDrive subfolder for metadata for recipe {recipe_db_id}")
 
@@ -212,7 +213,6 @@ def generate_youtube_metadata_from_video_info(recipe_db_id: str, recipe_name_ori
 
         # METADATA_TEMP_DIR from config is already the absolute, environment-specific path
         # config.py ensures it exists
-        safe_recipe_name = "".join(c if c.isalnum() else "_" for c in recipe_name_orig)
         
         temp_metadata_file_obj = tempfile.NamedTemporaryFile(mode='w', delete=False, suffix='.json', dir=METADATA_TEMP_DIR, prefix=f"{safe_recipe_name}_")
         local_temp_metadata_path = temp_metadata_file_obj.name # This is an absolute path
@@ -220,8 +220,7 @@ def generate_youtube_metadata_from_video_info(recipe_db_id: str, recipe_name_ori
         temp_metadata_file_obj.close()
         print(f"BACKGROUND TASK: Gemini: Metadata saved locally to temp: {local_temp_metadata_path}")
 
-        gdrive_metadata_filename = f"{safe_recipe_name}_metadata.json"
-        existing_metadata_gdrive_id = gdrive.find_file_id_by_name(recipe_metadata_gdrive_folder_id, gdrive_metadata_filename, service=gdrive_service)
+        existing_metadata_gdrive_id = workspace["files"]["metadata_files"].get(gdrive_metadata_filename)
 
         final_metadata_gdrive_id = gdrive.upload_file_to_drive(
             local_file_path=local_temp_metadata_path,
@@ -246,6 +245,7 @@ def generate_youtube_metadata_from_video_info(recipe_db_id: str, recipe_name_ori
         error_message_on_exit = f"Unexpected error in Gemini service: {str(e)}"
     
     finally:
+        gdrive.release_drive_client(gdrive_service)
         kwargs_for_status_update = {}
         if final_metadata_gdrive_id and current_db_status_on_exit == "READY_FOR_PREVIEW":
             kwargs_for_status_update['metadata_gdrive_id'] = final_metadata_gdrive_id
@@ -0,0 +1,87 @@
+import os
+import sys
+import time
+import asyncio
+import threading
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# Registry of running merge jobs, keyed by recipe ID, so they can be cancelled (POST /jobs/{recipe_id}/cancel).
+# Cancellation is cooperative: request_cancel() sets the job's threading.Event, ffmpeg_runner terminates the
+# ffmpeg process group it is running as soon as it sees the event, and the merge checks it between stages
+# (raise_if_cancelled) and per upload chunk. The job ends with status CANCELLED after cleaning up its temp files.
+# A recipe has at most one job: until a cancelled job's worker has finished its cleanup (and unregistered), a new
+# merge of the recipe is refused, since it would write to the same output files.
+
+CANCEL_POLL_SECONDS = 0.5
+
+_JOBS = {}
+_JOBS_LOCK = threading.Lock()
+
+class JobCancelled(Exception):
+    pass
+
+class Job:
+    def __init__(self, recipe_id: str):
+        self.recipe_id = recipe_id
+        self.cancel_event = threading.Event()
+        self.registered_at = time.time()
+        self.cancel_requested_at = None
+
+    def cancelled(self) -> bool:
+        return self.cancel_event.is_set()
+
+    async def wait_cancelled(self):
+        """Returns once the job is cancelled (polls, so it can be awaited alongside the worker thread)."""
+        while not self.cancel_event.is_set():
+            await asyncio.sleep(CANCEL_POLL_SECONDS)
+
+def register(recipe_id: str) -> Job | None:
+    """Creates the job for recipe_id. Returns None if recipe_id still has a job (running or winding down)."""
+    with _JOBS_LOCK:
+        if recipe_id in _JOBS:
+            return None
+        job = _JOBS[recipe_id] = Job(recipe_id)
+    return job
+
+def unregister(job: Job):
+    with _JOBS_LOCK:
+        if _JOBS.get(job.recipe_id) is job:
+            del _JOBS[job.recipe_id]
+
+def get_job(recipe_id: str) -> Job | None:
+    with _JOBS_LOCK:
+        return _JOBS.get(recipe_id)
+
+def cancel_event(recipe_id: str) -> threading.Event | None:
+    """The cancel event to hand to ffmpeg_runner for recipe_id's job (None if it has no job)."""
+    job = get_job(recipe_id)
+    return job.cancel_event if job else None
+
+def is_cancelled(recipe_id: str) -> bool:
+    job = get_job(recipe_id)
+    return bool(job and job.cancelled())
+
+def raise_if_cancelled(recipe_id: str):
+    if is_cancelled(recipe_id):
+        raise JobCancelled(f"Job for recipe {recipe_id} was cancelled.")
+
+def request_cancel(recipe_id: str) -> bool:
+    """Signals recipe_id's job to stop. Returns False if no job is running for it."""
+    job = get_job(recipe_id)
+    if not job:
+        return False
+    if not job.cancelled():
+        job.cancel_requested_at = time.time()
+        job.cancel_event.set()
+        print(f"Job Control: Cancel requested for recipe {recipe_id}.")
+    return True
+
+def get_stats() -> dict:
+    now = time.time()
+    with _JOBS_LOCK:
+        jobs = list(_JOBS.values())
+    return {
+        job.recipe_id: {"running_seconds": round(now - job.registered_at, 1), "cancel_requested": job.cancelled()}
+        for job in jobs
+    }
@@ -0,0 +1,159 @@
+import os
+import sys
+import json
+import hashlib
+import threading
+from fractions import Fraction
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from config import CLIP_INDEX_DIR, FFPROBE_WORKERS
+from services import ffmpeg_runner
+
+# Probing stage for the merge pipeline.
+# One ffprobe call per clip (JSON output, all streams) yields everything later stages need to choose between
+# re-encoding and stream-copy. Results are kept in a per-recipe index (CLIP_INDEX_DIR/<recipe id>.json) keyed
+# by a content fingerprint, so a re-merge of the same clips, even after a re-download or rename, never re-probes.
+# ffprobe runs through ffmpeg_runner, so a cancelled merge also stops (and process-group kills) its probes.
+
+FINGERPRINT_SAMPLE_BYTES = 1024 * 1024
+PROBE_TIMEOUT_SECONDS = 60
+
+_INDEX_LOCKS = {}
+_INDEX_LOCKS_LOCK = threading.Lock()
+
+class MediaProbeError(Exception):
+    pass
+
+def fingerprint(path: str) -> str:
+    """Cheap content hash: file size plus SHA-1 of the first and last FINGERPRINT_SAMPLE_BYTES."""
+    size = os.path.getsize(path)
+    digest = hashlib.sha1(str(size).encode())
+    with open(path, 'rb') as f:
+        digest.update(f.read(FINGERPRINT_SAMPLE_BYTES))
+        if size > FINGERPRINT_SAMPLE_BYTES:
+            f.seek(max(FINGERPRINT_SAMPLE_BYTES, size - FINGERPRINT_SAMPLE_BYTES))
+            digest.update(f.read(FINGERPRINT_SAMPLE_BYTES))
+    return f"{size}-{digest.hexdigest()}"
+
+def _parse_rate(rate: str | None) -> float | None:
+    try:
+        value = Fraction(rate)
+        return round(float(value), 3) if value else None
+    except (TypeError, ValueError, ZeroDivisionError):
+        return None
+
+def _rotation(stream: dict) -> int:
+    rotate = (stream.get("tags") or {}).get("rotate")
+    if rotate is None:
+        for side_data in stream.get("side_data_list", []):
+            if "rotation" in side_data:
+                rotate = side_data["rotation"]
+                break
+    try:
+        return int(float(rotate or 0)) % 360
+    except ValueError:
+        return 0
+
+def probe_clip(path: str, ffprobe_cmd: str, cancel_event=None) -> dict:
+    """
+    Runs ffprobe once and returns the stream facts the merge pipeline uses.
+    Setting cancel_event terminates ffprobe and raises ffmpeg_runner.FFmpegCancelled.
+    """
+    command = [ffprobe_cmd, "-v", "error", "-print_format", "json", "-show_format", "-show_streams", path]
+    try:
+        output = ffmpeg_runner.run_ffprobe(command, cancel_event=cancel_event, timeout=PROBE_TIMEOUT_SECONDS)
+        data = json.loads(output or "{}")
+    except ffmpeg_runner.FFmpegCancelled:
+        raise
+    except ffmpeg_runner.FFmpegError as e:
+        raise MediaProbeError(f"ffprobe failed for {path}: {(e.stderr_tail.strip() or str(e))[:300]}")
+    except json.JSONDecodeError as e:
+        raise MediaProbeError(f"ffprobe failed for {path}: {e}")
+
+    streams = data.get("streams", [])
+    video = next((st for st in streams if st.get("codec_type") == "video" and not (st.get("disposition") or {}).get("attached_pic")), None)
+    audio = next((st for st in streams if st.get("codec_type") == "audio"), None)
+    duration = (data.get("format") or {}).get("duration") or (video or {}).get("duration")
+    try:
+        duration = float(duration)
+    except (TypeError, ValueError):
+        duration = 0.0
+    info = {
+        "duration": duration,
+        "format_name": (data.get("format") or {}).get("format_name"),
+        "has_video": video is not None,
+        "has_audio": audio is not None,
+        "audio_codec": audio.get("codec_name") if audio else None,
+    }
+    if video:
+        info.update({
+            "video_codec": video.get("codec_name"),
+            "profile": video.get("profile"),
+            "width": video.get("width"),
+            "height": video.get("height"),
+            "fps": _parse_rate(video.get("avg_frame_rate")) or _parse_rate(video.get("r_frame_rate")),
+            "pix_fmt": video.get("pix_fmt"),
+            "rotation": _rotation(video),
+            "time_base": video.get("time_base"),
+            "sample_aspect_ratio": video.get("sample_aspect_ratio"),
+        })
+    return info
+
+def _index_path(recipe_id: str) -> str:
+    return os.path.join(CLIP_INDEX_DIR, f"{recipe_id}.json")
+
+def _index_lock(recipe_id: str) -> threading.Lock:
+    with _INDEX_LOCKS_LOCK:
+        return _INDEX_LOCKS.setdefault(recipe_id, threading.Lock())
+
+def load_clip_index(recipe_id: str) -> dict:
+    path = _index_path(recipe_id)
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        print(f"Media Probe: WARNING - Ignoring unreadable clip index {path}: {e}")
+        return {}
+
+def _save_clip_index(recipe_id: str, index: dict):
+    os.makedirs(CLIP_INDEX_DIR, exist_ok=True)
+    temp_path = _index_path(recipe_id) + ".tmp"
+    with open(temp_path, 'w') as f:
+        json.dump(index, f, indent=1)
+    os.replace(temp_path, _index_path(recipe_id))
+
+def probe_clips(clip_paths: list, ffprobe_cmd: str, recipe_id: str, cancel_event=None) -> dict:
+    """
+    Returns {clip path: probe info} for every clip, probing only clips missing from the recipe's index and
+    running those ffprobe calls concurrently (FFPROBE_WORKERS). Each info dict carries its "fingerprint".
+    A clip ffprobe cannot read gets {"error": ..., "duration": 0.0} so callers can skip it.
+    Setting cancel_event stops the probes and raises ffmpeg_runner.FFmpegCancelled.
+    """
+    with _index_lock(recipe_id):
+        index = load_clip_index(recipe_id)
+        fingerprints = {path: fingerprint(path) for path in clip_paths}
+        missing = [path for path in clip_paths if fingerprints[path] not in index]
+
+        def _probe(path):
+            try:
+                return probe_clip(path, ffprobe_cmd, cancel_event)
+            except MediaProbeError as e:
+                print(f"Media Probe: WARNING - {e}")
+                return {"error": str(e), "duration": 0.0}
+
+        failures = {}
+        if missing:
+            with ThreadPoolExecutor(max_workers=min(FFPROBE_WORKERS, len(missing)), thread_name_prefix="ffprobe") as executor:
+                for path, info in zip(missing, executor.map(_probe, missing)):
+                    info["file_name"] = os.path.basename(path)
+                    if "error" in info:
+                        failures[path] = info # Not indexed; a later run may read the file fine
+                    else:
+                        index[fingerprints[path]] = info
+            _save_clip_index(recipe_id, index)
+        print(f"Media Probe: {len(clip_paths)} clip(s) for recipe {recipe_id}: {len(clip_paths) - len(missing)} from index, {len(missing)} probed.")
+
+        return {path: dict(failures.get(path) or index[fingerprints[path]], fingerprint=fingerprints[path]) for path in clip_paths}
@@ -0,0 +1,84 @@
+import os
+import sys
+import json
+import shutil
+import hashlib
+import threading
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from config import SEGMENT_CACHE_DIR, SEGMENT_CACHE_MAX_BYTES
+from services import clip_cache
+
+# Persistent cache of per-clip encodes (parallel segments, stream-copy normalization, short-clip preprocessing).
+# An entry is named after a hash of the source clip's full-content MD5 (Drive's md5Checksum, recorded at download)
+# and the ffmpeg arguments with the input/output paths taken out, i.e. the codec, profile, size, fps and flags the clip was
+# encoded with. A re-merge of a recipe (new clip added, retry after MERGE_FAILED, same clips under a new name)
+# therefore only encodes clips whose content or settings changed; the rest are hard-linked back from here.
+# Size is bounded with clip_cache's LRU eviction (mtime is the last-used timestamp).
+
+_LOCK = threading.Lock()
+_STATS = {"hits": 0, "misses": 0, "stored": 0, "evicted_files": 0, "evicted_bytes": 0}
+
+# ffmpeg options that don't change the encoded output and so stay out of the key
+_KEY_IGNORED_OPTIONS = {"-threads", "-progress"}
+
+def cache_key(content_md5: str, cmd_args: list, clip_path: str, output_path: str) -> str:
+    settings = []
+    args = iter(cmd_args[1:]) # args[0] is the ffmpeg binary
+    for arg in args:
+        if arg in _KEY_IGNORED_OPTIONS:
+            next(args, None)
+            continue
+        settings.append("<input>" if arg == clip_path else "<output>" if arg == output_path else arg)
+    digest = hashlib.sha1(json.dumps([content_md5, settings]).encode())
+    return digest.hexdigest()
+
+def _entry_path(key: str, output_path: str) -> str:
+    return os.path.join(SEGMENT_CACHE_DIR, key + os.path.splitext(output_path)[1].lower())
+
+def fetch(key: str, output_path: str) -> bool:
+    """Places the cached encode for key at output_path (hard link where possible). Returns False on a miss."""
+    entry = _entry_path(key, output_path)
+    if not os.path.exists(entry):
+        with _LOCK:
+            _STATS["misses"] += 1
+        return False
+    try:
+        os.utime(entry, None)
+        clip_cache.materialize(entry, output_path)
+    except OSError as e:
+        print(f"Segment Cache: WARNING - Could not reuse {entry}: {e}")
+        with _LOCK:
+            _STATS["misses"] += 1
+        return False
+    with _LOCK:
+        _STATS["hits"] += 1
+    return True
+
+def store(key: str, output_path: str):
+    """Adds a finished encode to the cache. The entry appears atomically, so readers never see a partial file."""
+    entry = _entry_path(key, output_path)
+    temp_entry = f"{entry}.{threading.get_ident()}.tmp"
+    try:
+        try:
+            os.link(output_path, temp_entry)
+        except OSError:
+            shutil.copy2(output_path, temp_entry)
+        os.replace(temp_entry, entry)
+    except OSError as e:
+        print(f"Segment Cache: WARNING - Could not cache {output_path}: {e}")
+        if os.path.exists(temp_entry):
+            os.remove(temp_entry)
+        return
+    with _LOCK:
+        _STATS["stored"] += 1
+
+def evict(keep: set | None = None) -> int:
+    return clip_cache.enforce_size_budget(SEGMENT_CACHE_DIR, SEGMENT_CACHE_MAX_BYTES, keep, stats=_STATS)
+
+def get_stats() -> dict:
+    with _LOCK:
+        stats = dict(_STATS)
+    stats["max_bytes"] = SEGMENT_CACHE_MAX_BYTES
+    stats["bytes"] = clip_cache.directory_bytes(SEGMENT_CACHE_DIR)
+    return stats
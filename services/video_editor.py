@@ -6,12 +6,20 @@ import re
 import random
 import tempfile
 import shutil
+import time
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 # Import new config vars. LOCAL_TEMP_MERGED_DIR is now just MERGED_DIR from config.
-from config import TEMP_PROCESSING_BASE_DIR, MERGED_DIR, GOOGLE_DRIVE_APP_DATA_FOLDER_NAME 
-from utils import update_recipe_status
+from config import (
+    TEMP_PROCESSING_BASE_DIR, MERGED_DIR, GOOGLE_DRIVE_APP_DATA_FOLDER_NAME, MERGE_STREAM_COPY_ENABLED,
+    MERGE_ENCODE_MODE, MERGE_SEGMENT_WORKERS, MERGE_DETERMINISTIC, PREVIEW_PROXY_ENABLED, SEGMENT_CACHE_ENABLED
+)
+from utils import update_recipe_status, update_recipe_fields, get_recipe_status
 from services import gdrive # Import gdrive service
+from services import media_probe, encoding_profiles, ffmpeg_runner, job_control, segment_cache, audio_library, clip_cache
 
 class VideoEditingError(Exception):
     pass
@@ -27,25 +35,6 @@ def get_ffmpeg_tool_path(tool_name: str = "ffmpeg") -> str:
     except subprocess.CalledProcessError as e:
         raise VideoEditingError(f"{tool_name.capitalize()} version check failed: {e.stderr}")
 
-def get_video_duration(video_path: str, ffprobe_cmd: str) -> float:
-    command = [ffprobe_cmd, "-v", "error", "-show_entries", "format=duration", "-of", "default=noprint_wrappers=1:nokey=1", video_path]
-    try:
-        creationflags = subprocess.CREATE_NO_WINDOW if os.name == 'nt' else 0
-        result = subprocess.run(command, capture_output=True, text=True, check=True, creationflags=creationflags)
-        return float(result.stdout.strip()) if result.stdout.strip() and result.stdout.strip() != "N/A" else 0.0
-    except subprocess.CalledProcessError as e:
-        print(f"FFprobe error getting duration for {video_path}: {e.stderr}")
-        return 0.0
-    except FileNotFoundError:
-        print(f"FFprobe command '{ffprobe_cmd}' not found while getting duration for {video_path}.")
-        return 0.0
-    except ValueError:
-        print(f"Could not convert FFprobe duration output to float for {video_path}.")
-        return 0.0
-    except Exception as e: # Catch any other unexpected error
-        print(f"Unexpected error in get_video_duration for {video_path}: {e}")
-        return 0.0
-
 def natural_sort_key(s):
     return [int(text) if text.isdigit() else text.lower() for text in re.split(r'([0-9]+)', os.path.basename(s))]
 
@@ -58,167 +47,611 @@ DEFAULT_PREPROCESS_RESOLUTION = "1280x720"
 from fastapi import BackgroundTasks
 from services import gemini # Ensure gemini service is importable
 
+# Encoders used to bring outlier clips in line with the majority stream, keyed by the probed codec name.
+# Clips in any other codec always go through the re-encode path.
+STREAM_COPY_ENCODERS = {"h264": "libx264", "hevc": "libx265"}
+ENCODER_PROFILES = {"baseline", "main", "high", "high10", "high422", "high444", "main10"}
+
+# Per-clip ffmpeg encodes (normalization, short-clip preprocessing, segments) take a slot of the process-wide
+# encode budget (ffmpeg_runner.ENCODE_SLOTS), however many merges are in flight.
+_ENCODE_SLOTS = ffmpeg_runner.ENCODE_SLOTS
+SEGMENT_ENCODER_THREADS = ffmpeg_runner.ENCODER_THREADS
+
+# Live merge progress is kept in process memory (get_merge_progress) and merged into the recipe by the status APIs
+# the page polls. Only stage changes are written to the recipe record as "merge_progress", so the DB sees a handful
+# of writes per merge and a restarted process still shows which stage a merge got to.
+_LIVE_PROGRESS = {}
+_PERSISTED_STAGE = {}
+_PROGRESS_LOCK = threading.Lock()
+
+def _publish_merge_progress(recipe_db_id: str, stage: str, **fields):
+    progress = {"stage": stage, **fields}
+    with _PROGRESS_LOCK:
+        _LIVE_PROGRESS[recipe_db_id] = progress
+        stage_changed = _PERSISTED_STAGE.get(recipe_db_id) != stage
+        _PERSISTED_STAGE[recipe_db_id] = stage
+    if not stage_changed:
+        return
+    try:
+        update_recipe_fields(recipe_db_id, merge_progress=progress)
+    except Exception as e:
+        print(f"BACKGROUND TASK: VideoEditor: WARN Could not publish merge progress for {recipe_db_id}: {e}")
+
+def get_merge_progress(recipe_db_id: str) -> dict | None:
+    """The latest progress of a merge running in this process, or None."""
+    with _PROGRESS_LOCK:
+        progress = _LIVE_PROGRESS.get(recipe_db_id)
+        return dict(progress) if progress else None
+
+def _clear_merge_progress(recipe_db_id: str):
+    with _PROGRESS_LOCK:
+        _LIVE_PROGRESS.pop(recipe_db_id, None)
+        _PERSISTED_STAGE.pop(recipe_db_id, None)
+
+def _run_ffmpeg(cmd_args: list, recipe_db_id: str, **kwargs) -> str:
+    """ffmpeg_runner.run_ffmpeg() tied to the recipe's job, so cancelling the job terminates this ffmpeg."""
+    job_control.raise_if_cancelled(recipe_db_id)
+    return ffmpeg_runner.run_ffmpeg(cmd_args, cancel_event=job_control.cancel_event(recipe_db_id), **kwargs)
+
+def _ffmpeg_progress_reporter(recipe_db_id: str, stage: str):
+    """on_progress callback for ffmpeg_runner that publishes percent, speed and fps of a single ffmpeg run."""
+    def _on_progress(snapshot):
+        _publish_merge_progress(
+            recipe_db_id, stage, percent=snapshot["percent"], speed=snapshot["speed"],
+            fps=snapshot["fps"], out_time_seconds=snapshot["out_time_seconds"],
+        )
+    return _on_progress
+
+def _stream_signature(info: dict) -> tuple | None:
+    """The stream parameters that must match for clips to be joined with -c:v copy (None if the clip can't take part)."""
+    if not info.get("has_video") or info.get("video_codec") not in STREAM_COPY_ENCODERS:
+        return None
+    sar = info.get("sample_aspect_ratio")
+    return (
+        info["video_codec"], info.get("profile"), info.get("width"), info.get("height"),
+        round(info.get("fps") or 0), # Phone clips are VFR; their average rates drift by a few hundredths
+        info.get("pix_fmt"), info.get("rotation", 0), sar if sar not in (None, "0:1") else "1:1",
+    )
+
+def _plan_stream_copy(clip_paths: list, clip_infos: dict) -> dict | None:
+    """
+    Finds the majority stream signature among clip_paths. Returns {"reference": probe info of a majority clip,
+    "outliers": set of paths to normalize}, or None when a full re-encode is the better option.
+    """
+    groups = {}
+    for clip_path in clip_paths:
+        signature = _stream_signature(clip_infos[clip_path])
+        if signature is not None:
+            groups.setdefault(signature, []).append(clip_path)
+    if not groups:
+        return None
+    majority = max(groups.values(), key=len)
+    if len(majority) * 2 < len(clip_paths):
+        return None # Mostly mismatched clips: normalizing them one by one saves nothing over a single re-encode
+    reference = clip_infos[majority[0]]
+    outliers = {p for p in clip_paths if p not in majority}
+    for clip_path in outliers:
+        # Outliers are normalized without autorotation so their frames stay in the reference's stored orientation
+        if not clip_infos[clip_path].get("has_video") or clip_infos[clip_path].get("rotation", 0) != reference.get("rotation", 0):
+            return None
+    return {"reference": reference, "outliers": outliers}
+
+def _normalize_to_reference_args(ffmpeg_cmd: str, clip_path: str, reference: dict, profile: dict, output_path: str) -> list:
+    """ffmpeg arguments that re-encode clip_path to the reference clip's codec, profile, size, fps, pix_fmt and timescale."""
+    sar = reference.get("sample_aspect_ratio")
+    sar = sar.replace(":", "/") if sar and sar != "0:1" else "1"
+    args = [
+        ffmpeg_cmd, '-y', '-noautorotate', '-i', clip_path,
+        '-c:v', STREAM_COPY_ENCODERS[reference["video_codec"]], '-preset', profile["preset"], '-crf', str(profile["crf"]),
+        '-vf', f"scale={reference['width']}:{reference['height']},setsar={sar}",
+        '-pix_fmt', reference.get("pix_fmt") or 'yuv420p', '-r', str(reference.get("fps") or DEFAULT_PREPROCESS_FPS),
+        '-threads', str(SEGMENT_ENCODER_THREADS),
+    ]
+    h264_profile = (reference.get("profile") or "").lower().replace("constrained ", "").replace(" ", "")
+    if h264_profile in ENCODER_PROFILES:
+        args += ['-profile:v', h264_profile]
+    timescale = (reference.get("time_base") or "").partition("/")[2]
+    if timescale.isdigit():
+        args += ['-video_track_timescale', timescale]
+    return args + ['-an', output_path]
+
+def _select_background_audio(recipe_db_id: str, profile: dict, video_seconds: float) -> dict:
+    """
+    The final video's audio input and codec arguments. Normally a loudness-normalized AAC rendition from the audio
+    library, chosen to fit video_seconds and stream-copied. Until the library has a rendition ready (it never builds
+    one here): a random music file from static/audio (or a sine tone if there is none), encoded to AAC in the mux.
+    """
+    track = audio_library.select_track(video_seconds, profile["audio_bitrate"])
+    if track:
+        print(f"BACKGROUND TASK: VideoEditor: DEBUG - Using library track {track['file']} ({track['duration']:.1f}s{', looped' if track['loop'] else ''}) "
+              f"for {video_seconds:.1f}s of video for {recipe_db_id}.")
+        return {"input_args": [*(['-stream_loop', '-1'] if track["loop"] else []), '-i', track["path"]], "codec_args": ['-c:a', 'copy'], "source": track["file"]}
+    static_audio_dir = os.path.join(os.path.dirname(__file__), '..', 'static', 'audio')
+    available_music_files = [os.path.join(static_audio_dir, f) for f in os.listdir(static_audio_dir) if f.lower().endswith('.mp3')] if os.path.exists(static_audio_dir) else []
+    selected_music_path = random.choice(available_music_files) if available_music_files else None
+    if selected_music_path:
+        print(f"BACKGROUND TASK: VideoEditor: DEBUG - Using music {os.path.basename(selected_music_path)} for {recipe_db_id}.")
+        return {"input_args": ['-i', selected_music_path], "codec_args": ['-c:a', 'aac', '-b:a', profile["audio_bitrate"]], "source": os.path.basename(selected_music_path)}
+    print(f"BACKGROUND TASK: VideoEditor: DEBUG - No music file found, using sine wave for {recipe_db_id}.")
+    return {"input_args": ['-f', 'lavfi', '-i', "sine=frequency=1000"], "codec_args": ['-c:a', 'aac', '-b:a', '128k'], "source": "sine"}
+
+def _concat_and_mux_args(ffmpeg_cmd: str, list_file_path: str, video_args: list, audio: dict, profile: dict, output_path: str) -> list:
+    """
+    One ffmpeg run for the whole output: the concat list is the video input, the background audio is the second
+    input (stream-copied when it is already AAC), and -shortest trims it to the video, so no silent intermediate is written.
+    """
+    return [
+        ffmpeg_cmd, '-y', '-f', 'concat', '-safe', '0', '-i', list_file_path, *audio["input_args"],
+        '-map', '0:v:0', '-map', '1:a:0', *video_args,
+        *audio["codec_args"], '-shortest',
+        *(['-movflags', '+faststart'] if profile.get("faststart") else []), output_path,
+    ]
+
+def _write_concat_list(list_file_path: str, clip_paths: list):
+    with open(list_file_path, 'w') as lf:
+        for clip_path in clip_paths:
+            lf.write(f"file '{clip_path.replace(os.sep, '/')}'\n")
+
+def _clip_content_md5s(clip_paths: list, recipe_db_id: str) -> dict:
+    """
+    Full-content MD5 of every clip: Drive's md5Checksum recorded at download when the local file still has the
+    recorded size, otherwise hashed here. The segment cache keys on it (the probe fingerprint only samples the file).
+    """
+    recorded = (get_recipe_status(recipe_db_id) or {}).get("clip_checksums") or {}
+    md5s = {}
+    for clip_path in clip_paths:
+        known = recorded.get(os.path.basename(clip_path))
+        if known and known.get("md5") and known.get("size") == os.path.getsize(clip_path):
+            md5s[clip_path] = known["md5"]
+        else:
+            md5s[clip_path] = clip_cache.file_md5(clip_path)
+    return md5s
+
+def _run_clip_encodes(jobs: list, clip_infos: dict, stage: str, report: dict, recipe_db_id: str, timeout: int) -> list:
+    """
+    Runs (clip_path, ffmpeg args, output_path) jobs concurrently, each holding one _ENCODE_SLOTS slot.
+    A job whose clip was already encoded with the same arguments is served from the segment cache instead.
+    Returns the output paths in job order, with None for clips whose encode failed (the rest of the batch carries on).
+    Per-clip timings are appended to report["clips"].
+    """
+    if not jobs:
+        return []
+    finished = {"count": 0}
+    finished_lock = threading.Lock()
+    _publish_merge_progress(recipe_db_id, stage, clips_done=0, clips_total=len(jobs), percent=0.0)
+
+    def _run(job):
+        clip_path, cmd_args, output_path = job
+        entry = {"clip": os.path.basename(clip_path), "stage": stage, "ok": True, "cached": False}
+        cache_key = segment_cache.cache_key(clip_infos[clip_path]["content_md5"], cmd_args, clip_path, output_path) if SEGMENT_CACHE_ENABLED else None
+        started = time.time()
+        if cache_key and segment_cache.fetch(cache_key, output_path):
+            entry["cached"] = True
+            print(f"BACKGROUND TASK: VideoEditor: DEBUG - {stage} {entry['clip']} reused from the segment cache for {recipe_db_id}")
+        else:
+            print(f"BACKGROUND TASK: VideoEditor: DEBUG - {stage} {entry['clip']} with command: {' '.join(cmd_args)} for {recipe_db_id}")
+            with _ENCODE_SLOTS:
+                started = time.time()
+                try:
+                    _run_ffmpeg(cmd_args, recipe_db_id, timeout=timeout)
+                except (ffmpeg_runner.FFmpegCancelled, job_control.JobCancelled):
+                    raise # Ends the whole merge, not just this clip
+                except ffmpeg_runner.FFmpegError as e_enc:
+                    entry.update(ok=False, error=f"RC {e_enc.returncode}: {e_enc.stderr_tail[-300:].strip()}" if e_enc.returncode is not None else str(e_enc))
+                except Exception as e_enc:
+                    entry.update(ok=False, error=f"{type(e_enc).__name__}: {e_enc}")
+            if not entry["ok"]:
+                print(f"BACKGROUND TASK: VideoEditor: WARN {stage} {entry['clip']} failed: {entry['error']}. Excluding for {recipe_db_id}.")
+            elif cache_key:
+                segment_cache.store(cache_key, output_path)
+        entry["seconds"] = round(time.time() - started, 2)
+        with finished_lock:
+            finished["count"] += 1
+            done_count = finished["count"]
+        _publish_merge_progress(recipe_db_id, stage, clips_done=done_count, clips_total=len(jobs),
+                                percent=round(100.0 * done_count / len(jobs), 1))
+        return (output_path if entry["ok"] else None), entry
+
+    with ThreadPoolExecutor(max_workers=min(MERGE_SEGMENT_WORKERS, len(jobs)), thread_name_prefix=f"{stage}-encode") as executor:
+        results = list(executor.map(_run, jobs))
+    report["clips"].extend(entry for _, entry in results)
+    if SEGMENT_CACHE_ENABLED:
+        try:
+            segment_cache.evict() # Entries used just now are fresh (mtime) and stay
+        except Exception as e_evict: # Housekeeping only; never fails the merge
+            print(f"BACKGROUND TASK: VideoEditor: WARN Segment cache eviction failed for {recipe_db_id}: {e_evict}")
+    return [output_path for output_path, _ in results]
+
+def _merge_with_stream_copy(ffmpeg_cmd: str, clip_paths: list, clip_infos: dict, plan: dict, work_dir: str, audio: dict, profile: dict, output_path: str, recipe_db_id: str, report: dict) -> bool:
+    """
+    Fast path: normalizes outlier (and very short) clips to the majority stream, then joins everything with -c:v copy.
+    Returns False if the stream-copy concat failed, so the caller can fall back to a full re-encode.
+    """
+    reference = plan["reference"]
+    print(f"BACKGROUND TASK: VideoEditor: Stream-copy merge for {recipe_db_id}: {len(clip_paths) - len(plan['outliers'])} clip(s) match "
+          f"{reference['video_codec']} {reference['width']}x{reference['height']} @ {reference.get('fps')}fps, {len(plan['outliers'])} outlier(s) to normalize.")
+    # Matching clips are used as they are; the others are normalized concurrently and slotted back in order
+    clips_for_concat_list = list(clip_paths)
+    to_normalize = [i for i, p in enumerate(clip_paths) if p in plan["outliers"] or clip_infos[p]["duration"] < PREPROCESS_IF_SHORTER_THAN_SECONDS]
+    jobs = []
+    for i in to_normalize:
+        normalized_clip_path = os.path.join(work_dir, f"normalized_{i:04d}_{os.path.splitext(os.path.basename(clip_paths[i]))[0]}.mp4")
+        jobs.append((clip_paths[i], _normalize_to_reference_args(ffmpeg_cmd, clip_paths[i], reference, profile, normalized_clip_path), normalized_clip_path))
+    for i, normalized_clip_path in zip(to_normalize, _run_clip_encodes(jobs, clip_infos, "normalize", report, recipe_db_id, timeout=300)):
+        clips_for_concat_list[i] = normalized_clip_path
+    clips_for_concat_list = [p for p in clips_for_concat_list if p]
+    if not clips_for_concat_list:
+        raise VideoEditingError(f"No clips remaining after filtering/pre-processing.")
+
+    list_file_path = os.path.join(work_dir, "ffmpeg_filelist_copy.txt")
+    _write_concat_list(list_file_path, clips_for_concat_list)
+    ffmpeg_copy_cmd_args = _concat_and_mux_args(ffmpeg_cmd, list_file_path, ['-c:v', 'copy'], audio, profile, output_path)
+    print(f"BACKGROUND TASK: VideoEditor: DEBUG - Starting stream-copy merge. Command: {' '.join(ffmpeg_copy_cmd_args)} for {recipe_db_id}")
+    started = time.time()
+    try:
+        _run_ffmpeg(ffmpeg_copy_cmd_args, recipe_db_id, duration_seconds=_timeline_seconds(clip_paths, clip_infos),
+                    on_progress=_ffmpeg_progress_reporter(recipe_db_id, "concat"), timeout=900)
+    except ffmpeg_runner.FFmpegCancelled:
+        raise
+    except ffmpeg_runner.FFmpegError as e_copy:
+        print(f"BACKGROUND TASK: VideoEditor: WARN Stream-copy merge failed for {recipe_db_id}: {e_copy}. Falling back to re-encode.")
+        return False
+    print(f"BACKGROUND TASK: VideoEditor: Stream-copy merge finished in {time.time() - started:.1f}s for {recipe_db_id}.")
+    return True
+
+def _timeline_seconds(clip_paths: list, clip_infos: dict) -> float:
+    """Expected length of the merged video, the denominator for concat progress."""
+    return sum(clip_infos[p]["duration"] for p in clip_paths)
+
+def _display_size(info: dict) -> tuple:
+    width, height = info.get("width") or 0, info.get("height") or 0
+    return (height, width) if info.get("rotation", 0) in (90, 270) else (width, height)
+
+def _segment_target_size(clip_paths: list, clip_infos: dict, profile: dict) -> tuple:
+    """The most common display size among the clips (fitted to the profile's max_lines), or DEFAULT_PREPROCESS_RESOLUTION."""
+    sizes = Counter(_display_size(clip_infos[p]) for p in clip_paths if clip_infos[p].get("has_video"))
+    sizes.pop((0, 0), None)
+    if not sizes:
+        width, height = DEFAULT_PREPROCESS_RESOLUTION.split("x")
+        return encoding_profiles.fit_size(int(width), int(height), profile)
+    return encoding_profiles.fit_size(*sizes.most_common(1)[0][0], profile)
+
+def _segment_encode_args(ffmpeg_cmd: str, clip_path: str, target_size: tuple, profile: dict, output_path: str) -> list:
+    """Encodes one clip to the common segment format: same codec, size (letterboxed), fps, pix_fmt and timescale."""
+    width, height = target_size
+    args = [
+        ffmpeg_cmd, '-y', '-i', clip_path,
+        '-vf', f"scale={width}:{height}:force_original_aspect_ratio=decrease,pad={width}:{height}:(ow-iw)/2:(oh-ih)/2,setsar=1",
+        '-c:v', 'libx264', *encoding_profiles.video_rate_args(profile, target_size), '-pix_fmt', 'yuv420p',
+        '-r', profile["fps"], '-video_track_timescale', '90000', '-threads', str(SEGMENT_ENCODER_THREADS), '-an',
+    ]
+    if MERGE_DETERMINISTIC:
+        args += ['-map_metadata', '-1', '-fflags', '+bitexact', '-flags:v', '+bitexact']
+    return args + [output_path]
+
+def _merge_with_parallel_segments(ffmpeg_cmd: str, clip_paths: list, clip_infos: dict, work_dir: str, audio: dict, profile: dict, output_path: str, recipe_db_id: str, report: dict):
+    """Encodes every clip to a normalized segment in parallel, then joins the segments with -c:v copy."""
+    target_size = _segment_target_size(clip_paths, clip_infos, profile)
+    print(f"BACKGROUND TASK: VideoEditor: Parallel segment merge for {recipe_db_id}: {len(clip_paths)} clip(s) -> "
+          f"{target_size[0]}x{target_size[1]} @ {profile['fps']}fps, profile '{profile['name']}', {MERGE_SEGMENT_WORKERS} worker(s) x {SEGMENT_ENCODER_THREADS} thread(s).")
+
+    started = time.time()
+    jobs = []
+    for index, clip_path in enumerate(clip_paths):
+        segment_path = os.path.join(work_dir, f"segment_{index:04d}.mp4")
+        jobs.append((clip_path, _segment_encode_args(ffmpeg_cmd, clip_path, target_size, profile, segment_path), segment_path))
+    segment_paths = [p for p in _run_clip_encodes(jobs, clip_infos, "segment", report, recipe_db_id, timeout=600) if p]
+    if not segment_paths:
+        raise VideoEditingError(f"No clips remaining after filtering/pre-processing.")
+    print(f"BACKGROUND TASK: VideoEditor: Encoded {len(segment_paths)} segment(s) in {time.time() - started:.1f}s for {recipe_db_id}.")
+
+    list_file_path = os.path.join(work_dir, "ffmpeg_filelist_segments.txt")
+    _write_concat_list(list_file_path, segment_paths)
+    video_args = ['-c:v', 'copy'] + (['-map_metadata', '-1', '-fflags', '+bitexact'] if MERGE_DETERMINISTIC else [])
+    ffmpeg_concat_cmd_args = _concat_and_mux_args(ffmpeg_cmd, list_file_path, video_args, audio, profile, output_path)
+    print(f"BACKGROUND TASK: VideoEditor: DEBUG - Joining segments. Command: {' '.join(ffmpeg_concat_cmd_args)} for {recipe_db_id}")
+    try:
+        _run_ffmpeg(ffmpeg_concat_cmd_args, recipe_db_id, duration_seconds=_timeline_seconds(clip_paths, clip_infos),
+                    on_progress=_ffmpeg_progress_reporter(recipe_db_id, "concat"), timeout=900)
+    except ffmpeg_runner.FFmpegCancelled:
+        raise
+    except ffmpeg_runner.FFmpegError as e_concat:
+        raise VideoEditingError(f"FFmpeg segment concat failed. RC: {e_concat.returncode}\nStderr: {e_concat.stderr_tail[-1000:] or e_concat}")
+
+def _merge_with_reencode(ffmpeg_cmd: str, clip_paths: list, clip_infos: dict, work_dir: str, audio: dict, profile: dict, output_path: str, recipe_db_id: str, report: dict):
+    """Original path: preprocess short clips, then re-encode the whole concatenated timeline with libx264."""
+    print(f"BACKGROUND TASK: VideoEditor: DEBUG - Starting clip preprocessing for {recipe_db_id}.")
+    # Short clips are preprocessed concurrently (sharing the _ENCODE_SLOTS budget); the others go in as they are
+    clips_for_concat_list = list(clip_paths)
+    short_indexes = [i for i, p in enumerate(clip_paths) if clip_infos[p]["duration"] < PREPROCESS_IF_SHORTER_THAN_SECONDS]
+    jobs = []
+    for i in short_indexes:
+        preprocessed_clip_path = os.path.join(work_dir, f"preprocessed_{i:04d}_{os.path.basename(clip_paths[i])}")
+        preprocess_cmd_args = [ffmpeg_cmd, '-y', '-i', clip_paths[i], '-c:v', 'libx264', '-preset', profile["preset"], '-crf', str(max(0, profile["crf"] - 1)), '-pix_fmt', 'yuv420p', '-r', DEFAULT_PREPROCESS_FPS, '-s', DEFAULT_PREPROCESS_RESOLUTION, '-threads', str(SEGMENT_ENCODER_THREADS), '-an', preprocessed_clip_path]
+        jobs.append((clip_paths[i], preprocess_cmd_args, preprocessed_clip_path))
+    for i, preprocessed_clip_path in zip(short_indexes, _run_clip_encodes(jobs, clip_infos, "preprocess", report, recipe_db_id, timeout=120)):
+        clips_for_concat_list[i] = preprocessed_clip_path
+    clips_for_concat_list = [p for p in clips_for_concat_list if p]
+    
+    print(f"BACKGROUND TASK: VideoEditor: DEBUG - Finished clip preprocessing loop for {recipe_db_id}. Clips for concat: {clips_for_concat_list}")
+    if not clips_for_concat_list:
+        raise VideoEditingError(f"No clips remaining after filtering/pre-processing.")
+
+    list_file_path = os.path.join(work_dir, "ffmpeg_filelist.txt")
+    _write_concat_list(list_file_path, clips_for_concat_list)
+    print(f"BACKGROUND TASK: VideoEditor: DEBUG - Created ffmpeg_filelist.txt at {list_file_path} for {recipe_db_id}")
+    
+    output_size = _segment_target_size(clip_paths, clip_infos, profile) # Picks the bitrate ladder rung
+    video_args = ['-c:v', 'libx264', *encoding_profiles.video_rate_args(profile, output_size), '-pix_fmt', 'yuv420p']
+    if profile.get("max_lines"):
+        video_args += ['-vf', f"scale={output_size[0]}:{output_size[1]}:force_original_aspect_ratio=decrease,pad={output_size[0]}:{output_size[1]}:(ow-iw)/2:(oh-ih)/2,setsar=1"]
+    ffmpeg_merge_cmd_args = _concat_and_mux_args(ffmpeg_cmd, list_file_path, video_args, audio, profile, output_path)
+    print(f"BACKGROUND TASK: VideoEditor: DEBUG - Starting merge. Command: {' '.join(ffmpeg_merge_cmd_args)} for {recipe_db_id}")
+    print(f"BACKGROUND TASK: VideoEditor: DEBUG - Waiting for merge FFmpeg process to complete (timeout 900s) for {recipe_db_id}...")
+    try:
+        _run_ffmpeg(ffmpeg_merge_cmd_args, recipe_db_id, duration_seconds=_timeline_seconds(clip_paths, clip_infos),
+                    on_progress=_ffmpeg_progress_reporter(recipe_db_id, "encode"), timeout=900) # Allow 15 mins for merge
+    except ffmpeg_runner.FFmpegCancelled:
+        raise
+    except ffmpeg_runner.FFmpegError as e_merge:
+        raise VideoEditingError(f"Main FFmpeg merge failed. RC: {e_merge.returncode}\nStderr: {e_merge.stderr_tail[-1000:] or e_merge}")
+    print(f"BACKGROUND TASK: VideoEditor: DEBUG - Merge FFmpeg process finished for {recipe_db_id}.")
+
+def _render_final_video(absolute_raw_clips_local_path: str, local_final_output_path: str, recipe_db_id: str, recipe_name_orig: str, files_to_delete_locally: list):
+    """Runs the ffmpeg pipeline (probe, normalize/encode clips, concat with the music muxed in) and writes local_final_output_path."""
+    ffmpeg_cmd = get_ffmpeg_tool_path("ffmpeg")
+    ffprobe_cmd = get_ffmpeg_tool_path("ffprobe")
+    print(f"BACKGROUND TASK: VideoEditor: DEBUG - FFmpeg path: {ffmpeg_cmd}, FFprobe path: {ffprobe_cmd} for {recipe_db_id}")
+
+    if not os.path.isdir(absolute_raw_clips_local_path):
+        raise VideoEditingError(f"Absolute raw clips local dir not found: {absolute_raw_clips_local_path}")
+
+    video_extensions = ('*.mp4', '*.MP4', '*.mov', '*.MOV', '*.avi', '*.AVI', '*.mkv', '*.MKV')
+    unique_clip_paths = {os.path.normpath(p) for ext in video_extensions for p in glob.glob(os.path.join(absolute_raw_clips_local_path, ext))}
+
+    if not unique_clip_paths:
+        raise VideoEditingError(f"No video files found in local raw clips dir {absolute_raw_clips_local_path}")
+
+    # Create preprocess dir inside the TEMP_PROCESSING_BASE_DIR for better organization if desired
+    # or keep it inside absolute_raw_clips_local_path if that's preferred for co-location.
+    # For simplicity, let's keep it within the specific recipe's raw clips folder.
+    temp_preprocess_dir_local = tempfile.mkdtemp(prefix="barged_preprocess_", dir=absolute_raw_clips_local_path)
+    files_to_delete_locally.append(temp_preprocess_dir_local)
+    
+    # Probe every clip up front (concurrently, reusing the recipe's clip index) instead of one ffprobe per loop step
+    ordered_clip_paths = sorted(unique_clip_paths, key=natural_sort_key)
+    _publish_merge_progress(recipe_db_id, "probe", percent=None) # Replaces the previous attempt's progress
+    clip_infos = media_probe.probe_clips(ordered_clip_paths, ffprobe_cmd, recipe_db_id, cancel_event=job_control.cancel_event(recipe_db_id))
+    job_control.raise_if_cancelled(recipe_db_id)
+    if SEGMENT_CACHE_ENABLED:
+        for clip_path, content_md5 in _clip_content_md5s(ordered_clip_paths, recipe_db_id).items():
+            clip_infos[clip_path]["content_md5"] = content_md5
+
+    usable_clip_paths = []
+    for clip_path in ordered_clip_paths:
+        duration = clip_infos[clip_path]["duration"]
+        print(f"BACKGROUND TASK: VideoEditor: DEBUG - Clip: {os.path.basename(clip_path)}, Duration: {duration}s for {recipe_db_id}")
+        if duration < MIN_CLIP_DURATION_SECONDS: 
+            print(f"BACKGROUND TASK: VideoEditor: DEBUG - Skipping clip {os.path.basename(clip_path)} (too short) for {recipe_db_id}")
+            continue
+        usable_clip_paths.append(clip_path)
+    if not usable_clip_paths:
+        raise VideoEditingError(f"No clips remaining after filtering/pre-processing.")
+
+    # MERGED_DIR from config is already absolute and env-specific
+    # os.makedirs(MERGED_DIR, exist_ok=True) # config.py handles this now
+
+    profile = encoding_profiles.get_profile((get_recipe_status(recipe_db_id) or {}).get("encoding_profile"))
+    print(f"BACKGROUND TASK: VideoEditor: Using encoding profile '{profile['name']}' for {recipe_db_id}.")
+
+    # The concat pass muxes the background audio itself and writes local_final_output_path directly
+    media_seconds = _timeline_seconds(usable_clip_paths, clip_infos)
+    audio = _select_background_audio(recipe_db_id, profile, media_seconds)
+
+    # Per-clip encode timings and the merge path taken, stored on the recipe as processing_report
+    report = {"clips": [], "merge_path": None, "clip_count": len(usable_clip_paths), "encoding_profile": profile["name"], "background_audio": audio["source"]}
+    started = time.time()
+    try:
+        stream_copy_plan = _plan_stream_copy(usable_clip_paths, clip_infos) if MERGE_STREAM_COPY_ENABLED else None
+        merged = False
+        if stream_copy_plan:
+            report["merge_path"] = "stream_copy"
+            merged = _merge_with_stream_copy(ffmpeg_cmd, usable_clip_paths, clip_infos, stream_copy_plan, temp_preprocess_dir_local, audio, profile, local_final_output_path, recipe_db_id, report)
+        if not merged and MERGE_ENCODE_MODE == "parallel":
+            report["merge_path"] = "parallel_segments"
+            _merge_with_parallel_segments(ffmpeg_cmd, usable_clip_paths, clip_infos, temp_preprocess_dir_local, audio, profile, local_final_output_path, recipe_db_id, report)
+        elif not merged:
+            report["merge_path"] = "reencode"
+            _merge_with_reencode(ffmpeg_cmd, usable_clip_paths, clip_infos, temp_preprocess_dir_local, audio, profile, local_final_output_path, recipe_db_id, report)
+    finally:
+        report["render_seconds"] = round(time.time() - started, 2)
+        report["clip_encode_seconds"] = round(sum(entry["seconds"] for entry in report["clips"]), 2)
+        report["failed_clips"] = [entry["clip"] for entry in report["clips"] if not entry["ok"]]
+        report["cached_clips"] = sum(1 for entry in report["clips"] if entry.get("cached"))
+        report["speed_x_realtime"] = round(media_seconds / report["render_seconds"], 2) if report["render_seconds"] else None
+        update_recipe_fields(recipe_db_id, processing_report=report)
+    encoding_profiles.record_run(profile["name"], report["merge_path"], media_seconds, report["render_seconds"])
+    
+    print(f"BACKGROUND TASK: VideoEditor: Merge with audio to local temp successful: {local_final_output_path} ({report['render_seconds']}s, {report['merge_path']})")
+
+def _render_and_upload_proxy(local_final_output_path: str, drive_folder_id: str, drive_filename: str, existing_file_id: str | None, recipe_db_id: str, files_to_delete_locally: list) -> str | None:
+    """
+    Renders a small preview rendition of the final video (encoding_profiles.PROXY_PROFILE) and uploads it next to it.
+    Returns the proxy's GDrive file ID, or None if either step failed; the preview then falls back to the full video.
+    """
+    proxy = encoding_profiles.PROXY_PROFILE
+    local_proxy_path = os.path.join(MERGED_DIR, drive_filename)
+    files_to_delete_locally.append(local_proxy_path)
+    lines = proxy["max_lines"]
+    proxy_cmd_args = [
+        get_ffmpeg_tool_path("ffmpeg"), '-y', '-i', local_final_output_path,
+        # Short side down to max_lines (never up), aspect ratio kept
+        '-vf', f"scale='if(gt(iw,ih),-2,min(iw,{lines}))':'if(gt(iw,ih),min(ih,{lines}),-2)'",
+        '-c:v', 'libx264', *encoding_profiles.video_rate_args(proxy, (lines, lines)), '-pix_fmt', 'yuv420p',
+        '-threads', str(SEGMENT_ENCODER_THREADS), '-c:a', 'aac', '-b:a', proxy["audio_bitrate"], '-movflags', '+faststart', local_proxy_path,
+    ]
+    print(f"BACKGROUND TASK: VideoEditor: DEBUG - Rendering preview proxy. Command: {' '.join(proxy_cmd_args)} for {recipe_db_id}")
+    try:
+        duration_seconds = media_probe.probe_clip(local_final_output_path, get_ffmpeg_tool_path("ffprobe"), job_control.cancel_event(recipe_db_id))["duration"] # For progress only
+    except media_probe.MediaProbeError:
+        duration_seconds = None
+    started = time.time()
+    try:
+        with _ENCODE_SLOTS:
+            _run_ffmpeg(proxy_cmd_args, recipe_db_id, duration_seconds=duration_seconds,
+                        on_progress=_ffmpeg_progress_reporter(recipe_db_id, "proxy"), timeout=600)
+    except (ffmpeg_runner.FFmpegCancelled, job_control.JobCancelled):
+        raise
+    except ffmpeg_runner.FFmpegError as e_proxy:
+        print(f"BACKGROUND TASK: VideoEditor: WARN Preview proxy render failed for {recipe_db_id} (RC {e_proxy.returncode}): {e_proxy.stderr_tail[-300:] or e_proxy}")
+        return None
+    except Exception as e_proxy:
+        print(f"BACKGROUND TASK: VideoEditor: WARN Preview proxy render failed for {recipe_db_id}: {e_proxy}")
+        return None
+    print(f"BACKGROUND TASK: VideoEditor: Preview proxy rendered in {time.time() - started:.1f}s "
+          f"({os.path.getsize(local_proxy_path) / (1024 * 1024):.1f} MiB vs {os.path.getsize(local_final_output_path) / (1024 * 1024):.1f} MiB final) for {recipe_db_id}.")
+    with gdrive.borrow_drive_client() as service:
+        proxy_file_id = gdrive.upload_file_to_drive(
+            local_file_path=local_proxy_path, drive_folder_id=drive_folder_id, drive_filename=drive_filename,
+            mimetype='video/mp4', service=service, existing_file_id=existing_file_id
+        )
+    if not proxy_file_id:
+        print(f"BACKGROUND TASK: VideoEditor: WARN Preview proxy upload failed for {recipe_db_id}. Preview will use the full video.")
+    return proxy_file_id
+
+def _render_inputs(absolute_raw_clips_local_path: str, recipe_db_id: str) -> dict:
+    """What a rendered final video was made from: the clip fingerprints and the encoding profile."""
+    clips = {}
+    if os.path.isdir(absolute_raw_clips_local_path):
+        for name in sorted(os.listdir(absolute_raw_clips_local_path)):
+            path = os.path.join(absolute_raw_clips_local_path, name)
+            if os.path.isfile(path) and os.path.splitext(name)[1].lower() in ('.mp4', '.mov', '.avi', '.mkv'):
+                clips[name] = media_probe.fingerprint(path)
+    profile_name = encoding_profiles.resolve_name((get_recipe_status(recipe_db_id) or {}).get("encoding_profile"))
+    return {"clips": clips, "encoding_profile": profile_name}
+
+def _get_resumable_merged_upload(recipe_db_id: str, local_final_output_path: str, render_inputs: dict) -> dict | None:
+    """
+    Returns the recorded merged-video upload session if it still matches the rendered file on disk and that file
+    was rendered from the current clips with the current encoding profile.
+    """
+    session = (get_recipe_status(recipe_db_id) or {}).get("merged_upload")
+    if not session or not session.get("session_uri") or not os.path.exists(local_final_output_path):
+        return None
+    stat = os.stat(local_final_output_path)
+    if session.get("local_file") != os.path.relpath(local_final_output_path, TEMP_PROCESSING_BASE_DIR) or \
+       session.get("size") != stat.st_size or session.get("mtime") != stat.st_mtime:
+        return None
+    if session.get("render_inputs") != render_inputs:
+        print(f"BACKGROUND TASK: VideoEditor: Clips or encoding profile changed since the interrupted upload for {recipe_db_id}. Rendering again.")
+        return None
+    return session
+
 def merge_videos_and_replace_audio(background_tasks: BackgroundTasks, relative_raw_clips_path_from_db: str, recipe_db_id: str, recipe_name_orig: str):
     # relative_raw_clips_path_from_db is the path stored in db.json, relative to TEMP_PROCESSING_BASE_DIR.
     absolute_raw_clips_local_path = os.path.join(TEMP_PROCESSING_BASE_DIR, relative_raw_clips_path_from_db)
     print(f"BACKGROUND TASK: VideoEditor: Starting for {recipe_db_id} ({recipe_name_orig}). Relative raw clips path: '{relative_raw_clips_path_from_db}', Absolute: '{absolute_raw_clips_local_path}'")
     
-    ffmpeg_cmd, ffprobe_cmd = "", ""
-    temp_preprocess_dir_local = ""
     files_to_delete_locally = []
     current_db_status_on_exit = "MERGE_FAILED" 
     error_message_on_exit = "Unknown merge error"
     # final_merged_path_for_db is now final_merged_gdrive_file_id
     final_merged_gdrive_file_id = None 
     local_final_output_path = None # Keep track of the local final file before upload & cleanup
+    keep_final_for_resume = False # True once the upload has started, so a failed upload can be resumed
+    upload_record = None
+    job = job_control.get_job(recipe_db_id) # Registered by routes/upload.py; None when called directly
 
     try:
         print(f"BACKGROUND TASK: VideoEditor: DEBUG - Top of try block for {recipe_db_id}")
-        # ---- DIAGNOSTIC STEP: Use a fresh GDrive client for this background task ----
-        print("BACKGROUND TASK: VideoEditor: Obtaining a fresh GDrive service client for this task.")
-        # Call the new factory function to get a new instance for this task
-        task_specific_gdrive_service = gdrive.create_gdrive_service() 
-        # ---- END DIAGNOSTIC STEP ----
-        print(f"BACKGROUND TASK: VideoEditor: DEBUG - GDrive service client obtained for {recipe_db_id}")
-
-        # Use the task_specific_gdrive_service for GDrive operations within this function
-        app_data_folder_id = gdrive.get_or_create_app_data_folder_id(service=task_specific_gdrive_service)
-        if not app_data_folder_id:
-            raise VideoEditingError("Could not get/create GDrive App Data Folder for storing merged video.")
-        
-        recipe_merged_video_gdrive_folder_id = gdrive.get_or_create_recipe_subfolder_id(
-            app_data_folder_id, recipe_db_id, "merged_videos", service=task_specific_gdrive_service
-        )
-        if not recipe_merged_video_gdrive_folder_id:
-            raise VideoEditingError(f"Could not get/create GDrive subfolder for merged videos for recipe {recipe_db_id}")
-
-        ffmpeg_cmd = get_ffmpeg_tool_path("ffmpeg")
-        ffprobe_cmd = get_ffmpeg_tool_path("ffprobe")
-        print(f"BACKGROUND TASK: VideoEditor: DEBUG - FFmpeg path: {ffmpeg_cmd}, FFprobe path: {ffprobe_cmd} for {recipe_db_id}")
-
-        if not os.path.isdir(absolute_raw_clips_local_path):
-            raise VideoEditingError(f"Absolute raw clips local dir not found: {absolute_raw_clips_local_path}")
-
-        video_extensions = ('*.mp4', '*.MP4', '*.mov', '*.MOV', '*.avi', '*.AVI', '*.mkv', '*.MKV')
-        unique_clip_paths = {os.path.normpath(p) for ext in video_extensions for p in glob.glob(os.path.join(absolute_raw_clips_local_path, ext))}
-
-        if not unique_clip_paths:
-            raise VideoEditingError(f"No video files found in local raw clips dir {absolute_raw_clips_local_path}")
-
-        # Create preprocess dir inside the TEMP_PROCESSING_BASE_DIR for better organization if desired
-        # or keep it inside absolute_raw_clips_local_path if that's preferred for co-location.
-        # For simplicity, let's keep it within the specific recipe's raw clips folder.
-        temp_preprocess_dir_local = tempfile.mkdtemp(prefix="barged_preprocess_", dir=absolute_raw_clips_local_path)
-        files_to_delete_locally.append(temp_preprocess_dir_local)
-        
-        clips_for_concat_list = []
-        creationflags = subprocess.CREATE_NO_WINDOW if os.name == 'nt' else 0
-        print(f"BACKGROUND TASK: VideoEditor: DEBUG - Starting clip preprocessing loop for {recipe_db_id}.")
-
-        for clip_path in sorted(list(unique_clip_paths), key=natural_sort_key):
-            print(f"BACKGROUND TASK: VideoEditor: DEBUG - Processing clip: {clip_path} for {recipe_db_id}")
-            duration = get_video_duration(clip_path, ffprobe_cmd)
-            base_name = os.path.basename(clip_path)
-            print(f"BACKGROUND TASK: VideoEditor: DEBUG - Clip: {base_name}, Duration: {duration}s for {recipe_db_id}")
-
-            if duration < MIN_CLIP_DURATION_SECONDS: 
-                print(f"BACKGROUND TASK: VideoEditor: DEBUG - Skipping clip {base_name} (too short) for {recipe_db_id}")
-                continue
-            if duration < PREPROCESS_IF_SHORTER_THAN_SECONDS:
-                preprocessed_clip_name = f"preprocessed_{base_name}"
-                preprocessed_clip_path = os.path.join(temp_preprocess_dir_local, preprocessed_clip_name)
-                preprocess_cmd_args = [ffmpeg_cmd, '-y', '-i', clip_path, '-c:v', 'libx264', '-preset', 'medium', '-crf', '22', '-pix_fmt', 'yuv420p', '-r', DEFAULT_PREPROCESS_FPS, '-s', DEFAULT_PREPROCESS_RESOLUTION, '-an', preprocessed_clip_path]
-                print(f"BACKGROUND TASK: VideoEditor: DEBUG - Preprocessing {base_name} with command: {' '.join(preprocess_cmd_args)} for {recipe_db_id}")
-                try:
-                    subprocess.run(preprocess_cmd_args, check=True, capture_output=True, text=True, timeout=120, creationflags=creationflags)
-                    print(f"BACKGROUND TASK: VideoEditor: DEBUG - Preprocessing successful for {base_name} to {preprocessed_clip_path} for {recipe_db_id}")
-                    clips_for_concat_list.append(preprocessed_clip_path)
-                except Exception as e_pre:
-                     print(f"BACKGROUND TASK: VideoEditor: WARN Pre-processing {base_name} failed: {e_pre}. Excluding for {recipe_db_id}.")
-            else:
-                print(f"BACKGROUND TASK: VideoEditor: DEBUG - Adding original clip to list: {clip_path} for {recipe_db_id}")
-                clips_for_concat_list.append(clip_path)
-        
-        print(f"BACKGROUND TASK: VideoEditor: DEBUG - Finished clip preprocessing loop for {recipe_db_id}. Clips for concat: {clips_for_concat_list}")
-        if not clips_for_concat_list:
-            raise VideoEditingError(f"No clips remaining after filtering/pre-processing.")
-
-        # MERGED_DIR from config is already absolute and env-specific
-        # os.makedirs(MERGED_DIR, exist_ok=True) # config.py handles this now
+        # Pooled GDrive clients are borrowed only around the Drive calls below, never across an ffmpeg run.
 
         safe_recipe_name = "".join(c if c.isalnum() else "_" for c in recipe_name_orig)
-        local_intermediate_merged_filename = f"{safe_recipe_name}_merged_silent_temp.mp4"
-        local_intermediate_merged_path = os.path.join(MERGED_DIR, local_intermediate_merged_filename)
-        files_to_delete_locally.append(local_intermediate_merged_path)
-        
         gdrive_final_output_filename = f"{safe_recipe_name}_final.mp4" # Filename on Google Drive
         local_final_output_path = os.path.join(MERGED_DIR, gdrive_final_output_filename) # Local path before upload
-        files_to_delete_locally.append(local_final_output_path) # Will be cleaned up after upload
+        gdrive_proxy_filename = f"{safe_recipe_name}_proxy.mp4" # Low-res preview rendition, uploaded next to the final video
 
-        list_file_path = os.path.join(temp_preprocess_dir_local, "ffmpeg_filelist.txt")
-        files_to_delete_locally.append(list_file_path)
+        # Provision the recipe's GDrive workspace and check for an existing final video (and proxy) in one batch
+        with gdrive.borrow_drive_client() as gdrive_service:
+            workspace = gdrive.provision_recipe_workspace(
+                recipe_db_id, probe_files={"merged_videos": [gdrive_final_output_filename, gdrive_proxy_filename]}, service=gdrive_service
+            )
+        recipe_merged_video_gdrive_folder_id = workspace["folders"].get("merged_videos")
+        if not recipe_merged_video_gdrive_folder_id:
+            raise VideoEditingError(f"Could not get/create GDrive subfolder for merged videos for recipe {recipe_db_id}")
 
-        with open(list_file_path, 'w') as lf:
-            for clip_path in clips_for_concat_list:
-                lf.write(f"file '{clip_path.replace(os.sep, '/')}'\n")
-        print(f"BACKGROUND TASK: VideoEditor: DEBUG - Created ffmpeg_filelist.txt at {list_file_path} for {recipe_db_id}")
-        
-        ffmpeg_merge_cmd_args = [ffmpeg_cmd, '-y', '-f', 'concat', '-safe', '0', '-i', list_file_path, '-c:v', 'libx264', '-preset', 'medium', '-crf', '23', '-pix_fmt', 'yuv420p', '-an', local_intermediate_merged_path]
-        print(f"BACKGROUND TASK: VideoEditor: DEBUG - Starting silent merge. Command: {' '.join(ffmpeg_merge_cmd_args)} for {recipe_db_id}")
-        process = subprocess.Popen(ffmpeg_merge_cmd_args, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, creationflags=creationflags)
-        
-        print(f"BACKGROUND TASK: VideoEditor: DEBUG - Waiting for silent merge FFmpeg process to complete (timeout 900s) for {recipe_db_id}...")
-        stdout, stderr = process.communicate(timeout=900) # Allow 15 mins for merge
-        print(f"BACKGROUND TASK: VideoEditor: DEBUG - Silent merge FFmpeg process finished for {recipe_db_id}. RC: {process.returncode}")
-        if process.returncode != 0:
-            raise VideoEditingError(f"Main FFmpeg silent merge failed. RC: {process.returncode}\nStderr: {stderr[:1000]}")
-        
-        print(f"BACKGROUND TASK: VideoEditor: Silent merge to local temp successful: {local_intermediate_merged_path}")
-
-        # --- Add Audio --- (outputs to local_final_output_path)
-        static_audio_dir = os.path.join(os.path.dirname(__file__), '..', 'static', 'audio')
-        available_music_files = [os.path.join(static_audio_dir, f) for f in os.listdir(static_audio_dir) if f.lower().endswith('.mp3')] if os.path.exists(static_audio_dir) else []
-        selected_music_path = random.choice(available_music_files) if available_music_files else None
-        audio_cmd_args = []
-        if selected_music_path:
-            audio_cmd_args = [ffmpeg_cmd, '-y', '-i', local_intermediate_merged_path, '-i', selected_music_path, '-c:v', 'copy', '-c:a', 'aac', '-b:a', '192k', '-map', '0:v:0', '-map', '1:a:0', '-shortest', local_final_output_path]
+        # A previous attempt may have rendered the video and died mid-upload; if so, skip ffmpeg and resume the upload.
+        render_inputs = _render_inputs(absolute_raw_clips_local_path, recipe_db_id)
+        pending_upload = _get_resumable_merged_upload(recipe_db_id, local_final_output_path, render_inputs)
+        if pending_upload:
+            print(f"BACKGROUND TASK: VideoEditor: Found rendered video from a previous attempt for {recipe_db_id}. Skipping render and resuming upload.")
         else:
-            print(f"BACKGROUND TASK: VideoEditor: DEBUG - No music file found, using sine wave for {recipe_db_id}.")
-            audio_cmd_args = [ffmpeg_cmd, '-y', '-i', local_intermediate_merged_path, '-f', 'lavfi', '-i', "sine=frequency=1000", '-c:v', 'copy', '-c:a', 'aac', '-b:a', '128k', '-map', '0:v:0', '-map', '1:a:0', '-shortest', local_final_output_path]
-        
-        print(f"BACKGROUND TASK: VideoEditor: DEBUG - Starting audio addition. Command: {' '.join(audio_cmd_args)} for {recipe_db_id}")
-        audio_process = subprocess.Popen(audio_cmd_args, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, creationflags=creationflags)
-        print(f"BACKGROUND TASK: VideoEditor: DEBUG - Waiting for audio addition FFmpeg process to complete (timeout 300s) for {recipe_db_id}...")
-        audio_stdout, audio_stderr = audio_process.communicate(timeout=300)
-        print(f"BACKGROUND TASK: VideoEditor: DEBUG - Audio addition FFmpeg process finished for {recipe_db_id}. RC: {audio_process.returncode}")
-        if audio_process.returncode != 0:
-            # If audio fails, we might still consider the silent merged video as partially successful.
-            # For now, let's treat it as a full merge failure if audio can't be added.
-            raise VideoEditingError(f"FFmpeg audio addition failed. RC: {audio_process.returncode}\nStderr: {audio_stderr[:500]}")
-        print(f"BACKGROUND TASK: VideoEditor: Audio addition to local temp successful: {local_final_output_path}")
+            _render_final_video(absolute_raw_clips_local_path, local_final_output_path, recipe_db_id, recipe_name_orig, files_to_delete_locally)
+        job_control.raise_if_cancelled(recipe_db_id)
 
         # --- Upload final video to Google Drive ---
         print(f"BACKGROUND TASK: VideoEditor: Uploading {local_final_output_path} to GDrive folder {recipe_merged_video_gdrive_folder_id} as {gdrive_final_output_filename}")
         
-        # Check if a file with the same name already exists in the target GDrive folder to update it
-        existing_gdrive_file_id = gdrive.find_file_id_by_name(recipe_merged_video_gdrive_folder_id, gdrive_final_output_filename, service=task_specific_gdrive_service)
+        # If a file with the same name already exists in the target GDrive folder, update it (probed above, before the
+        # render; if it was deleted meanwhile upload_file_to_drive gets a 404 and creates the file instead)
+        existing_gdrive_file_id = workspace["files"]["merged_videos"].get(gdrive_final_output_filename)
         
-        final_merged_gdrive_file_id = gdrive.upload_file_to_drive(
-            local_file_path=local_final_output_path,
-            drive_folder_id=recipe_merged_video_gdrive_folder_id,
-            drive_filename=gdrive_final_output_filename,
-            mimetype='video/mp4',
-            service=task_specific_gdrive_service,
-            existing_file_id=existing_gdrive_file_id
-        )
+        # The session URI is recorded in the recipe as soon as Drive issues it, so a crashed or restarted
+        # worker can pick the upload up again from the last committed byte (see _get_resumable_merged_upload).
+        final_stat = os.stat(local_final_output_path)
+        upload_record = {
+            "local_file": os.path.relpath(local_final_output_path, TEMP_PROCESSING_BASE_DIR),
+            "size": final_stat.st_size, "mtime": final_stat.st_mtime, "render_inputs": render_inputs,
+            "session_uri": pending_upload.get("session_uri") if pending_upload else None,
+            "proxy_video_gdrive_id": pending_upload.get("proxy_video_gdrive_id") if pending_upload else None,
+        }
+        keep_final_for_resume = True
+
+        # The proxy goes up first: it is small, and it is all the preview page needs
+        if PREVIEW_PROXY_ENABLED and not upload_record["proxy_video_gdrive_id"]:
+            upload_record["proxy_video_gdrive_id"] = _render_and_upload_proxy(
+                local_final_output_path, recipe_merged_video_gdrive_folder_id, gdrive_proxy_filename,
+                workspace["files"]["merged_videos"].get(gdrive_proxy_filename), recipe_db_id, files_to_delete_locally
+            )
+            update_recipe_fields(recipe_db_id, merged_upload=dict(upload_record))
+
+        def _record_session(session_uri):
+            upload_record["session_uri"] = session_uri
+            update_recipe_fields(recipe_db_id, merged_upload=dict(upload_record))
+
+        last_reported = {"at": 0.0}
+        def _record_progress(bytes_sent, total_bytes, bytes_per_second):
+            if job and job.cancelled():
+                raise job_control.JobCancelled(f"Upload of {gdrive_final_output_filename} cancelled.") # Stops before the next chunk
+            if bytes_sent < total_bytes and time.time() - last_reported["at"] < 5:
+                return
+            last_reported["at"] = time.time()
+            upload_record.update(bytes_sent=bytes_sent, throughput_mib_s=round(bytes_per_second / (1024 * 1024), 2))
+            update_recipe_fields(recipe_db_id, merged_upload=dict(upload_record))
+
+        with gdrive.borrow_drive_client() as gdrive_service:
+            final_merged_gdrive_file_id = gdrive.upload_file_to_drive(
+                local_file_path=local_final_output_path,
+                drive_folder_id=recipe_merged_video_gdrive_folder_id,
+                drive_filename=gdrive_final_output_filename,
+                mimetype='video/mp4',
+                service=gdrive_service,
+                existing_file_id=existing_gdrive_file_id,
+                resume_uri=upload_record["session_uri"],
+                on_session_uri=_record_session,
+                progress_callback=_record_progress
+            )
         print(f"BACKGROUND TASK: VideoEditor: DEBUG - GDrive upload attempt finished for {recipe_db_id}. GDrive File ID: {final_merged_gdrive_file_id}")
         if not final_merged_gdrive_file_id:
             raise VideoEditingError(f"Failed to upload merged video to Google Drive.")
         
         print(f"BACKGROUND TASK: VideoEditor: Successfully uploaded merged video to GDrive. File ID: {final_merged_gdrive_file_id}")
+        keep_final_for_resume = False
         current_db_status_on_exit = "MERGED"
         error_message_on_exit = None
 
+    except (job_control.JobCancelled, ffmpeg_runner.FFmpegCancelled) as e_cancel:
+        print(f"BACKGROUND TASK: VideoEditor: Cancelled for {recipe_db_id}: {e_cancel}")
     except VideoEditingError as ve:
         error_message_on_exit = str(ve)
         print(f"BACKGROUND TASK: VideoEditor: VideoEditingError: {error_message_on_exit}")
@@ -232,22 +665,26 @@ def merge_videos_and_replace_audio(background_tasks: BackgroundTasks, relative_r
     
     finally:
         print(f"BACKGROUND TASK: VideoEditor: DEBUG - Entering finally block for {recipe_db_id}.")
+        _clear_merge_progress(recipe_db_id)
+        if job and job.cancelled() and current_db_status_on_exit != "MERGED":
+            # Also covers cancellation errors that surfaced wrapped (e.g. as a GDriveServiceError from the upload)
+            current_db_status_on_exit = "CANCELLED"
+            error_message_on_exit = None
+            keep_final_for_resume = False # A cancelled job leaves nothing behind
         kwargs_for_status_update = {}
         if final_merged_gdrive_file_id and current_db_status_on_exit == "MERGED":
             kwargs_for_status_update['merged_video_gdrive_id'] = final_merged_gdrive_file_id
             # Remove the old local path if it exists in DB, GDrive ID is king now
             kwargs_for_status_update['merged_video_path'] = None 
+            kwargs_for_status_update['merged_upload'] = {k: v for k, v in upload_record.items() if k != "session_uri"} if upload_record else None
+            kwargs_for_status_update['proxy_video_gdrive_id'] = upload_record.get("proxy_video_gdrive_id") if upload_record else None
         if error_message_on_exit and current_db_status_on_exit == "MERGE_FAILED":
             kwargs_for_status_update['error_message'] = error_message_on_exit
         
-        update_recipe_status(
-            recipe_id=recipe_db_id, 
-            name=recipe_name_orig, 
-            status=current_db_status_on_exit, 
-            **kwargs_for_status_update
-        )
-        print(f"BACKGROUND TASK: VideoEditor: Final DB status for {recipe_db_id} set to '{current_db_status_on_exit}'. GDrive ID: {final_merged_gdrive_file_id if final_merged_gdrive_file_id else 'N/A'}, Error: {error_message_on_exit if error_message_on_exit else 'None'}")
-
+        if local_final_output_path and not keep_final_for_resume:
+            files_to_delete_locally.append(local_final_output_path)
+        elif keep_final_for_resume:
+            print(f"BACKGROUND TASK: VideoEditor: Keeping {local_final_output_path} so the interrupted upload can be resumed on retry.")
         for item_path in files_to_delete_locally:
             try:
                 if os.path.exists(item_path):
@@ -262,6 +699,14 @@ def merge_videos_and_replace_audio(background_tasks: BackgroundTasks, relative_r
                 print(f"BACKGROUND TASK: VideoEditor: WARN Failed to clean local temp {item_path} for {recipe_db_id}: {e_clean}")
         
         print(f"BACKGROUND TASK: VideoEditor: DEBUG - Finished cleanup for {recipe_db_id}.")
+        # Written only now: a retry may start once the status is terminal, and must not find our temp files half-deleted
+        update_recipe_status(
+            recipe_id=recipe_db_id, 
+            name=recipe_name_orig, 
+            status=current_db_status_on_exit, 
+            **kwargs_for_status_update
+        )
+        print(f"BACKGROUND TASK: VideoEditor: Final DB status for {recipe_db_id} set to '{current_db_status_on_exit}'. GDrive ID: {final_merged_gdrive_file_id if final_merged_gdrive_file_id else 'N/A'}, Error: {error_message_on_exit if error_message_on_exit else 'None'}")
         # The calling background task manager in routes/upload.py 
         # will use trigger_next_background_task if this step was successful.
         
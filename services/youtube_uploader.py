@@ -251,17 +251,16 @@ def upload_video_to_youtube(metadata: dict,
         if not merged_video_gdrive_id:
             raise YouTubeUploaderError(f"merged_video_gdrive_id not found in DB for recipe {recipe_db_id_for_status_update}. Cannot upload.")
 
-        # Background task should create its own gdrive client instance
-        print("BACKGROUND TASK: YouTube: Creating task-specific GDrive client.")
-        gdrive_service = gdrive.create_gdrive_service()
-        
         # Create a temporary local file for the downloaded video
         temp_video_file = tempfile.NamedTemporaryFile(delete=False, suffix='.mp4') # Consider a temp dir from config
         local_temp_video_path = temp_video_file.name
         temp_video_file.close() # Close it so gdrive download can write to it
         
         print(f"BACKGROUND TASK: YouTube: Downloading video from GDrive (ID: {merged_video_gdrive_id}) to temp path: {local_temp_video_path}")
-        if not gdrive.download_file_from_drive(merged_video_gdrive_id, local_temp_video_path, service=gdrive_service):
+        # Background task borrows a pooled gdrive client just for the download
+        with gdrive.borrow_drive_client() as gdrive_service:
+            downloaded = gdrive.download_file_from_drive(merged_video_gdrive_id, local_temp_video_path, service=gdrive_service)
+        if not downloaded:
             raise YouTubeUploaderError(f"Failed to download merged video ({merged_video_gdrive_id}) from GDrive for YouTube upload.")
         print(f"BACKGROUND TASK: YouTube: Video downloaded successfully to {local_temp_video_path}")
 
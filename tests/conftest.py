@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The services import each other as "from services import ..." relative to the app root
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
@@ -0,0 +1,40 @@
+import os
+
+from services import clip_cache
+
+def _file(directory, name, size, age_seconds):
+    path = directory / name
+    path.write_bytes(b"x" * size)
+    mtime = os.path.getmtime(path) - age_seconds
+    os.utime(path, (mtime, mtime))
+    return str(path)
+
+def test_enforce_size_budget_evicts_oldest_first_and_respects_keep(tmp_path):
+    oldest = _file(tmp_path, "a.ts", 100, 3000)
+    kept = _file(tmp_path, "b.ts", 100, 2000)
+    newer = _file(tmp_path, "c.ts", 100, 1000)
+    stats = {"evicted_files": 0, "evicted_bytes": 0}
+    assert clip_cache.enforce_size_budget(str(tmp_path), 150, keep={kept}, stats=stats) == 200
+    assert not os.path.exists(oldest) and not os.path.exists(newer) and os.path.exists(kept)
+    assert stats == {"evicted_files": 2, "evicted_bytes": 200}
+
+def test_enforce_size_budget_skips_recent_and_vanished_files(tmp_path, monkeypatch):
+    recent = _file(tmp_path, "fresh.ts", 100, 0)
+    real_listdir = os.listdir
+    # A concurrent store renamed its .tmp entry away between listdir and stat
+    monkeypatch.setattr(clip_cache.os, "listdir", lambda d: real_listdir(d) + ["gone.ts.123.tmp"])
+    assert clip_cache.enforce_size_budget(str(tmp_path), 0, stats={"evicted_files": 0, "evicted_bytes": 0}) == 0
+    assert os.path.exists(recent)
+    assert clip_cache.directory_bytes(str(tmp_path)) == 100
+
+def test_enforce_size_budget_keeps_entries_still_linked_into_a_recipe(tmp_path):
+    cache_dir = tmp_path / "cache"
+    cache_dir.mkdir()
+    linked = _file(cache_dir, "a.mp4", 100, 3000)
+    unlinked = _file(cache_dir, "b.mp4", 100, 2000)
+    clip_cache.materialize(linked, str(tmp_path / "recipe" / "a.mp4"))
+    stats = {"evicted_files": 0, "evicted_bytes": 0}
+    # Deleting the linked entry would free nothing, so the unlinked one goes even though it is newer
+    assert clip_cache.enforce_size_budget(str(cache_dir), 150, stats=stats) == 100
+    assert os.path.exists(linked) and not os.path.exists(unlinked)
+    assert clip_cache.directory_bytes(str(cache_dir), linked_only=True) == 100
@@ -0,0 +1,85 @@
+import json
+import itertools
+
+import pytest
+
+from services import db_journal
+
+class FakeJournalFolder:
+    """In-memory stand-in for the GDrive journal folder (only the calls db_journal makes)."""
+    def __init__(self):
+        self.files = {} # id -> (name, content)
+        self._ids = itertools.count(1)
+
+    def upload_bytes_to_drive(self, content, folder_id, name, mimetype=None, service=None):
+        file_id = f"id{next(self._ids)}"
+        self.files[file_id] = (name, content.decode())
+        return file_id
+
+    def list_files_in_folder(self, folder_id, service=None):
+        return [{"id": file_id, "name": name} for file_id, (name, _) in self.files.items()]
+
+    def get_file_content_from_drive(self, file_id, service=None):
+        return self.files[file_id][1]
+
+    def delete_file_from_drive(self, file_id, service=None):
+        return self.files.pop(file_id, None) is not None
+
+@pytest.fixture
+def journal(monkeypatch):
+    folder = FakeJournalFolder()
+    for name in ("upload_bytes_to_drive", "list_files_in_folder", "get_file_content_from_drive", "delete_file_from_drive"):
+        monkeypatch.setattr(db_journal.gdrive, name, getattr(folder, name))
+    monkeypatch.setattr(db_journal, "_get_journal_folder_id", lambda service: "journal-folder")
+    monkeypatch.setattr(db_journal, "_APPLIED", set())
+    monkeypatch.setattr(db_journal, "_PENDING_DELTA_COUNT", 0)
+    return folder
+
+def _patch(recipe_id, **fields):
+    return {"op": "patch_recipe", "recipe_id": recipe_id, "fields": fields}
+
+def test_apply_delta_ops():
+    db = {"recipes": {}}
+    db_journal.apply_delta(db, _patch("r1", status="DOWNLOADING"))
+    db_journal.apply_delta(db, {"op": "batch", "deltas": [_patch("r1", status="MERGED"), _patch("r2", name="Soup")]})
+    db_journal.apply_delta(db, {"op": "set_key", "key": "last_gdrive_scan", "value": "2024-01-01"})
+    assert db["recipes"]["r1"] == {"id": "r1", "status": "MERGED"}
+    assert db["recipes"]["r2"] == {"id": "r2", "name": "Soup"}
+    assert db["last_gdrive_scan"] == "2024-01-01"
+    db_journal.apply_delta(db, {"op": "replace_recipe", "recipe_id": "r1", "record": {"id": "r1", "status": "New"}})
+    assert db["recipes"]["r1"] == {"id": "r1", "status": "New"}
+
+def test_append_then_replay_rebuilds_state(journal):
+    live = {"recipes": {}}
+    for delta in (_patch("r1", status="DOWNLOADING"), _patch("r1", status="DOWNLOADED"), _patch("r2", status="New")):
+        db_journal.apply_delta(live, delta)
+        assert db_journal.append_delta(live, delta, service=None)
+
+    restored = {"recipes": {}}
+    assert db_journal.replay_journal(restored, service=None) == 3
+    assert restored["recipes"] == live["recipes"]
+    assert db_journal.needs_compaction() is (3 >= db_journal.DB_JOURNAL_COMPACT_THRESHOLD)
+
+def test_replay_skips_deltas_folded_into_snapshot(journal):
+    live = {"recipes": {}}
+    db_journal.apply_delta(live, _patch("r1", status="MERGED"))
+    db_journal.append_delta(live, _patch("r1", status="MERGED"), service=None)
+    snapshot = json.loads(json.dumps(live))
+    snapshot[db_journal.JOURNAL_FOLDED_KEY] = sorted(db_journal.folded_deltas())
+    snapshot["recipes"]["r1"]["status"] = "UPLOADED_TO_YOUTUBE" # Changed after the delta, e.g. by a later full save
+    assert db_journal.replay_journal(snapshot, service=None) == 0
+    assert snapshot["recipes"]["r1"]["status"] == "UPLOADED_TO_YOUTUBE"
+
+def test_compaction_deletes_only_folded_deltas(journal):
+    live = {"recipes": {}}
+    db_journal.append_delta(live, _patch("r1", status="MERGED"), service=None)
+    folded = db_journal.folded_deltas()
+    # Another worker appends a delta that sorts before ours after the snapshot was taken
+    journal.upload_bytes_to_drive(json.dumps(_patch("r2", status="New")).encode(), "journal-folder", "00000000000000000001_000001.json")
+
+    assert db_journal.delete_compacted_deltas(folded, service=None) == 1
+    assert [name for name, _ in journal.files.values()] == ["00000000000000000001_000001.json"]
+
+    restored = {"recipes": {}, db_journal.JOURNAL_FOLDED_KEY: sorted(folded)}
+    assert db_journal.replay_journal(restored, service=None) == 1
+    assert restored["recipes"]["r2"]["status"] == "New"
@@ -0,0 +1,37 @@
+from services import encoding_profiles
+
+def _profile(**overrides):
+    profile = {"preset": "medium", "crf": 23, "fps": "30", "max_lines": None, "maxrate_ladder": None, "gop_seconds": None}
+    profile.update(overrides)
+    return profile
+
+def test_fit_size_keeps_small_videos():
+    assert encoding_profiles.fit_size(1280, 720, _profile(max_lines=720)) == (1280, 720)
+
+def test_fit_size_scales_short_side_down_landscape_and_portrait():
+    assert encoding_profiles.fit_size(1920, 1080, _profile(max_lines=720)) == (1280, 720)
+    assert encoding_profiles.fit_size(1080, 1920, _profile(max_lines=720)) == (720, 1280)
+
+def test_fit_size_rounds_to_even_dimensions():
+    width, height = encoding_profiles.fit_size(1921, 1081, _profile())
+    assert (width, height) == (1920, 1080)
+    width, height = encoding_profiles.fit_size(1000, 750, _profile(max_lines=480))
+    assert width % 2 == 0 and height == 480
+
+def test_video_rate_args_without_ladder_or_gop():
+    assert encoding_profiles.video_rate_args(_profile(), (1920, 1080)) == ['-preset', 'medium', '-crf', '23']
+
+def test_video_rate_args_picks_ladder_rung_by_short_side():
+    profile = _profile(maxrate_ladder=encoding_profiles.YOUTUBE_MAXRATE_LADDER)
+    assert encoding_profiles.video_rate_args(profile, (1920, 1080))[4:] == ['-maxrate', '8000k', '-bufsize', '16000k']
+    # Portrait 1080x1920 is "1080p", not "1920p"
+    assert encoding_profiles.video_rate_args(profile, (1080, 1920))[4:] == ['-maxrate', '8000k', '-bufsize', '16000k']
+    assert encoding_profiles.video_rate_args(profile, (320, 240))[4:] == ['-maxrate', '1000k', '-bufsize', '2000k']
+
+def test_video_rate_args_unknown_size_uses_lowest_rung():
+    profile = _profile(maxrate_ladder=[(1080, 8000), (0, 1000)])
+    assert encoding_profiles.video_rate_args(profile, None)[4:] == ['-maxrate', '1000k', '-bufsize', '2000k']
+
+def test_video_rate_args_gop_from_fps():
+    assert encoding_profiles.video_rate_args(_profile(gop_seconds=0.5, fps="30"), None)[-2:] == ['-g', '15']
+    assert '-g' not in encoding_profiles.video_rate_args(_profile(gop_seconds=0.5, fps=None), None)
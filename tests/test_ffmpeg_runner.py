@@ -0,0 +1,43 @@
+import sys
+import threading
+import time
+
+import pytest
+
+from services import ffmpeg_runner
+
+def test_parse_seconds_prefers_microsecond_keys():
+    assert ffmpeg_runner._parse_seconds({"out_time_us": "2500000", "out_time": "00:00:09.000000"}) == 2.5
+    # out_time_ms is microseconds too
+    assert ffmpeg_runner._parse_seconds({"out_time_ms": "1500000"}) == 1.5
+
+def test_parse_seconds_falls_back_to_out_time():
+    assert ffmpeg_runner._parse_seconds({"out_time": "01:02:03.500000"}) == 3723.5
+
+def test_parse_seconds_clamps_negative_and_rejects_garbage():
+    assert ffmpeg_runner._parse_seconds({"out_time_us": "-5000"}) == 0.0
+    assert ffmpeg_runner._parse_seconds({"out_time_us": "N/A", "out_time": "N/A"}) is None
+    assert ffmpeg_runner._parse_seconds({}) is None
+
+def test_snapshot_reports_percent_speed_and_fps():
+    snapshot = ffmpeg_runner._snapshot({"out_time_us": "5000000", "fps": "59.9", "speed": "2.5x", "progress": "continue"}, 20)
+    assert snapshot == {"out_time_seconds": 5.0, "fps": 59.9, "speed": 2.5, "done": False, "percent": 25.0}
+
+def test_snapshot_caps_percent_until_done():
+    assert ffmpeg_runner._snapshot({"out_time_us": "30000000", "progress": "continue"}, 20)["percent"] == 99.9
+    assert ffmpeg_runner._snapshot({"out_time_us": "19000000", "progress": "end"}, 20)["percent"] == 100.0
+
+def test_snapshot_without_duration_or_output_yet():
+    snapshot = ffmpeg_runner._snapshot({"out_time_us": "5000000", "speed": "N/A", "fps": "0.00"}, None)
+    assert snapshot["percent"] is None and snapshot["speed"] is None and snapshot["fps"] == 0.0
+
+def test_run_ffprobe_returns_stdout():
+    assert ffmpeg_runner.run_ffprobe([sys.executable, "-c", "print('{\"streams\": []}')"]).strip() == '{"streams": []}'
+
+def test_run_ffprobe_is_cancellable():
+    cancel_event = threading.Event()
+    threading.Timer(0.2, cancel_event.set).start()
+    started = time.time()
+    with pytest.raises(ffmpeg_runner.FFmpegCancelled):
+        ffmpeg_runner.run_ffprobe([sys.executable, "-c", "import time; time.sleep(30)"], cancel_event=cancel_event)
+    assert time.time() - started < 10
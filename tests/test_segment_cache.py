@@ -0,0 +1,19 @@
+from services import segment_cache
+
+ARGS = ['/usr/bin/ffmpeg', '-y', '-i', '/raw/a/clip1.mp4', '-c:v', 'libx264', '-crf', '23', '-threads', '2', '/tmp/x/seg_0001.ts']
+
+def _key(args=ARGS, content_md5="9e107d9d372bb6826bd81d3542a419d6", clip_path='/raw/a/clip1.mp4', output_path='/tmp/x/seg_0001.ts'):
+    return segment_cache.cache_key(content_md5, args, clip_path, output_path)
+
+def test_cache_key_ignores_paths_binary_and_threads():
+    moved = ['ffmpeg', '-y', '-i', '/raw/b/renamed.mp4', '-c:v', 'libx264', '-crf', '23', '-threads', '8', '/tmp/y/seg_0009.ts']
+    assert _key() == _key(moved, clip_path='/raw/b/renamed.mp4', output_path='/tmp/y/seg_0009.ts')
+
+def test_cache_key_changes_with_content_or_settings():
+    assert _key() != _key(content_md5="e4d909c290d0fb1ca068ffad3df8b5a1")
+    assert _key() != _key([a if a != '23' else '20' for a in ARGS])
+    assert _key() != _key(ARGS[:-1] + ['-an', ARGS[-1]])
+
+def test_cache_key_ignores_progress_option():
+    with_progress = ARGS[:-1] + ['-progress', 'pipe:1', ARGS[-1]]
+    assert _key() == _key(with_progress)
@@ -0,0 +1,39 @@
+from services import video_editor
+
+def _info(codec="h264", width=1920, height=1080, fps=29.97, rotation=0, has_video=True, **extra):
+    info = {"has_video": has_video, "video_codec": codec, "profile": "High", "width": width, "height": height,
+            "fps": fps, "pix_fmt": "yuv420p", "rotation": rotation, "sample_aspect_ratio": "1:1"}
+    info.update(extra)
+    return info
+
+def test_stream_signature_tolerates_vfr_and_unset_sar():
+    assert video_editor._stream_signature(_info(fps=29.97)) == video_editor._stream_signature(_info(fps=30.02))
+    assert video_editor._stream_signature(_info(sample_aspect_ratio="0:1")) == video_editor._stream_signature(_info())
+    assert video_editor._stream_signature(_info(sample_aspect_ratio=None)) == video_editor._stream_signature(_info())
+
+def test_stream_signature_rejects_unsupported_clips():
+    assert video_editor._stream_signature(_info(codec="vp9")) is None
+    assert video_editor._stream_signature(_info(has_video=False)) is None
+
+def test_stream_signature_differs_on_size_and_rotation():
+    assert video_editor._stream_signature(_info(width=1280, height=720)) != video_editor._stream_signature(_info())
+    assert video_editor._stream_signature(_info(rotation=90)) != video_editor._stream_signature(_info())
+
+def test_plan_stream_copy_marks_minority_as_outliers():
+    infos = {"a": _info(), "b": _info(), "c": _info(width=1280, height=720)}
+    plan = video_editor._plan_stream_copy(["a", "b", "c"], infos)
+    assert plan["outliers"] == {"c"}
+    assert plan["reference"] is infos["a"]
+
+def test_plan_stream_copy_all_matching_has_no_outliers():
+    infos = {"a": _info(), "b": _info()}
+    assert video_editor._plan_stream_copy(["a", "b"], infos)["outliers"] == set()
+
+def test_plan_stream_copy_gives_up_on_mostly_mismatched_clips():
+    infos = {"a": _info(), "b": _info(width=1280, height=720), "c": _info(codec="vp9")}
+    assert video_editor._plan_stream_copy(["a", "b", "c"], infos) is None
+    assert video_editor._plan_stream_copy(["c"], {"c": infos["c"]}) is None
+
+def test_plan_stream_copy_gives_up_on_rotated_outlier():
+    infos = {"a": _info(), "b": _info(), "c": _info(width=1280, height=720, rotation=90)}
+    assert video_editor._plan_stream_copy(["a", "b", "c"], infos) is None
@@ -1,5 +1,7 @@
 import json
 import os
+import copy
+import threading
 from datetime import datetime
 import tempfile # For temporary local db file
 
@@ -13,6 +15,7 @@ from config import (
     CACHED_DB_CONTENT,
     DB_CACHE_TIMESTAMP,
     DB_CACHE_DURATION_SECONDS,
+    DB_STORAGE_MODE,
     # ---- Import the shared GDrive client ----
     # GDRIVE_SERVICE_CLIENT # We will import config module instead
     # -----------------------------------------
@@ -22,29 +25,88 @@ import config # Import the config module to access its attributes
 
 # DB_FILE_PATH is no longer a static local path. db.json lives on Google Drive.
 
+# The cached DB is shared by FastAPI threadpool workers and background tasks.
+# _DB_LOCK guards CACHED_DB_CONTENT/DB_CACHE_TIMESTAMP and every in-place mutation of the cached dict.
+# It is only ever held for in-memory work: no GDrive I/O happens under it, and nothing that takes another
+# lock is called while holding it. Fetches are serialized by _DB_FETCH_LOCK and saves by _DB_SAVE_LOCK,
+# always acquired in that order (a fetch that finds no DB initializes and saves one) and before _DB_LOCK.
+_DB_LOCK = threading.RLock()
+_DB_FETCH_LOCK = threading.Lock()
+_DB_SAVE_LOCK = threading.Lock()
+# Revision of DB_JSON_FILENAME_ON_DRIVE that the cache is based on. A save that finds a different revision
+# on GDrive knows another worker/process wrote in between and merges instead of overwriting.
+_DB_REMOTE_REVISION = {"file_id": None, "headRevisionId": None, "md5Checksum": None}
+DB_SAVE_MAX_MERGE_ATTEMPTS = 3
+
 def load_db() -> dict:
-    """Loads the database. Tries from cache first, then Google Drive. Initializes if not found or empty."""
-    global CACHED_DB_CONTENT, DB_CACHE_TIMESTAMP # Allow modification of global cache variables
+    """
+    Loads the database from the configured DB_STORAGE_MODE backend.
+    Returns a copy: change the DB through update_recipe_status/update_recipe_fields, never the returned dict.
+    """
+    if DB_STORAGE_MODE == "sqlite":
+        from services import db_sqlite
+        return db_sqlite.load_all()
+    db = _load_db_from_drive()
+    with _DB_LOCK:
+        return copy.deepcopy(_live_db_locked(db))
 
-    # Check cache first
+def _fresh_cache_locked(log: bool = False) -> dict | None:
+    """Returns the cached DB if it has not expired. Caller holds _DB_LOCK."""
     if CACHED_DB_CONTENT and DB_CACHE_TIMESTAMP:
         cache_age = time.time() - DB_CACHE_TIMESTAMP
         if cache_age < DB_CACHE_DURATION_SECONDS:
             # print(f"UTILS: Returning DB from cache (age: {cache_age:.2f}s).") # Optional: for debugging
             return CACHED_DB_CONTENT
-        else:
+        if log:
             print(f"UTILS: DB cache expired (age: {cache_age:.2f}s). Fetching from GDrive.")
-    else:
+    elif log:
         print("UTILS: No valid DB cache. Fetching from GDrive.")
+    return None
+
+def _live_db_locked(db: dict) -> dict:
+    """The installed cache if there is one (it may have been refreshed since db was returned), else db. Caller holds _DB_LOCK."""
+    return CACHED_DB_CONTENT if CACHED_DB_CONTENT is not None else db
 
-    # If cache miss or expired, load from Google Drive
+def _load_db_from_drive() -> dict:
+    """
+    Returns the cached DB dict, fetching it from Google Drive first if the cache is empty or expired.
+    The fetch runs without _DB_LOCK, so readers of the current cache are not blocked by it; only installing
+    the result takes the lock. Read or mutate the returned dict under _DB_LOCK (via _live_db_locked).
+    """
+    global CACHED_DB_CONTENT, DB_CACHE_TIMESTAMP # Allow modification of global cache variables
+    with _DB_LOCK:
+        cached = _fresh_cache_locked()
+        if cached is not None:
+            return cached
+    with _DB_FETCH_LOCK:
+        with _DB_LOCK:
+            cached = _fresh_cache_locked(log=True) # Another thread may have fetched while we waited
+            if cached is not None:
+                return cached
+        db_data, cacheable = _fetch_db_from_drive()
+        with _DB_LOCK:
+            if not cacheable:
+                # initialize_db() already installed its DB if the save worked; error fallbacks are never cached
+                return _fresh_cache_locked() or db_data
+            from services import db_batcher, db_journal
+            for pending_delta in db_batcher.pending_deltas(): # Not yet on GDrive, but already visible to readers
+                db_journal.apply_delta(db_data, pending_delta)
+            CACHED_DB_CONTENT = db_data
+            DB_CACHE_TIMESTAMP = time.time()
+            return db_data
+
+def _fetch_db_from_drive() -> tuple[dict, bool]:
+    """
+    Downloads the DB snapshot (plus journal replay) from Google Drive. Initializes it if not found or empty.
+    Returns (db, cacheable). Must not be called with _DB_LOCK held.
+    """
     print("UTILS: Attempting to load DB from Google Drive...")
     try:
         # Use the shared GDrive client from config module
         if not config.GDRIVE_SERVICE_CLIENT:
             print("UTILS: ERROR - Shared GDrive service client not available. Cannot load DB.")
             # Fallback to a temporary in-memory DB if GDrive client is not initialized
-            return {"recipes": {}, "last_gdrive_scan": None, "gdrive_error": "Shared GDrive client not initialized"}
+            return {"recipes": {}, "last_gdrive_scan": None, "gdrive_error": "Shared GDrive client not initialized"}, False
         service = config.GDRIVE_SERVICE_CLIENT 
         
         # Since get_or_create_app_data_folder_id is part of gdrive.py, we still need gdrive module for it.
@@ -53,42 +115,105 @@ def load_db() -> dict:
         app_data_folder_id = gdrive.get_or_create_app_data_folder_id(service=service)
         if not app_data_folder_id:
             print("UTILS: ERROR - Could not get/create app data folder on GDrive. Initializing local default DB.")
-            return initialize_db() # This will attempt to save to GDrive, might fail if folder creation failed
+            return initialize_db(), False # This will attempt to save to GDrive, might fail if folder creation failed
 
         db_file_id = gdrive.find_file_id_by_name(app_data_folder_id, DB_JSON_FILENAME_ON_DRIVE, service=service)
 
         if db_file_id:
             print(f"UTILS: Found DB file on GDrive with ID: {db_file_id}. Fetching content...")
+            _remember_remote_revision(gdrive.get_file_revision_info(db_file_id, service=service))
             db_content_str = gdrive.get_file_content_from_drive(db_file_id, service=service)
             if db_content_str:
                 try:
                     db_data = json.loads(db_content_str)
                     if "recipes" not in db_data: # Basic validation
                         db_data["recipes"] = {}
+                    from services import db_journal
+                    if DB_STORAGE_MODE in ("journal", "sqlite"): # sqlite only reads the snapshot to seed a fresh disk
+                        db_journal.replay_journal(db_data, service)
                     print("UTILS: DB loaded successfully from GDrive.")
-                    # Update cache
-                    CACHED_DB_CONTENT = db_data
-                    DB_CACHE_TIMESTAMP = time.time()
-                    return db_data
+                    return db_data, True
                 except json.JSONDecodeError as e:
                     print(f"UTILS: ERROR - Failed to decode JSON from GDrive DB file content: {e}. Initializing new DB.")
-                    return initialize_db()
+                    return initialize_db(), False
             else:
                 print("UTILS: WARNING - DB file on GDrive is empty or unreadable. Initializing new DB.")
-                return initialize_db()
+                return initialize_db(), False
         else:
             print(f"UTILS: DB file '{DB_JSON_FILENAME_ON_DRIVE}' not found in GDrive app folder. Initializing new DB.")
-            return initialize_db()
+            return initialize_db(), False
     except gdrive.GDriveServiceError as e:
         print(f"UTILS: ERROR - GDriveServiceError while loading DB: {e}. Returning a temporary in-memory DB.")
         # Fallback to a temporary in-memory DB if GDrive is totally inaccessible
-        return {"recipes": {}, "last_gdrive_scan": None, "gdrive_error": str(e)}
+        return {"recipes": {}, "last_gdrive_scan": None, "gdrive_error": str(e)}, False
     except Exception as e:
         print(f"UTILS: ERROR - Unexpected error loading DB from GDrive: {e}. Returning temporary in-memory DB.")
-        return {"recipes": {}, "last_gdrive_scan": None, "unexpected_error": str(e)}
+        return {"recipes": {}, "last_gdrive_scan": None, "unexpected_error": str(e)}, False
 
 def save_db(db_content: dict):
-    """Saves the given dictionary to the database file on Google Drive and updates the cache."""
+    """Saves the whole database to the configured DB_STORAGE_MODE backend."""
+    if DB_STORAGE_MODE == "sqlite":
+        from services import db_sqlite
+        return db_sqlite.replace_all(db_content)
+    return _save_db_to_drive(db_content)
+
+def _remember_remote_revision(revision_info: dict | None):
+    if revision_info:
+        _DB_REMOTE_REVISION.update({
+            "file_id": revision_info.get("id"),
+            "headRevisionId": revision_info.get("headRevisionId"),
+            "md5Checksum": revision_info.get("md5Checksum"),
+        })
+
+def _remote_revision_changed(revision_info: dict | None) -> bool:
+    if not revision_info or not _DB_REMOTE_REVISION["file_id"]:
+        return False # Nothing to compare against (first save, or metadata unavailable)
+    if revision_info.get("id") != _DB_REMOTE_REVISION["file_id"]:
+        return True
+    return (revision_info.get("headRevisionId"), revision_info.get("md5Checksum")) != \
+        (_DB_REMOTE_REVISION["headRevisionId"], _DB_REMOTE_REVISION["md5Checksum"])
+
+def _merge_concurrent_remote_changes(db_file_id: str, db_content: dict, deltas: list | None, service) -> tuple[dict, bool]:
+    """
+    Optimistic concurrency check before overwriting the DB file on GDrive.
+    If the file changed since we last read/wrote it, re-read it and replay our deltas on top.
+    Returns (content_to_upload, merged).
+    """
+    from services import gdrive, db_journal
+    merged = False
+    for attempt in range(1, DB_SAVE_MAX_MERGE_ATTEMPTS + 1):
+        revision_info = gdrive.get_file_revision_info(db_file_id, service=service)
+        if not _remote_revision_changed(revision_info):
+            return db_content, merged
+        if not deltas:
+            print("UTILS: WARNING - DB on GDrive changed concurrently, but this save replaces the whole DB. Overwriting.")
+            return db_content, merged
+        print(f"UTILS: DB on GDrive changed concurrently (revision {revision_info.get('headRevisionId')}). Merging {len(deltas)} update(s) onto it (attempt {attempt}).")
+        remote_content_str = gdrive.get_file_content_from_drive(db_file_id, service=service)
+        try:
+            remote_db = json.loads(remote_content_str) if remote_content_str else {"recipes": {}, "last_gdrive_scan": None}
+        except json.JSONDecodeError as e:
+            print(f"UTILS: WARNING - Remote DB is not valid JSON ({e}). Overwriting with local content.")
+            return db_content, merged
+        remote_db.setdefault("recipes", {})
+        for delta in deltas:
+            db_journal.apply_delta(remote_db, delta)
+        db_content = remote_db
+        merged = True
+        _remember_remote_revision(revision_info) # Re-check on the next loop that nothing changed while merging
+    print(f"UTILS: WARNING - DB on GDrive kept changing after {DB_SAVE_MAX_MERGE_ATTEMPTS} merge attempts. Uploading last merge.")
+    return db_content, merged
+
+def _save_db_to_drive(db_content: dict, deltas: list | None = None, update_cache: bool = True):
+    """
+    Saves the given dictionary to the database file on Google Drive and updates the cache.
+    deltas are the changes db_content carries on top of the last-read remote DB; when given, a concurrent
+    remote change is merged instead of overwritten. update_cache=False leaves the cache alone (compaction).
+    """
+    with _DB_SAVE_LOCK:
+        return _save_db_to_drive_locked(db_content, deltas, update_cache)
+
+def _save_db_to_drive_locked(db_content: dict, deltas: list | None, update_cache: bool):
     global CACHED_DB_CONTENT, DB_CACHE_TIMESTAMP # Allow modification of global cache variables
 
     print("UTILS: Attempting to save DB to Google Drive...")
@@ -105,6 +230,9 @@ def save_db(db_content: dict):
             return False # Indicate failure
 
         existing_db_file_id = gdrive.find_file_id_by_name(app_data_folder_id, DB_JSON_FILENAME_ON_DRIVE, service=service)
+        merged = False
+        if existing_db_file_id:
+            db_content, merged = _merge_concurrent_remote_changes(existing_db_file_id, db_content, deltas, service)
         
         # Create a temporary local file to upload
         temp_db_file = tempfile.NamedTemporaryFile(mode='w', delete=False, suffix='.json')
@@ -125,9 +253,20 @@ def save_db(db_content: dict):
 
         if uploaded_file_id:
             print(f"UTILS: DB saved successfully to GDrive. File ID: {uploaded_file_id}")
+            _remember_remote_revision(gdrive.get_file_revision_info(uploaded_file_id, service=service))
             # Update cache immediately after successful save
-            CACHED_DB_CONTENT = db_content
-            DB_CACHE_TIMESTAMP = time.time()
+            with _DB_LOCK:
+                if deltas is None and update_cache:
+                    CACHED_DB_CONTENT = db_content # Whole-DB replacement (init, hard reset)
+                elif merged:
+                    # The cache missed the concurrent remote change. Adopt the merged DB, keeping updates
+                    # that were queued after this batch so readers still see them.
+                    from services import db_batcher, db_journal
+                    for pending_delta in db_batcher.pending_deltas():
+                        db_journal.apply_delta(db_content, pending_delta)
+                    CACHED_DB_CONTENT = db_content
+                if CACHED_DB_CONTENT is not None:
+                    DB_CACHE_TIMESTAMP = time.time()
             print("UTILS: DB cache updated after save.")
             return True # Indicate success
         else:
@@ -152,63 +291,149 @@ def initialize_db() -> dict:
     return db_content
 
 def get_recipe_status(recipe_id: str) -> dict | None:
-    db = load_db()
-    return db.get("recipes", {}).get(recipe_id)
+    if DB_STORAGE_MODE == "sqlite":
+        from services import db_sqlite
+        return db_sqlite.get_recipe(recipe_id)
+    db = _load_db_from_drive()
+    with _DB_LOCK:
+        return copy.deepcopy(_live_db_locked(db).get("recipes", {}).get(recipe_id))
+
+# Statuses that end a background task. Their updates are written through immediately instead of waiting
+# for the coalescing window, so a finished task is durable before its thread returns.
+TERMINAL_RECIPE_STATUSES = {
+    "DOWNLOADED", "DOWNLOAD_FAILED", "MERGE_FAILED", "METADATA_FAILED", "UPLOAD_FAILED",
+    "READY_FOR_PREVIEW", "UPLOADED_TO_YOUTUBE", "CANCELLED", "New",
+}
+
+def _commit_delta(delta: dict, flush: bool = False) -> bool:
+    """
+    Applies one change (see services/db_journal.py for the delta format) and persists it.
+    "sqlite" writes one local row, "journal" sends only the delta to GDrive, "snapshot" re-uploads the whole DB.
+    For the GDrive modes the write is coalesced with other updates made within DB_WRITE_COALESCE_WINDOW_MS
+    unless flush is True.
+    """
+    if DB_STORAGE_MODE == "sqlite":
+        from services import db_sqlite
+        return db_sqlite.apply_delta(delta)
+    from services import db_journal, db_batcher
+    db = _load_db_from_drive()
+    with _DB_LOCK:
+        db_journal.apply_delta(_live_db_locked(db), delta)
+        if db_batcher.enabled():
+            db_batcher.enqueue(delta)
+    if db_batcher.enabled():
+        return db_batcher.flush() if flush else True
+    return _persist_deltas([delta])
+
+def _write_pending_deltas(deltas: list) -> bool:
+    """Called by services/db_batcher.py to persist a batch of deltas with one GDrive write."""
+    from services import db_journal
+    db = _load_db_from_drive()
+    with _DB_LOCK:
+        db = _live_db_locked(db)
+        # Normally a no-op (the cached DB already has them), but the cache may have been refreshed from GDrive
+        # since they were queued. Replaying in order is safe because every op is last-writer-wins.
+        for delta in deltas:
+            db_journal.apply_delta(db, delta)
+    return _persist_deltas(deltas)
+
+def _persist_deltas(deltas: list) -> bool:
+    """Persists deltas that have already been applied to the cached DB."""
+    if DB_STORAGE_MODE != "journal":
+        db = _load_db_from_drive()
+        with _DB_LOCK:
+            snapshot = copy.deepcopy(_live_db_locked(db))
+        return _save_db_to_drive(snapshot, deltas=deltas)
+    if not config.GDRIVE_SERVICE_CLIENT:
+        print("UTILS: ERROR - Shared GDrive service client not available. Cannot append DB journal delta.")
+        return False
+    from services import db_journal
+    delta = deltas[0] if len(deltas) == 1 else {"op": "batch", "deltas": deltas}
+    db = _load_db_from_drive()
+    with _DB_LOCK:
+        db = _live_db_locked(db)
+    if not db_journal.append_delta(db, delta, config.GDRIVE_SERVICE_CLIENT):
+        print("UTILS: WARNING - Journal append failed. Falling back to a full DB snapshot save.")
+        with _DB_LOCK:
+            snapshot = copy.deepcopy(db)
+        return _save_db_to_drive(snapshot, deltas=deltas)
+    if db_journal.needs_compaction():
+        compact_db_journal()
+    return True
+
+def compact_db_journal() -> bool:
+    """Folds all journal deltas into the DB snapshot on GDrive and deletes the folded deltas."""
+    if DB_STORAGE_MODE != "journal":
+        return True
+    from services import db_journal
+    db = _load_db_from_drive()
+    with _DB_LOCK:
+        snapshot = copy.deepcopy(_live_db_locked(db))
+        # Only deltas already applied to the cache are in the snapshot; one appended meanwhile stays in the journal
+        folded = db_journal.folded_deltas()
+    snapshot[db_journal.JOURNAL_FOLDED_KEY] = sorted(folded)
+    print(f"UTILS: Compacting {len(folded)} DB journal delta(s) into snapshot (through {snapshot.get(db_journal.JOURNAL_MARKER_KEY)}).")
+    if not _save_db_to_drive(snapshot, update_cache=False):
+        print("UTILS: WARNING - Snapshot save failed during compaction. Journal left untouched.")
+        return False
+    db_journal.delete_compacted_deltas(folded, config.GDRIVE_SERVICE_CLIENT)
+    return True
+
+def flush_db_writes() -> bool:
+    """Writes any status updates still waiting in the coalescing window."""
+    if DB_STORAGE_MODE == "sqlite":
+        return True
+    from services import db_batcher
+    return db_batcher.flush()
 
 def update_recipe_status(recipe_id: str, name: str, status: str, **kwargs):
-    db = load_db()
-    if "recipes" not in db: # Should be handled by load_db, but as a safeguard
-        db["recipes"] = {}
-        
-    if recipe_id not in db["recipes"]:
-        db["recipes"][recipe_id] = {"id": recipe_id}
-    
-    db["recipes"][recipe_id]["name"] = name
-    db["recipes"][recipe_id]["status"] = status
-    db["recipes"][recipe_id]["last_updated"] = datetime.utcnow().isoformat()
-    
-    for key, value in kwargs.items():
-        db["recipes"][recipe_id][key] = value
-        
-    if save_db(db):
-        print(f"UTILS: Successfully saved and updated status for recipe ID '{recipe_id}' ({name}) to '{status}'. Details: {kwargs}")
+    fields = {"name": name, "status": status, "last_updated": datetime.utcnow().isoformat()}
+    fields.update(kwargs)
+    if _commit_delta({"op": "patch_recipe", "recipe_id": recipe_id, "fields": fields}, flush=status in TERMINAL_RECIPE_STATUSES):
+        print(f"UTILS: Successfully recorded status update for recipe ID '{recipe_id}' ({name}) to '{status}'. Details: {kwargs}")
     else:
         print(f"UTILS: WARNING - Failed to save status update to GDrive for recipe ID '{recipe_id}' ({name}). Changes may not be persisted.")
 
+def update_recipe_fields(recipe_id: str, **fields):
+    """Patches fields of a recipe record without touching its status (progress, upload sessions, reports)."""
+    if not _commit_delta({"op": "patch_recipe", "recipe_id": recipe_id, "fields": fields}):
+        print(f"UTILS: WARNING - Failed to save field update for recipe ID '{recipe_id}'. Changes may not be persisted.")
+
 def get_all_recipes_from_db() -> dict:
-    db = load_db()
-    return db.get("recipes", {})
+    if DB_STORAGE_MODE == "sqlite":
+        from services import db_sqlite
+        return db_sqlite.get_all_recipes()
+    return load_db().get("recipes", {})
 
 def update_last_gdrive_scan_time():
-    db = load_db()
-    db["last_gdrive_scan"] = datetime.utcnow().isoformat()
-    save_db(db)
+    _commit_delta({"op": "set_key", "key": "last_gdrive_scan", "value": datetime.utcnow().isoformat()})
 
 def reset_recipe_in_db(recipe_id: str):
     """Resets a recipe's status and associated processing fields in the database to a 'New' state."""
-    db = load_db()
-    if "recipes" not in db or recipe_id not in db["recipes"]:
+    existing_record = get_recipe_status(recipe_id)
+    if not existing_record:
         print(f"UTILS: Cannot reset recipe. ID '{recipe_id}' not found in DB.")
         return False
 
-    original_name = db["recipes"][recipe_id].get("name", "Unknown Recipe") 
+    original_name = existing_record.get("name", "Unknown Recipe") 
     print(f"UTILS: Resetting recipe ID '{recipe_id}' ('{original_name}') to 'New' state.")
 
     # Preserve original ID and name, clear everything else relevant to processing state
-    db["recipes"][recipe_id] = {
+    reset_record = {
         "id": recipe_id,
         "name": original_name,
         "status": "New",
         "last_updated": datetime.utcnow().isoformat(),
         "raw_clips_path": None,
         "merged_video_gdrive_id": None,
+        "proxy_video_gdrive_id": None,
         "metadata_gdrive_id": None,
         "youtube_url": None,
         "error_message": None,
         # Add any other fields that should be cleared upon reset
         # e.g., 'merged_video_path': None, 'metadata_file_path': None, if you ever store them
     }
-    if save_db(db):
+    if _commit_delta({"op": "replace_recipe", "recipe_id": recipe_id, "record": reset_record}, flush=True):
         print(f"UTILS: Recipe ID '{recipe_id}' successfully reset and saved to GDrive.")
         return True
     else:
@@ -242,26 +467,36 @@ def hard_reset_db_content() -> bool:
     # that `load_db` and `save_db` modify via `global` keyword, this approach is consistent.
     # Let's assume they are module globals that can be modified by other functions here.
     
-    # To be absolutely safe and explicit with global config vars:
-    import config 
+    # The cache lives in this module's globals (load_db/save_db use them), not in config.
+    global CACHED_DB_CONTENT, DB_CACHE_TIMESTAMP
     
     print("UTILS: Performing HARD RESET of the database.")
+    from services import db_batcher
+    dropped = db_batcher.discard_pending()
+    if dropped:
+        print(f"UTILS: Discarded {dropped} queued status update(s) before hard reset.")
     initial_db = {
         "recipes": {},
         "last_gdrive_scan": None
     }
     if save_db(initial_db): # This will save to GDrive and should update the cache via its own logic
+        if DB_STORAGE_MODE == "journal":
+            # The empty snapshot contains no deltas, so every existing delta must go.
+            from services import db_journal
+            db_journal.delete_compacted_deltas(None, config.GDRIVE_SERVICE_CLIENT)
         # Explicitly set cache to the reset state immediately after save_db call returns.
         # save_db already updates these, but doing it here ensures it, even if save_db changes.
-        config.CACHED_DB_CONTENT = initial_db 
-        config.DB_CACHE_TIMESTAMP = time.time()
+        with _DB_LOCK:
+            CACHED_DB_CONTENT = initial_db
+            DB_CACHE_TIMESTAMP = time.time()
         print("UTILS: Database hard reset complete. Cache also reset.")
         return True
     else:
         print("UTILS: CRITICAL WARNING - Failed to save hard reset state to GDrive. Database may not be reset on persistent storage.")
         # Still update local cache to reflect the attempted reset, but it's out of sync with GDrive
-        config.CACHED_DB_CONTENT = initial_db 
-        config.DB_CACHE_TIMESTAMP = time.time()
+        with _DB_LOCK:
+            CACHED_DB_CONTENT = initial_db
+            DB_CACHE_TIMESTAMP = time.time()
         print("UTILS: Local cache has been reset, but GDrive save failed.")
         return False
 